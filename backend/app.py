@@ -1,18 +1,37 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, ValidationError
 import pandas as pd
 import numpy as np
 from sklearn.datasets import load_breast_cancer, load_diabetes, load_wine
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_squared_error, accuracy_score, roc_auc_score
 from sklearn.decomposition import PCA
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
 import logging
+import asyncio
 import json
 import time
 import os
 import random
+import tempfile
+import threading
+import uuid
+
+import training
+from training import get_feature_importance
+from jobs import JobManager, FINISHED_STATUSES
+from cache import LRUCache, PredictionCache, training_cache_key
+from model_store import ModelStore
+import trees
+import predictor
+from staged import staged_metrics, staged_rasters, stage_iterations, objective_name, margin_to_prediction, residuals, quantize
+import benchmark
+import batching
+import payloads
+import explain
+import history
 
 # Conditionally import model libraries to avoid errors if not installed
 try:
@@ -59,16 +78,157 @@ class TrainingRequest(BaseModel):
     test_size: float = 0.2
     random_state: int = 42
     task_type: str = "classification"  # or "regression"
+    base_model_id: Optional[str] = None  # continue boosting from this model when compatible
+    early_stopping_rounds: Optional[int] = None  # stop when the test metric stalls for this many rounds
+    max_seconds: Optional[float] = None  # stop after the boosting round that exceeds this time budget
+
+class StagedEvaluationRequest(TrainingRequest):
+    step: int = 10  # evaluate every `step` boosting rounds
+
+# Levels of a tree returned by default; deeper subtrees are collapsed into summaries
+TREE_DETAIL_DEPTH = int(os.environ.get("TREE_DETAIL_DEPTH", 6))
+
+# Decision-boundary grids: default stages per model, largest grid side, and
+# the margin around the projected samples, as a fraction of their extent
+BOUNDARY_STAGES = int(os.environ.get("BOUNDARY_STAGES", 20))
+BOUNDARY_MAX_RESOLUTION = int(os.environ.get("BOUNDARY_MAX_RESOLUTION", 256))
+BOUNDARY_PADDING = 0.05
+
+# Points per series returned by /models/{id}/history unless full resolution is requested
+HISTORY_POINTS = int(os.environ.get("HISTORY_POINTS", 500))
+
+# Encodings of staged residuals: half floats, or uint8 codes on the range of all residuals
+RESIDUAL_PRECISIONS = ("float16", "uint8")
+
+# Most trees returned by one /models/{id}/trees request
+TREE_RANGE_LIMIT = int(os.environ.get("TREE_RANGE_LIMIT", 1000))
 
 class TreeVisualizationRequest(BaseModel):
     algorithm: str
     tree_index: int
     model_id: str
+    compact: bool = False  # levels and leaf values only for oblivious (CatBoost) trees
+    max_depth: Optional[int] = TREE_DETAIL_DEPTH  # levels listed below node_id; deeper subtrees are summarized, null for all
+    node_id: int = 0  # root of the returned subtree, to expand a collapsed node
+
+class PredictionRequest(BaseModel):
+    # Feature values in the model's feature order, or {feature: value}; None is missing.
+    # Categorical features are given as the category codes used in training.
+    rows: List[Union[List[Optional[float]], Dict[str, Optional[float]]]]
+    engine: str = "native"  # "native" (the model's library) or "compiled" (NumPy over the columnar trees)
+    output_margin: bool = False  # raw scores instead of probabilities
+    batch: bool = True  # let small requests share a vectorized call with concurrent ones
+
+class RowPredictionRequest(BaseModel):
+    values: List[Optional[float]]  # one row in the model's feature order; None is missing
+    output_margin: bool = False
+
+class PathTraceRequest(BaseModel):
+    rows: List[Union[List[Optional[float]], Dict[str, Optional[float]]]]  # as in PredictionRequest
+    engine: str = "native"  # leaves from the model's library, or "compiled" from the columnar trees
 
-# Simple in-memory storage for models and datasets
-models = {}
+class ExplainRequest(BaseModel):
+    rows: List[Union[List[Optional[float]], Dict[str, Optional[float]]]]  # as in PredictionRequest
+    method: str = "auto"  # "native" (the library's TreeSHAP), "shap" (shap.TreeExplainer) or "auto" (native first)
+
+class PredictionCacheSettings(BaseModel):
+    enabled: bool = True
+    max_entries: Optional[int] = None  # defaults to PREDICTION_CACHE_ENTRIES
+    max_bytes: Optional[int] = None  # defaults to PREDICTION_CACHE_BYTES
+
+# Trained models are persisted to disk; recently used ones are kept in memory
+models = ModelStore(
+    os.environ.get("MODEL_STORE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "model_store")),
+    max_bytes=int(os.environ.get("MODEL_CACHE_BYTES", 256 * 1024 * 1024)),
+    max_entries=int(os.environ.get("MODEL_CACHE_ENTRIES", 1024))
+)
+
+# Simple in-memory storage for datasets
 datasets = {}
 datasets_pca = {}
+# Fitted 2-D PCA of each dataset and the feature columns it was fitted on,
+# to map points of the projection back to feature space
+pca_models = {}
+
+# Training worker pool, started with the application
+job_manager = None
+
+# Results of completed trainings keyed by canonical request and dataset hash
+training_cache = LRUCache(
+    max_entries=int(os.environ.get("TRAINING_CACHE_ENTRIES", 256)),
+    max_bytes=int(os.environ.get("TRAINING_CACHE_BYTES", 64 * 1024 * 1024))
+)
+
+# Columnar trees of models, converted on first use
+tree_cache = LRUCache(
+    max_entries=int(os.environ.get("TREE_CACHE_ENTRIES", 256)),
+    max_bytes=int(os.environ.get("TREE_CACHE_BYTES", 256 * 1024 * 1024))
+)
+
+# NumPy predictors compiled from the columnar trees
+predictor_cache = LRUCache(
+    max_entries=int(os.environ.get("PREDICTOR_CACHE_ENTRIES", 64)),
+    max_bytes=int(os.environ.get("PREDICTOR_CACHE_BYTES", 256 * 1024 * 1024))
+)
+
+class RequestStreamingResponse(StreamingResponse):
+    """StreamingResponse for body iterators that consume the request body while responding
+
+    StreamingResponse watches for client disconnects by reading receive(),
+    which would swallow the request body; here the iterator notices
+    disconnects itself through request.stream().
+    """
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+# Single-row fast paths keyed by (model id, output_margin); each keeps its model loaded
+row_predictor_cache = LRUCache(max_entries=int(os.environ.get("ROW_PREDICTOR_ENTRIES", 64)), max_bytes=float("inf"))
+
+# Per-model caches of predictions by row hash; models are opted in through
+# PUT /models/{id}/prediction-cache, or all of them with PREDICTION_CACHE_DEFAULT=1
+prediction_caches = {}
+PREDICTION_CACHE_DEFAULT = os.environ.get("PREDICTION_CACHE_DEFAULT", "0") == "1"
+PREDICTION_CACHE_ENTRIES = int(os.environ.get("PREDICTION_CACHE_ENTRIES", 10000))
+PREDICTION_CACHE_BYTES = int(os.environ.get("PREDICTION_CACHE_BYTES", 16 * 1024 * 1024))
+
+# Micro-batchers keyed by (model id, engine, output_margin)
+batchers = LRUCache(max_entries=int(os.environ.get("PREDICT_BATCHERS", 256)), max_bytes=float("inf"))
+
+# Staged decision-boundary rasters keyed by (model id, model timestamp, resolution, step)
+boundary_cache = LRUCache(
+    max_entries=int(os.environ.get("BOUNDARY_CACHE_ENTRIES", 64)),
+    max_bytes=int(os.environ.get("BOUNDARY_CACHE_BYTES", 64 * 1024 * 1024))
+)
+
+# Staged residuals keyed by (model id, model timestamp, step, precision)
+residual_cache = LRUCache(
+    max_entries=int(os.environ.get("RESIDUAL_CACHE_ENTRIES", 64)),
+    max_bytes=int(os.environ.get("RESIDUAL_CACHE_BYTES", 64 * 1024 * 1024))
+)
+
+# Training histories read from the model store, keyed by (model id, model timestamp)
+history_cache = LRUCache(
+    max_entries=int(os.environ.get("HISTORY_CACHE_ENTRIES", 256)),
+    max_bytes=int(os.environ.get("HISTORY_CACHE_BYTES", 64 * 1024 * 1024))
+)
+
+# shap.TreeExplainers by model id, counted one unit each; each keeps its model loaded
+EXPLAINER_CACHE_ENTRIES = int(os.environ.get("EXPLAINER_CACHE_ENTRIES", 16))
+explainer_cache = LRUCache(max_entries=EXPLAINER_CACHE_ENTRIES, max_bytes=EXPLAINER_CACHE_ENTRIES)
+
+# Streamed Arrow bodies beyond this size are spooled to disk
+PREDICT_SPOOL_BYTES = int(os.environ.get("PREDICT_SPOOL_BYTES", 64 * 1024 * 1024))
+ARROW_STREAM_TYPE = "application/vnd.apache.arrow.stream"
+
+# Algorithm benchmarks keyed by dataset content hash, target and task type
+benchmark_cache = LRUCache(
+    max_entries=int(os.environ.get("BENCHMARK_CACHE_ENTRIES", 64)),
+    max_bytes=int(os.environ.get("BENCHMARK_CACHE_BYTES", 4 * 1024 * 1024))
+)
+# Benchmarks run one at a time so their timings don't disturb each other
+benchmark_lock = threading.Lock()
 
 # Load sample datasets
 def load_sample_datasets():
@@ -104,6 +264,8 @@ def load_sample_datasets():
     })
     datasets['synthetic'] = synthetic_data
     
+    training.register_datasets(datasets)
+    
     # Pre-compute 2D PCA for each dataset (for visualization)
     for name, df in datasets.items():
         try:
@@ -112,6 +274,7 @@ def load_sample_datasets():
             sample_df = features.sample(n=min(len(features), 1000), random_state=42)
             pca = PCA(n_components=2)
             coords = pca.fit_transform(sample_df.values)
+            pca_models[name] = {"pca": pca, "columns": list(features.columns)}
             datasets_pca[name] = {
                 'x': coords[:, 0].tolist(),
                 'y': coords[:, 1].tolist(),
@@ -160,196 +323,138 @@ def get_dataset_pca(dataset_name: str):
         raise HTTPException(status_code=404, detail="PCA projection not found")
     return datasets_pca[dataset_name]
 
-@app.post("/train")
+@app.on_event("startup")
+def start_job_manager():
+    """Start the training worker pool"""
+    global job_manager
+    max_workers = int(os.environ.get("TRAINING_WORKERS", min(4, os.cpu_count() or 1)))
+    # Cores shared by all jobs, and the threads each training job gets
+    cpu_budget = int(os.environ.get("CPU_BUDGET", os.cpu_count() or 1))
+    threads_per_job = int(os.environ["TRAINING_THREADS"]) if "TRAINING_THREADS" in os.environ else None
+    job_manager = JobManager(max_workers, initializer=training.register_datasets, initargs=(datasets,),
+                             cpu_budget=cpu_budget, threads_per_job=threads_per_job)
+    logger.info(f"Started training pool with {max_workers} workers and a budget of {cpu_budget} cores")
+
+@app.on_event("startup")
+def watch_models():
+    models.add_listener(invalidate_model_caches)
+
+@app.on_event("shutdown")
+def stop_job_manager():
+    """Stop the training worker pool"""
+    if job_manager is not None:
+        job_manager.shutdown()
+
+@app.post("/train", status_code=202)
 def train_model(request: TrainingRequest):
-    """Train a gradient boosting model based on the specified parameters"""
-    if request.dataset_name not in datasets:
-        raise HTTPException(status_code=404, detail=f"Dataset {request.dataset_name} not found")
-    
-    # Get dataset
-    df = datasets[request.dataset_name]
-    
-    # Split features and target
-    X = df.drop(columns=[request.target_column])
-    y = df[request.target_column]
-    
-    # Convert categorical features if specified
-    if request.categorical_features:
-        for col in request.categorical_features:
-            if col in X.columns:
-                X[col] = X[col].astype('category')
-    
-    # Split data
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=request.test_size, random_state=request.random_state
-    )
+    """Queue training of a gradient boosting model and return the job id"""
+    validate_training_request(request)
+    return submit_training(request)
+
+@app.post("/staged-evaluation", status_code=202)
+def staged_evaluation(request: StagedEvaluationRequest):
+    """Train once and report test metrics every `step` boosting rounds"""
+    validate_training_request(request)
+    if request.step < 1:
+        raise HTTPException(status_code=400, detail="step must be at least 1")
+    return submit_training(request, staged_step=request.step)
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """Get status, progress and, once finished, the result of a job"""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+@app.delete("/jobs/{job_id}")
+def cancel_job(job_id: str, keep_partial: bool = False):
+    """Cancel a queued or running job; running trainings stop after their current boosting round
+
+    With keep_partial the partially trained model is stored and returned as the job result.
+    """
+    try:
+        job = job_manager.cancel(job_id, keep_partial=keep_partial)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+@app.get("/jobs/{job_id}/stream")
+async def stream_job(job_id: str):
+    """Stream a job's per-iteration progress and metrics as Server-Sent Events"""
+    subscription = job_manager.subscribe(job_id, asyncio.get_running_loop())
+    if subscription is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    backlog, events = subscription
     
-    # Generate a unique model ID
-    model_id = f"{request.algorithm}_{int(time.time())}"
+    async def event_stream():
+        try:
+            # Replay events published before the client connected
+            pending = list(backlog)
+            while True:
+                event = pending.pop(0) if pending else await events.get()
+                yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+                if event["event"] in FINISHED_STATUSES:
+                    break
+        finally:
+            job_manager.unsubscribe(job_id, events)
     
-    try:
-        # Create placeholder for model and training metrics
-        metrics = {}
-        train_time = 0
-        model = None
-        
-        # Train model based on algorithm
-        start_time = time.time()
-        
-        if request.algorithm == "xgboost" and XGBOOST_AVAILABLE:
-            # Set up default params if not provided
-            default_params = {
-                "n_estimators": 100,
-                "learning_rate": 0.1,
-                "max_depth": 3,
-                "subsample": 0.8,
-                "colsample_bytree": 0.8
-            }
-            
-            # Update with user-provided params
-            params = {**default_params, **request.params}
-            
-            # Training for classification or regression
-            if request.task_type == "classification":
-                model = xgb.XGBClassifier(**params, random_state=request.random_state)
-            else:
-                model = xgb.XGBRegressor(**params, random_state=request.random_state)
-                
-            # Train the model
-            model.fit(X_train, y_train, eval_set=[(X_test, y_test)], verbose=False)
-            
-        elif request.algorithm == "lightgbm" and LIGHTGBM_AVAILABLE:
-            # Set up default params if not provided
-            default_params = {
-                "n_estimators": 100,
-                "learning_rate": 0.1,
-                "max_depth": 3,
-                "subsample": 0.8,
-                "colsample_bytree": 0.8
-            }
-            
-            # Update with user-provided params
-            params = {**default_params, **request.params}
-            
-            # Training for classification or regression
-            if request.task_type == "classification":
-                model = lgb.LGBMClassifier(**params, random_state=request.random_state)
-            else:
-                model = lgb.LGBMRegressor(**params, random_state=request.random_state)
-                
-            # Train the model
-            model.fit(X_train, y_train, eval_set=[(X_test, y_test)], verbose=False)
-            
-        elif request.algorithm == "catboost" and CATBOOST_AVAILABLE:
-            # Set up default params if not provided
-            default_params = {
-                "iterations": 100,
-                "learning_rate": 0.1,
-                "depth": 3,
-                "subsample": 0.8
-            }
-            
-            # Update with user-provided params
-            params = {**default_params, **request.params}
-            
-            # Training for classification or regression
-            if request.task_type == "classification":
-                model = cb.CatBoostClassifier(**params, random_state=request.random_state)
-            else:
-                model = cb.CatBoostRegressor(**params, random_state=request.random_state)
-                
-            # Train the model
-            model.fit(X_train, y_train, eval_set=(X_test, y_test), verbose=False)
-            
-        else:
-            # For demonstration, if libraries aren't available, create a "mock" model
-            import time
-            time.sleep(2)  # Simulate training time
-            class MockModel:
-                def __init__(self, algorithm):
-                    self.algorithm = algorithm
-                    self.trees = []
-                    for i in range(10):
-                        self.trees.append({
-                            "id": i,
-                            "nodes": [
-                                {"id": 0, "feature": "feature1", "threshold": random.random() * 5, "left": 1, "right": 2},
-                                {"id": 1, "leaf": True, "value": random.random()},
-                                {"id": 2, "leaf": True, "value": random.random()}
-                            ]
-                        })
-                
-                def predict(self, X):
-                    # Return mock predictions
-                    if isinstance(X, pd.DataFrame):
-                        return np.random.rand(X.shape[0])
-                    return np.random.rand(len(X))
-                    
-                def feature_importance(self, importance_type='gain'):
-                    # Return mock feature importances
-                    return np.random.rand(X.shape[1])
-            
-            model = MockModel(request.algorithm)
-            
-        train_time = time.time() - start_time
-        
-        # Calculate metrics
-        if model is not None:
-            y_pred = model.predict(X_test)
-            
-            if request.task_type == "classification":
-                accuracy = accuracy_score(y_test, y_pred)
-                try:
-                    y_proba = model.predict_proba(X_test)[:, 1]
-                    auc = roc_auc_score(y_test, y_proba)
-                    metrics = {
-                        "accuracy": accuracy,
-                        "auc": auc
-                    }
-                except:
-                    metrics = {
-                        "accuracy": accuracy
-                    }
-            else:
-                mse = mean_squared_error(y_test, y_pred)
-                rmse = np.sqrt(mse)
-                metrics = {
-                    "mse": mse,
-                    "rmse": rmse
-                }
-        
-        # Store model info
-        model_info = {
-            "id": model_id,
-            "algorithm": request.algorithm,
-            "params": request.params,
-            "dataset": request.dataset_name,
-            "task_type": request.task_type,
-            "features": list(X.columns),
-            "target": request.target_column,
-            "metrics": metrics,
-            "train_time": train_time,
-            "timestamp": time.time(),
-            "model": model  # In-memory storage of model object
-        }
-        
-        models[model_id] = model_info
-        
-        # Return model info (excluding the actual model object)
-        return {
-            "model_id": model_id,
-            "algorithm": request.algorithm,
-            "params": request.params,
-            "dataset": request.dataset_name,
-            "task_type": request.task_type,
-            "metrics": metrics,
-            "train_time": train_time,
-            "feature_importance": get_feature_importance(model, request.algorithm, list(X.columns))
-        }
-        
-    except Exception as e:
-        logger.error(f"Error training model: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error training model: {str(e)}")
+    return StreamingResponse(event_stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+@app.get("/admin/cpu")
+def get_cpu_allocation():
+    """Get the CPU budget, threads allocated to running jobs and the jobs waiting for cores"""
+    return job_manager.cpu_stats()
+
+@app.get("/admin/batching")
+def get_batching_stats():
+    """Get batch-size and queue-wait histograms of the prediction micro-batchers"""
+    return {
+        "window_ms": batching.BATCH_WINDOW_MS,
+        "max_batch_size": batching.MAX_BATCH_SIZE,
+        "batchers": [
+            {"model_id": model_id, "engine": engine, "output_margin": output_margin, **batcher.stats()}
+            for (model_id, engine, output_margin), batcher in list(batchers.entries.items())
+        ]
+    }
+
+@app.get("/cache/models")
+def get_model_cache_stats():
+    """Get the number of stored models and occupancy of the in-memory model cache"""
+    return models.stats()
+
+@app.get("/cache/trees")
+def get_tree_cache_stats():
+    """Get hit/miss counters and occupancy of the columnar tree cache"""
+    return tree_cache.stats()
+
+@app.get("/cache/predictors")
+def get_predictor_cache_stats():
+    """Get hit/miss counters and occupancy of the compiled predictor cache"""
+    return predictor_cache.stats()
+
+@app.get("/cache/boundaries")
+def get_boundary_cache_stats():
+    """Get hit/miss counters and occupancy of the decision-boundary cache"""
+    return boundary_cache.stats()
+
+@app.get("/cache/explainers")
+def get_explainer_cache_stats():
+    """Get hit/miss counters and occupancy of the shap explainer cache"""
+    return explainer_cache.stats()
+
+@app.get("/cache/predictions")
+def get_prediction_cache_stats():
+    """Get hit/miss counters and occupancy of every model's prediction cache"""
+    return {model_id: cache.stats() for model_id, cache in list(prediction_caches.items())}
+
+@app.get("/cache/training")
+def get_training_cache_stats():
+    """Get hit/miss counters and occupancy of the training result cache"""
+    return training_cache.stats()
 
 @app.get("/models")
 def get_models():
@@ -363,7 +468,7 @@ def get_models():
                 "metrics": info["metrics"],
                 "timestamp": info["timestamp"]
             }
-            for model_id, info in models.items()
+            for model_id, info in models.metadata().items()
         ]
     }
 
@@ -387,31 +492,488 @@ def get_model_info(model_id: str):
         "metrics": model_info["metrics"],
         "train_time": model_info["train_time"],
         "timestamp": model_info["timestamp"],
-        "n_trees": get_n_estimators(model_info["model"], model_info["algorithm"]),
+        "n_trees": count_trees(model_id),
         "feature_importance": get_feature_importance(model_info["model"], model_info["algorithm"], model_info["features"])
     }
 
+@app.post("/models/{model_id}/predict")
+async def predict(model_id: str, http_request: Request, engine: str = "native", output_margin: bool = False,
+                  chunk_size: int = predictor.STREAM_CHUNK_ROWS):
+    """Predict rows with the model's library or with the compiled NumPy predictor
+
+    A JSON body (PredictionRequest) gets a single JSON response. A CSV
+    (text/csv) or Arrow IPC stream body is scored in chunks of chunk_size rows
+    as it arrives, with engine and output_margin taken from the query, and
+    answered with NDJSON: one record per chunk followed by a summary record.
+    """
+    content_type = http_request.headers.get("content-type", "application/json").split(";")[0].strip().lower()
+    if content_type in ("text/csv", ARROW_STREAM_TYPE, "application/x-arrow-stream"):
+        if chunk_size < 1:
+            raise HTTPException(status_code=400, detail="chunk_size must be at least 1")
+        score = prediction_scorer(model_id, engine, output_margin)
+        features = models.info[model_id]["features"]
+        if content_type == "text/csv":
+            chunks = csv_body_chunks(http_request, features, chunk_size)
+        else:
+            if not predictor.PYARROW_AVAILABLE:
+                raise HTTPException(status_code=415, detail="Arrow input requires pyarrow, which is not installed")
+            chunks = arrow_body_chunks(http_request, features, chunk_size)
+        return RequestStreamingResponse(stream_predictions(model_id, engine, chunks, score),
+                                        media_type="application/x-ndjson")
+    if content_type != "application/json":
+        raise HTTPException(status_code=415, detail=f"Unsupported content type {content_type}")
+    
+    try:
+        request = PredictionRequest.parse_obj(await http_request.json())
+    except ValidationError as e:
+        raise RequestValidationError(e.raw_errors)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON body: {str(e)}")
+    predict_rows, classes = prediction_function(model_id, request.engine, request.output_margin)
+    try:
+        X = predictor.rows_to_matrix(request.rows, models.info[model_id]["features"])
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    async def score(X):
+        """Predictions and details of how they were computed"""
+        if len(X) == 1 and not request.batch and request.engine == "native":
+            fast = await run_in_threadpool(get_row_predictor, model_id, request.output_margin)
+            start = time.perf_counter()
+            prediction = np.asarray(fast.predict(X[0]))[None]
+            return prediction, {"predict_time": time.perf_counter() - start}
+        if request.batch and 0 < len(X) <= batching.MAX_BATCH_SIZE:
+            # Small requests are scored together with concurrent ones
+            batcher = get_batcher(model_id, request.engine, request.output_margin, predict_rows)
+            prediction, batch = await batcher.predict(X)
+            return prediction, {"predict_time": batch["predict_time"], "batch": batch}
+        start = time.perf_counter()
+        prediction = await run_in_threadpool(predict_rows, X)
+        return prediction, {"predict_time": time.perf_counter() - start}
+    
+    response = {
+        "model_id": model_id,
+        "engine": request.engine,
+        "n_rows": len(X)
+    }
+    cache = get_prediction_cache(model_id)
+    if cache is None:
+        prediction, details = await score(X)
+    else:
+        # Only rows without a cached result are scored
+        kind = PredictionCache.kind(request.engine, "margin" if request.output_margin else "prediction")
+        keys = cache.row_keys(X)
+        results = cache.get_many(keys, kind)
+        missing = [i for i, result in enumerate(results) if result is None]
+        details = {"predict_time": 0.0}
+        if missing:
+            computed, details = await score(X[missing])
+            computed = np.asarray(computed)
+            cache.put_many([keys[i] for i in missing], kind, computed)
+            for i, result in zip(missing, computed):
+                results[i] = result
+        prediction = np.stack(results) if results else np.empty(0)
+        details["cache"] = {"hits": len(X) - len(missing), "misses": len(missing)}
+    return {**response, **details, **prediction_result(prediction, classes)}
+
+@app.post("/models/{model_id}/predict-row")
+async def predict_row(model_id: str, request: RowPredictionRequest):
+    """Predict a single row through the model's low-latency fast path"""
+    if model_id not in models:
+        raise HTTPException(status_code=404, detail=f"Model {model_id} not found")
+    fast = row_predictor_cache.get((model_id, request.output_margin))
+    if fast is None:
+        # Building the fast path may read the model from disk
+        fast = await run_in_threadpool(get_row_predictor, model_id, request.output_margin)
+    row = np.array([np.nan if value is None else value for value in request.values], dtype=np.float32)
+    cache = get_prediction_cache(model_id)
+    kind = PredictionCache.kind("row", "margin" if request.output_margin else "prediction")
+    key = cache.row_keys(row[None])[0] if cache is not None else None
+    cached = cache.get_many([key], kind)[0] if cache is not None else None
+    prediction = cached
+    predict_time = 0.0
+    if cached is None:
+        try:
+            start = time.perf_counter()
+            prediction = fast.predict(row)
+            predict_time = time.perf_counter() - start
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if cache is not None:
+            cache.put_many([key], kind, [prediction])
+    
+    prediction = np.asarray(prediction)
+    response = {
+        "model_id": model_id,
+        "prediction": prediction.tolist(),
+        "predict_time": predict_time
+    }
+    if cache is not None:
+        response["cached"] = cached is not None
+    classes = models.info[model_id].get("classes")
+    if models.info[model_id]["task_type"] == "classification" and classes and not request.output_margin:
+        response["label"] = classes[int(np.argmax(prediction)) if prediction.ndim else int(prediction > 0.5)]
+    return response
+
+@app.post("/models/{model_id}/explain")
+def explain_predictions(model_id: str, request: ExplainRequest):
+    """Get per-feature contributions (SHAP values) to the raw margin of each row
+
+    Rows found in the model's prediction cache are not explained again.
+    Batches of more than EXPLAIN_CHUNK_ROWS uncached rows are explained by
+    one job on the worker pool, chunk by chunk: the response is then 202 with
+    a job id whose progress counts explained rows and whose result is this
+    endpoint's response. method=shap on a model shap cannot read is a 400.
+    """
+    if model_id not in models:
+        raise HTTPException(status_code=404, detail=f"Model {model_id} not found")
+    if request.method not in explain.METHODS:
+        raise HTTPException(status_code=400, detail=f"Unknown method {request.method}, expected one of {', '.join(explain.METHODS)}")
+    model_info = models.info[model_id]
+    algorithm = model_info["algorithm"]
+    features = model_info["features"]
+    if not trees.supports(algorithm) or isinstance(models.load(model_id), training.MockModel):
+        raise HTTPException(status_code=400, detail=f"Model {model_id} cannot be explained")
+    if request.method == "shap":
+        try:
+            explain.check_shap(models.load(model_id), algorithm)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    try:
+        X = predictor.rows_to_matrix(request.rows, features)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    categorical_indices = [features.index(col) for col in model_info.get("categorical_features") or []
+                           if col in features]
+    
+    cache = get_prediction_cache(model_id)
+    # Contributions of different methods are cached apart
+    kind = PredictionCache.kind(request.method, "contributions")
+    results = [None] * len(X)
+    keys = None
+    if cache is not None:
+        keys = cache.row_keys(X)
+        results = cache.get_many(keys, kind)
+    missing = [i for i, result in enumerate(results) if result is None]
+    
+    def complete(computed, method, explain_time):
+        computed = np.asarray(computed)
+        if cache is not None and len(computed):
+            cache.put_many([keys[i] for i in missing[:len(computed)]], kind, computed)
+        for i, result in zip(missing, computed):
+            results[i] = result
+        response = {
+            "model_id": model_id,
+            "method": method,
+            "n_rows": len(X),
+            "n_explained": sum(result is not None for result in results),
+            "explain_time": explain_time,
+            **explanation_result(results, model_info)
+        }
+        if cache is not None:
+            response["cache"] = {"hits": len(X) - len(missing), "misses": len(missing)}
+        return response
+    
+    if len(missing) > explain.EXPLAIN_CHUNK_ROWS:
+        def store_explanation(result):
+            return complete(result["contributions"], result["method"], result["explain_time"])
+        
+        job_id = job_manager.submit(explain.explain_rows, models.model_path(model_id), algorithm, model_info["task_type"],
+                                    X[missing], categorical_indices, request.method, explain.EXPLAIN_CHUNK_ROWS,
+                                    kind="explain", on_complete=store_explanation)
+        return JSONResponse(status_code=202, content={
+            "job_id": job_id,
+            "model_id": model_id,
+            "status": "queued",
+            "n_rows": len(X),
+            "rows_to_explain": len(missing)
+        })
+    
+    start = time.perf_counter()
+    method = "cached"
+    computed = []
+    if missing:
+        try:
+            computed, method = explain.contributions(models.load(model_id), algorithm, X[missing], categorical_indices,
+                                                     request.method, lambda: get_explainer(model_id))
+        except Exception as e:
+            logger.error(f"Error explaining predictions of {model_id}: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Error explaining predictions: {str(e)}")
+    return complete(computed, method, time.perf_counter() - start)
+
+@app.get("/models/{model_id}/decision-boundary")
+def get_decision_boundary(model_id: str, http_request: Request, resolution: int = 64, step: Optional[int] = None,
+                          format: Optional[str] = None):
+    """Get the model's predictions over the PCA plane of its dataset after every step boosting rounds
+
+    A resolution x resolution grid spanning the projected samples is mapped
+    back to feature space through the dataset's PCA and scored with staged
+    predictions, so all stages cost one pass over the trees. raster is
+    (n_stages, resolution, resolution) uint8, rows along y and columns along
+    x, decoded as value = low + raster / 255 * (high - low) with
+    (low, high) = scale; see staged.staged_rasters. step defaults to
+    BOUNDARY_STAGES stages. Results are cached, and the format is chosen as
+    for /models/{id}/trees.
+    """
+    if model_id not in models:
+        raise HTTPException(status_code=404, detail=f"Model {model_id} not found")
+    if not 2 <= resolution <= BOUNDARY_MAX_RESOLUTION:
+        raise HTTPException(status_code=400, detail=f"resolution must be between 2 and {BOUNDARY_MAX_RESOLUTION}")
+    if step is not None and step < 1:
+        raise HTTPException(status_code=400, detail="step must be at least 1")
+    fmt = payloads.negotiate(http_request.headers.get("accept"), format)
+    if fmt is None:
+        raise HTTPException(status_code=406, detail=f"Format {format} is not available, expected one of {', '.join(payloads.available_formats())}")
+    model_info = models[model_id]
+    model = model_info["model"]
+    algorithm = model_info["algorithm"]
+    projection = pca_models.get(model_info["dataset"])
+    if projection is None:
+        raise HTTPException(status_code=400, detail=f"No PCA projection of dataset {model_info['dataset']}")
+    features = model_info["features"]
+    missing = [col for col in features if col not in projection["columns"]]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Features not in the PCA of the dataset: {', '.join(missing)}")
+    if isinstance(model, training.MockModel):
+        raise HTTPException(status_code=400, detail=f"Model {model_id} cannot make predictions")
+    n_rounds = training.boosted_rounds(model, algorithm)
+    if not n_rounds:
+        raise HTTPException(status_code=400, detail="Cannot determine the number of boosting rounds of the model")
+    step = step or max(1, -(-n_rounds // BOUNDARY_STAGES))
+    
+    cache_key = (model_id, model_info["timestamp"], resolution, step)
+    cached = boundary_cache.get(cache_key)
+    hit = cached is not None
+    if not hit:
+        start = time.perf_counter()
+        pca_points = datasets_pca[model_info["dataset"]]
+        axes = []
+        for coords in (pca_points["x"], pca_points["y"]):
+            low, high = float(np.min(coords)), float(np.max(coords))
+            padding = (high - low) * BOUNDARY_PADDING
+            axes.append(np.linspace(low - padding, high + padding, resolution))
+        grid_x, grid_y = np.meshgrid(*axes)
+        points = projection["pca"].inverse_transform(np.column_stack([grid_x.ravel(), grid_y.ravel()]))
+        X = points[:, [projection["columns"].index(col) for col in features]].astype(np.float32)
+        categorical_indices = [features.index(col) for col in model_info.get("categorical_features") or []
+                               if col in features]
+        # Category codes are integers
+        X[:, categorical_indices] = np.rint(X[:, categorical_indices])
+        iterations = stage_iterations(n_rounds, step)
+        try:
+            arrays, scale = staged_rasters(model, algorithm, model_info["task_type"], X, (resolution, resolution),
+                                           iterations, categorical_indices)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        meta = {
+            "model_id": model_id,
+            "dataset": model_info["dataset"],
+            "resolution": resolution,
+            "step": step,
+            "iterations": iterations,
+            "x_range": [float(axes[0][0]), float(axes[0][-1])],
+            "y_range": [float(axes[1][0]), float(axes[1][-1])],
+            "scale": list(scale),
+            "compute_time": time.perf_counter() - start
+        }
+        if "label" in arrays:
+            meta["classes"] = model_info.get("classes")
+        cached = (meta, arrays)
+        boundary_cache.put(cache_key, cached, size=sum(array.nbytes for array in arrays.values()))
+    
+    meta, arrays = cached
+    body, media_type = payloads.encode({**meta, "cached": hit}, arrays, fmt)
+    return Response(content=body, media_type=media_type)
+
+@app.get("/models/{model_id}/residuals")
+def get_staged_residuals(model_id: str, http_request: Request, step: int = 1, precision: str = "float16",
+                         format: Optional[str] = None):
+    """Get the residual of every training and test sample after every step boosting rounds
+
+    The samples are the model's own train/test split. Each row's leaves are
+    found in one call to the model's library and their outputs added round
+    by round to a running margin (TreeArrays.staged_margins), so all stages
+    cost one pass over the trees. train and test are (n_stages, n_samples)
+    in the given precision; uint8 residuals decode as
+    low + code / 255 * (high - low) with (low, high) = scale. Residuals are
+    defined in staged.residuals; summary holds the mean absolute residual of
+    each stage. Results are cached, and the format is chosen as for
+    /models/{id}/trees.
+    """
+    if model_id not in models:
+        raise HTTPException(status_code=404, detail=f"Model {model_id} not found")
+    if step < 1:
+        raise HTTPException(status_code=400, detail="step must be at least 1")
+    if precision not in RESIDUAL_PRECISIONS:
+        raise HTTPException(status_code=400, detail=f"Unknown precision {precision}, expected one of {', '.join(RESIDUAL_PRECISIONS)}")
+    fmt = payloads.negotiate(http_request.headers.get("accept"), format)
+    if fmt is None:
+        raise HTTPException(status_code=406, detail=f"Format {format} is not available, expected one of {', '.join(payloads.available_formats())}")
+    model_info = models[model_id]
+    arrays = get_tree_arrays(model_id)
+    if arrays is None:
+        raise HTTPException(status_code=400, detail=f"Tree structures of model {model_id} are not available")
+    
+    cache_key = (model_id, model_info["timestamp"], step, precision)
+    cached = residual_cache.get(cache_key)
+    hit = cached is not None
+    if not hit:
+        start = time.perf_counter()
+        try:
+            split = training.split_dataset({
+                "dataset_name": model_info["dataset"],
+                "target_column": model_info["target"],
+                "categorical_features": model_info.get("categorical_features"),
+                "test_size": model_info["test_size"],
+                "random_state": model_info["random_state"]
+            })
+        except KeyError as e:
+            raise HTTPException(status_code=400, detail=f"Cannot rebuild the training split of model {model_id}: {str(e)}")
+        if split.features != model_info["features"]:
+            raise HTTPException(status_code=400, detail=f"The dataset of model {model_id} has changed since training")
+        iterations = stage_iterations(arrays.n_trees // arrays.trees_per_round, step)
+        try:
+            values = {name: staged_residuals(model_id, arrays, X, y, split.categorical_indices, iterations)
+                      for name, X, y in (("train", split.X_train, split.y_train), ("test", split.X_test, split.y_test))}
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Cannot compute residuals of model {model_id}: {str(e)}")
+        
+        meta = {
+            "model_id": model_id,
+            "step": step,
+            "iterations": iterations,
+            "precision": precision,
+            "n_train": len(split.y_train),
+            "n_test": len(split.y_test),
+            "summary": {name: {"mean_abs": np.abs(value).mean(axis=1).tolist()} for name, value in values.items()}
+        }
+        if precision == "uint8":
+            scale = (min(float(value.min()) for value in values.values() if value.size),
+                     max(float(value.max()) for value in values.values() if value.size))
+            encoded = {name: quantize(value, *scale) for name, value in values.items()}
+            meta["scale"] = list(scale)
+        else:
+            encoded = {name: value.astype(np.float16) for name, value in values.items()}
+        meta["compute_time"] = time.perf_counter() - start
+        cached = (meta, encoded)
+        residual_cache.put(cache_key, cached, size=sum(array.nbytes for array in encoded.values()))
+    
+    meta, encoded = cached
+    body, media_type = payloads.encode({**meta, "cached": hit}, encoded, fmt)
+    return Response(content=body, media_type=media_type)
+
+@app.get("/models/{model_id}/history")
+def get_training_history(model_id: str, http_request: Request, points: int = HISTORY_POINTS, full: bool = False,
+                         dataset: Optional[str] = None, metric: Optional[str] = None, format: Optional[str] = None):
+    """Get the per-round evaluation metrics recorded while training a model
+
+    Every (dataset, metric) series, or those selected by dataset and metric,
+    is downsampled to at most points points with LTTB, which keeps the
+    shape of the curve, unless full is set. The summary of each series is
+    computed on all rounds: min, max, best and final values with their
+    iterations. Series are returned as <dataset>/<metric>/iteration and
+    <dataset>/<metric>/value arrays; the format is chosen as for
+    /models/{id}/trees.
+    """
+    if model_id not in models:
+        raise HTTPException(status_code=404, detail=f"Model {model_id} not found")
+    if points < 3:
+        raise HTTPException(status_code=400, detail="points must be at least 3")
+    fmt = payloads.negotiate(http_request.headers.get("accept"), format)
+    if fmt is None:
+        raise HTTPException(status_code=406, detail=f"Format {format} is not available, expected one of {', '.join(payloads.available_formats())}")
+    cache_key = (model_id, models.info[model_id]["timestamp"])
+    arrays = history_cache.get(cache_key)
+    if arrays is None:
+        arrays = models.history(model_id)
+        if arrays is None:
+            raise HTTPException(status_code=404, detail=f"No training history recorded for model {model_id}")
+        history_cache.put(cache_key, arrays, size=sum(array.nbytes for array in arrays.values()))
+    
+    iterations = arrays["iterations"]
+    series = []
+    columns = {}
+    for dataset_name, metric_name in history.series_keys(arrays):
+        if (dataset is not None and dataset_name != dataset) or (metric is not None and metric_name != metric):
+            continue
+        key = f"{dataset_name}/{metric_name}"
+        values = arrays[key]
+        higher = history.higher_is_better(metric_name)
+        valid = np.flatnonzero(~np.isnan(values))
+        selected = valid if full else valid[history.lttb(iterations[valid], values[valid], points)]
+        series.append({
+            "dataset": dataset_name,
+            "metric": metric_name,
+            "higher_is_better": higher,
+            "returned_points": len(selected),
+            **history.series_summary(iterations, values, higher)
+        })
+        columns[f"{key}/iteration"] = iterations[selected]
+        columns[f"{key}/value"] = values[selected]
+    if not series:
+        raise HTTPException(status_code=404, detail="No series match the requested dataset and metric")
+    
+    meta = {
+        "model_id": model_id,
+        "rounds": len(iterations),
+        "downsampled": not full and any(s["returned_points"] < s["n_points"] for s in series),
+        "series": series
+    }
+    body, media_type = payloads.encode(meta, columns, fmt)
+    return Response(content=body, media_type=media_type)
+
+@app.get("/models/{model_id}/prediction-cache")
+def get_model_prediction_cache(model_id: str):
+    """Get whether a model's predictions are cached and the cache's statistics"""
+    if model_id not in models:
+        raise HTTPException(status_code=404, detail=f"Model {model_id} not found")
+    cache = prediction_caches.get(model_id)
+    return {"model_id": model_id, "enabled": cache is not None, **(cache.stats() if cache is not None else {})}
+
+@app.put("/models/{model_id}/prediction-cache")
+def configure_model_prediction_cache(model_id: str, settings: PredictionCacheSettings):
+    """Enable, resize or disable the cache of a model's predictions by row hash"""
+    if model_id not in models:
+        raise HTTPException(status_code=404, detail=f"Model {model_id} not found")
+    prediction_caches.pop(model_id, None)
+    if settings.enabled:
+        prediction_caches[model_id] = PredictionCache(
+            max_entries=settings.max_entries or PREDICTION_CACHE_ENTRIES,
+            max_bytes=settings.max_bytes or PREDICTION_CACHE_BYTES
+        )
+    return get_model_prediction_cache(model_id)
+
 @app.post("/visualize-tree")
 def visualize_tree(request: TreeVisualizationRequest):
     """Get visualization data for a specific tree in the model"""
     if request.model_id not in models:
         raise HTTPException(status_code=404, detail=f"Model {request.model_id} not found")
     
-    model_info = models[request.model_id]
-    model = model_info["model"]
+    # Model info without the model object; the columnar trees usually suffice
+    model_info = models.info[request.model_id]
     
     if request.algorithm != model_info["algorithm"]:
         raise HTTPException(status_code=400, detail=f"Model algorithm mismatch: expected {model_info['algorithm']}, got {request.algorithm}")
     
+    # Get the number of trees in the model
+    arrays = get_tree_arrays(request.model_id)
+    n_trees = arrays.n_trees if arrays is not None else count_trees(request.model_id)
+    
+    if request.tree_index < 0 or request.tree_index >= n_trees:
+        raise HTTPException(status_code=400, detail=f"Tree index out of range: 0 <= {request.tree_index} < {n_trees}")
+    if request.max_depth is not None and request.max_depth < 0:
+        raise HTTPException(status_code=400, detail="max_depth must not be negative")
+    if arrays is not None and not 0 <= request.node_id < arrays.tree_size(request.tree_index):
+        raise HTTPException(status_code=400, detail=f"Node {request.node_id} not in tree {request.tree_index}")
+    
     try:
-        # Get the number of trees in the model
-        n_trees = get_n_estimators(model, request.algorithm)
-        
-        if request.tree_index < 0 or request.tree_index >= n_trees:
-            raise HTTPException(status_code=400, detail=f"Tree index out of range: 0 <= {request.tree_index} < {n_trees}")
-        
         # Get tree structure
-        tree_structure = get_tree_structure(model, request.algorithm, request.tree_index, model_info["features"])
+        if arrays is not None:
+            tree_structure = arrays.tree_structure(request.tree_index, compact=request.compact,
+                                                   max_depth=request.max_depth, node_id=request.node_id)
+        else:
+            tree_structure = get_tree_structure(models.load(request.model_id), request.algorithm, request.tree_index,
+                                                model_info["features"])
         
         return {
             "model_id": request.model_id,
@@ -424,113 +986,522 @@ def visualize_tree(request: TreeVisualizationRequest):
         logger.error(f"Error visualizing tree: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error visualizing tree: {str(e)}")
 
+@app.get("/models/{model_id}/trees")
+def get_tree_range(model_id: str, http_request: Request, start: int = 0, stop: Optional[int] = None,
+                   format: Optional[str] = None):
+    """Get trees start..stop-1 of a model as flat typed node arrays
+
+    The format is Arrow IPC, msgpack with raw array buffers or JSON, chosen
+    by the format query parameter or else the Accept header, with JSON as
+    the fallback.
+    """
+    if model_id not in models:
+        raise HTTPException(status_code=404, detail=f"Model {model_id} not found")
+    arrays = get_tree_arrays(model_id)
+    if arrays is None:
+        raise HTTPException(status_code=400, detail=f"Tree structures of model {model_id} are not available")
+    if stop is None:
+        stop = min(arrays.n_trees, start + TREE_RANGE_LIMIT)
+    if not 0 <= start < stop <= arrays.n_trees:
+        raise HTTPException(status_code=400, detail=f"Tree range out of bounds: 0 <= {start} < {stop} <= {arrays.n_trees}")
+    if stop - start > TREE_RANGE_LIMIT:
+        raise HTTPException(status_code=400, detail=f"At most {TREE_RANGE_LIMIT} trees per request")
+    fmt = payloads.negotiate(http_request.headers.get("accept"), format)
+    if fmt is None:
+        raise HTTPException(status_code=406, detail=f"Format {format} is not available, expected one of {', '.join(payloads.available_formats())}")
+
+    meta, columns = arrays.tree_slice(start, stop)
+    body, media_type = payloads.encode({"model_id": model_id, **meta}, columns, fmt)
+    return Response(content=body, media_type=media_type)
+
+@app.get("/models/{model_id}/trees/{tree_index}/nodes/{node_id}")
+def expand_tree_node(model_id: str, tree_index: int, node_id: int, max_depth: Optional[int] = TREE_DETAIL_DEPTH):
+    """Get the subtree below a node, e.g. one collapsed in a /visualize-tree response"""
+    if model_id not in models:
+        raise HTTPException(status_code=404, detail=f"Model {model_id} not found")
+    arrays = get_tree_arrays(model_id)
+    if arrays is None:
+        raise HTTPException(status_code=400, detail=f"Tree structures of model {model_id} are not available")
+    if tree_index < 0 or tree_index >= arrays.n_trees:
+        raise HTTPException(status_code=400, detail=f"Tree index out of range: 0 <= {tree_index} < {arrays.n_trees}")
+    if not 0 <= node_id < arrays.tree_size(tree_index):
+        raise HTTPException(status_code=404, detail=f"Node {node_id} not in tree {tree_index}")
+    if max_depth is not None and max_depth < 0:
+        raise HTTPException(status_code=400, detail="max_depth must not be negative")
+    return {
+        "model_id": model_id,
+        "tree_index": tree_index,
+        "node_id": node_id,
+        "tree_structure": arrays.tree_structure(tree_index, max_depth=max_depth, node_id=node_id)
+    }
+
+@app.post("/models/{model_id}/trace")
+def trace_paths(model_id: str, request: PathTraceRequest, http_request: Request, format: Optional[str] = None):
+    """Get the leaf and root-to-leaf path each row takes through every tree
+
+    Leaves come from one pred_leaf / calc_leaf_indexes call of the model's
+    library, or one vectorized pass of the compiled predictor; the paths are
+    then traced up the columnar trees. Node ids are local to each tree, as in
+    /visualize-tree. paths is (n_rows, n_trees, max depth + 1), padded with
+    -1, and path_length gives the nodes of each path. The format is chosen as
+    for /models/{id}/trees.
+    """
+    if model_id not in models:
+        raise HTTPException(status_code=404, detail=f"Model {model_id} not found")
+    if request.engine not in predictor.ENGINES:
+        raise HTTPException(status_code=400, detail=f"Unknown engine {request.engine}, expected one of {', '.join(predictor.ENGINES)}")
+    arrays = get_tree_arrays(model_id)
+    if arrays is None:
+        raise HTTPException(status_code=400, detail=f"Tree structures of model {model_id} are not available")
+    fmt = payloads.negotiate(http_request.headers.get("accept"), format)
+    if fmt is None:
+        raise HTTPException(status_code=406, detail=f"Format {format} is not available, expected one of {', '.join(payloads.available_formats())}")
+    model_info = models.info[model_id]
+    features = model_info["features"]
+    try:
+        X = predictor.rows_to_matrix(request.rows, features)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    start = time.perf_counter()
+    if request.engine == "compiled":
+        compiled = get_compiled_predictor(model_id)
+        if compiled is None:
+            raise HTTPException(status_code=400, detail=f"The compiled engine does not support model {model_id}")
+        leaves = compiled.leaves(X)
+    else:
+        categorical_indices = [features.index(col) for col in model_info.get("categorical_features") or []
+                               if col in features]
+        try:
+            native = predictor.native_leaves(models.load(model_id), arrays.algorithm, X, categorical_indices,
+                                             arrays.trees_per_round)
+            leaves = arrays.leaf_nodes(native)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Cannot trace paths of model {model_id}: {str(e)}")
+    paths, lengths = arrays.paths(leaves)
+    trace_time = time.perf_counter() - start
+    
+    meta = {
+        "model_id": model_id,
+        "engine": request.engine,
+        "n_rows": len(X),
+        "n_trees": arrays.n_trees,
+        "trace_time": trace_time
+    }
+    columns = {
+        "leaves": (leaves - arrays.tree_offsets[:-1]).astype(np.int32),
+        "leaf_values": arrays.value[leaves],
+        "paths": paths,
+        "path_length": lengths.astype(np.int32)
+    }
+    body, media_type = payloads.encode(meta, columns, fmt)
+    return Response(content=body, media_type=media_type)
+
 @app.get("/compare-algorithms")
-def compare_algorithms(dataset_name: str, aspect: str = "accuracy"):
-    """Compare the performance of XGBoost, LightGBM, and CatBoost on a specific dataset"""
+def compare_algorithms(dataset_name: str, aspect: str = "accuracy", target_column: str = "target",
+                       task_type: Optional[str] = None):
+    """Compare the performance of XGBoost, LightGBM, and CatBoost on a specific dataset
+
+    The libraries are benchmarked on the first request for a dataset version;
+    later requests are answered from the benchmark cache.
+    """
     if dataset_name not in datasets:
         raise HTTPException(status_code=404, detail=f"Dataset {dataset_name} not found")
-    
-    # For demo purposes, return mock comparison data
-    mock_results = {
+    df = datasets[dataset_name]
+    if target_column not in df.columns:
+        raise HTTPException(status_code=400, detail=f"Column {target_column} not found in {dataset_name}")
+    task_type = task_type or benchmark.infer_task_type(df[target_column])
+
+    results = run_benchmark(dataset_name, target_column, task_type)
+    algorithms = [name for name in ["xgboost", "lightgbm", "catboost"] if name in results["algorithms"]]
+    if not algorithms:
+        raise HTTPException(status_code=503, detail="No gradient boosting library is installed")
+
+    comparison = {
         "aspect": aspect,
         "dataset": dataset_name,
-        "xgboost": random.uniform(0.8, 0.95) if aspect == "accuracy" else {
-            "training": random.uniform(0.5, 3.0),
-            "inference": random.uniform(0.05, 0.2)
-        },
-        "lightgbm": random.uniform(0.8, 0.95) if aspect == "accuracy" else {
-            "training": random.uniform(0.3, 2.0),
-            "inference": random.uniform(0.03, 0.15)
-        },
-        "catboost": random.uniform(0.8, 0.95) if aspect == "accuracy" else {
-            "training": random.uniform(0.7, 3.5),
-            "inference": random.uniform(0.04, 0.18)
-        }
+        "task_type": task_type,
+        "cached": results["cached"],
+        "benchmark": results
     }
-    
+    # Per-algorithm values in the shape the comparison charts expect
+    for name in algorithms:
+        result = results["algorithms"][name]
+        if aspect == "accuracy":
+            comparison[name] = result["metrics"]["accuracy" if task_type == "classification" else "rmse"]
+        elif aspect == "speed":
+            comparison[name] = {
+                "training": result["train_time"]["median"],
+                "inference": result["batch_latency_ms"]["p50"] / 1000.0
+            }
+        elif aspect == "memory":
+            comparison[name] = result["memory_peak_mb"]
+        else:
+            comparison[name] = result
+
     # Determine winner based on aspect
     if aspect == "accuracy":
-        winner = max(["xgboost", "lightgbm", "catboost"], key=lambda x: mock_results[x])
+        if task_type == "classification":
+            winner = max(algorithms, key=lambda x: comparison[x])
+        else:
+            winner = min(algorithms, key=lambda x: comparison[x])
     elif aspect == "speed":
-        winner = min(["xgboost", "lightgbm", "catboost"], key=lambda x: mock_results[x]["training"])
+        winner = min(algorithms, key=lambda x: comparison[x]["training"])
+    elif aspect == "memory":
+        winner = min(algorithms, key=lambda x: comparison[x])
     else:
         winner = "catboost" if aspect == "categorical" else "lightgbm"
+
+    comparison["winner"] = winner
+
+    return comparison
+
+@app.get("/cache/benchmarks")
+def get_benchmark_cache_stats():
+    """Get hit/miss counters and occupancy of the benchmark cache"""
+    return benchmark_cache.stats()
+
+# Helper functions
+def validate_training_request(request):
+    """Reject training requests referring to unknown datasets, columns or models"""
+    if request.dataset_name not in datasets:
+        raise HTTPException(status_code=404, detail=f"Dataset {request.dataset_name} not found")
+    if request.target_column not in datasets[request.dataset_name].columns:
+        raise HTTPException(status_code=400, detail=f"Column {request.target_column} not found in {request.dataset_name}")
+    if request.base_model_id is not None and request.base_model_id not in models:
+        raise HTTPException(status_code=404, detail=f"Model {request.base_model_id} not found")
+    if request.early_stopping_rounds is not None and request.early_stopping_rounds < 1:
+        raise HTTPException(status_code=400, detail="early_stopping_rounds must be at least 1")
+    if request.max_seconds is not None and request.max_seconds <= 0:
+        raise HTTPException(status_code=400, detail="max_seconds must be positive")
+
+def submit_training(request, staged_step=None):
+    """Queue a training job, or complete it immediately from the training cache"""
+    training_request = request.dict(exclude={"step"})
+    
+    # Continue boosting from the base model when only the number of rounds grew
+    warm_start = None
+    if request.base_model_id is not None:
+        base_info = models[request.base_model_id]
+        rounds = training.warm_start_rounds(training_request, base_info)
+        if rounds is not None:
+            warm_start = {
+                "model": base_info["model"],
+                "model_id": request.base_model_id,
+                "base_rounds": rounds[0],
+                "added_rounds": rounds[1]
+            }
+        else:
+            logger.info(f"Model {request.base_model_id} is not compatible with the request, training from scratch")
+    
+    # Serve identical trainings on identical data from the cache
+    cache_key = training_cache_key(training_request, training.dataset_hashes[request.dataset_name],
+                                   training.DEFAULT_PARAMS.get(request.algorithm, {}), warm_start)
+    cached = training_cache.get(cache_key)
+    if cached is not None and cached["model_id"] in models:
+        payload = {**cached, "cached": True}
+        if staged_step is not None:
+            # The model exists already, so only the staged predictions are needed
+            model_info = models[cached["model_id"]]
+            payload["staged_metrics"] = staged_metrics(model_info["model"], model_info["algorithm"],
+                                                       model_info["task_type"], training.split_dataset(training_request),
+                                                       staged_step)
+        job_id = job_manager.add_completed(payload, kind="train")
+        return {
+            "job_id": job_id,
+            "model_id": cached["model_id"],
+            "status": "completed",
+            "cached": True,
+            "result": payload
+        }
+    
+    # Generate unique job and model IDs
+    job_id = uuid.uuid4().hex[:12]
+    model_id = f"{request.algorithm}_{int(time.time())}_{job_id[:6]}"
     
-    mock_results["winner"] = winner
+    def store_model(result):
+        # Keep the trained model in memory and expose only the payload on the job
+        models[model_id] = result["model_info"]
+        if result.get("history") is not None:
+            models.put_history(model_id, result["history"])
+        payload = result["payload"]
+        if payload["stopped"] is None:
+            # Staged metrics depend on the step, so they are not part of the cached result
+            cached_payload = {key: value for key, value in payload.items() if key != "staged_metrics"}
+            training_cache.put(cache_key, cached_payload, size=len(json.dumps(cached_payload)))
+        return payload
     
-    return mock_results
+    job_manager.submit(training.train_model, model_id, training_request, warm_start, staged_step,
+                       kind="train", on_complete=store_model, job_id=job_id)
+    
+    return {
+        "job_id": job_id,
+        "model_id": model_id,
+        "status": "queued",
+        "cached": False
+    }
 
-# Helper functions
-def get_feature_importance(model, algorithm, feature_names):
-    """Extract feature importance from the model"""
+def get_tree_arrays(model_id):
+    """Columnar trees of a stored model, converted once and cached; None if not supported"""
+    arrays = tree_cache.get(model_id)
+    if arrays is None:
+        model_info = models[model_id]
+        if not trees.supports(model_info["algorithm"]) or isinstance(model_info["model"], training.MockModel):
+            return None
+        try:
+            arrays = trees.extract_tree_arrays(model_info["model"], model_info["algorithm"], model_info["features"])
+        except Exception as e:
+            logger.error(f"Error converting trees of {model_id}: {str(e)}")
+            return None
+        tree_cache.put(model_id, arrays, size=arrays.nbytes)
+    return arrays
+
+def get_compiled_predictor(model_id):
+    """NumPy predictor of a stored model, compiled once and cached; None if not supported"""
+    compiled = predictor_cache.get(model_id)
+    if compiled is None:
+        arrays = get_tree_arrays(model_id)
+        if arrays is None:
+            return None
+        try:
+            compiled = predictor.CompiledPredictor(arrays, objective_name(models.load(model_id), arrays.algorithm))
+        except ValueError as e:
+            logger.info(f"Cannot compile a predictor for {model_id}: {str(e)}")
+            return None
+        predictor_cache.put(model_id, compiled, size=compiled.nbytes)
+    return compiled
+
+def prediction_function(model_id, engine, output_margin):
+    """(predict_rows, classes) for scoring float32 feature matrices with a stored model
+
+    predict_rows returns probabilities, values or margins; classes is the
+    array of class labels for classifier probabilities and None otherwise.
+    Unusable models and engines are rejected up front.
+    """
+    if model_id not in models:
+        raise HTTPException(status_code=404, detail=f"Model {model_id} not found")
+    if engine not in predictor.ENGINES:
+        raise HTTPException(status_code=400, detail=f"Unknown engine {engine}, expected one of {', '.join(predictor.ENGINES)}")
+    model_info = models.info[model_id]
+    algorithm = model_info["algorithm"]
+    if algorithm not in trees.CONVERTERS:
+        raise HTTPException(status_code=400, detail=f"Predictions are not supported for {algorithm} models")
+    
+    if engine == "compiled":
+        compiled = get_compiled_predictor(model_id)
+        if compiled is None:
+            raise HTTPException(status_code=400, detail=f"The compiled engine does not support model {model_id}")
+        predict_rows = lambda X: compiled.predict(X, output_margin=output_margin)
+    else:
+        if isinstance(models.load(model_id), training.MockModel):
+            raise HTTPException(status_code=400, detail=f"Model {model_id} cannot make predictions")
+        categorical_indices = [model_info["features"].index(col) for col in model_info.get("categorical_features") or []
+                               if col in model_info["features"]]
+        # Loaded per call, so the model may be evicted between chunks of a long stream
+        predict_rows = lambda X: predictor.native_predict(models.load(model_id), algorithm, model_info["task_type"], X,
+                                                          categorical_indices, output_margin=output_margin)
+    
+    classes = model_info.get("classes")
+    classes = np.asarray(classes) if model_info["task_type"] == "classification" and classes and not output_margin else None
+    return predict_rows, classes
+
+def prediction_result(prediction, classes):
+    """JSON-ready predictions, with the predicted labels for classifiers"""
+    prediction = np.asarray(prediction)
+    result = {"predictions": prediction.tolist()}
+    if classes is not None:
+        indices = np.argmax(prediction, axis=1) if prediction.ndim == 2 else (prediction > 0.5).astype(int)
+        result["classes"] = classes.tolist()
+        result["labels"] = classes[indices].tolist()
+    return result
+
+def prediction_scorer(model_id, engine, output_margin):
+    """Function scoring a float32 feature matrix into a prediction_result with its scoring time"""
+    predict_rows, classes = prediction_function(model_id, engine, output_margin)
+    
+    def score(X):
+        start = time.perf_counter()
+        prediction = predict_rows(X)
+        return {**prediction_result(prediction, classes), "predict_time": time.perf_counter() - start}
+    
+    return score
+
+def get_row_predictor(model_id, output_margin):
+    """Single-row fast path of a stored model, built once and cached"""
+    key = (model_id, output_margin)
+    fast = row_predictor_cache.get(key)
+    if fast is None:
+        model_info = models[model_id]
+        if model_info["algorithm"] not in trees.CONVERTERS or isinstance(model_info["model"], training.MockModel):
+            raise HTTPException(status_code=400, detail=f"Model {model_id} cannot make predictions")
+        features = model_info["features"]
+        categorical_indices = [features.index(col) for col in model_info.get("categorical_features") or [] if col in features]
+        compiled = get_compiled_predictor(model_id) if model_info["algorithm"] == "catboost" else None
+        fast = predictor.row_predictor(model_info["model"], model_info["algorithm"], model_info["task_type"], features,
+                                       categorical_indices, compiled, output_margin)
+        row_predictor_cache.put(key, fast, size=1)
+    return fast
+
+def get_prediction_cache(model_id):
+    """The model's prediction cache, or None when its predictions are not cached"""
+    cache = prediction_caches.get(model_id)
+    if cache is None and PREDICTION_CACHE_DEFAULT:
+        cache = prediction_caches.setdefault(model_id, PredictionCache(PREDICTION_CACHE_ENTRIES, PREDICTION_CACHE_BYTES))
+    return cache
+
+def invalidate_model_caches(model_id, reason):
+    """Drop what was derived from a model once it is evicted from memory or replaced"""
+    cache = prediction_caches.get(model_id)
+    if cache is not None:
+        cache.clear()
+    for output_margin in (False, True):
+        # Fast paths hold the model object and would keep it in memory
+        row_predictor_cache.pop((model_id, output_margin))
+    explainer_cache.pop(model_id)
+    if reason == "replaced":
+        tree_cache.pop(model_id)
+        predictor_cache.pop(model_id)
+        for engine in predictor.ENGINES:
+            for output_margin in (False, True):
+                batchers.pop((model_id, engine, output_margin))
+
+def staged_residuals(model_id, arrays, X, y, categorical_indices, iterations):
+    """(n_stages, n_rows) float32 residuals of the rows of X after each iteration
+
+    Rows are processed in chunks that bound the (row, tree) and (row, stage)
+    arrays, like the compiled predictor's.
+    """
+    model_info = models.info[model_id]
+    model = models.load(model_id)
+    objective = objective_name(model, arrays.algorithm)
+    classes = np.asarray(model_info["classes"]) if model_info["task_type"] == "classification" else None
+    result = np.empty((len(iterations), len(X)), dtype=np.float32)
+    chunk = max(1, predictor.CHUNK_PAIRS // max(arrays.n_trees, len(iterations) * arrays.trees_per_round))
+    for start in range(0, len(X), chunk):
+        rows = X[start:start + chunk]
+        native = predictor.native_leaves(model, arrays.algorithm, rows, categorical_indices, arrays.trees_per_round)
+        margins = arrays.staged_margins(arrays.leaf_nodes(native), iterations)
+        for stage, margin in enumerate(margins):
+            margin = margin[:, 0] if arrays.trees_per_round == 1 else margin
+            result[stage, start:start + chunk] = residuals(y[start:start + chunk], margin_to_prediction(margin, objective),
+                                                           model_info["task_type"], classes)
+    return result
+
+def get_explainer(model_id):
+    """shap.TreeExplainer of a stored model, built once and cached"""
+    explainer = explainer_cache.get(model_id)
+    if explainer is None:
+        explainer = explain.shap_explainer(models.load(model_id), models.info[model_id]["algorithm"])
+        explainer_cache.put(model_id, explainer, size=1)
+    return explainer
+
+def explanation_result(contributions, model_info):
+    """JSON-ready per-row contributions laid out as by explain.native_contributions
+
+    Single-output models get n_features contributions per row and a scalar
+    base value; multi-output models an outputs axis first, named by outputs
+    (the classes of multiclass classifiers). Rows left unexplained by a
+    cancelled job are None.
+    """
+    explained = [c for c in contributions if c is not None]
+    n_outputs = explained[0].shape[0] if explained else 1
+    result = {"features": model_info["features"]}
+    if n_outputs == 1:
+        result["contributions"] = [None if c is None else c[0, :-1].tolist() for c in contributions]
+        result["base_value"] = float(explained[0][0, -1]) if explained else None
+    else:
+        classes = model_info.get("classes")
+        result["outputs"] = classes if classes and len(classes) == n_outputs else list(range(n_outputs))
+        result["contributions"] = [None if c is None else c[:, :-1].tolist() for c in contributions]
+        result["base_value"] = explained[0][:, -1].tolist()
+    return result
+
+def get_batcher(model_id, engine, output_margin, predict_rows):
+    """Micro-batcher shared by the requests for a model, engine and output"""
+    key = (model_id, engine, output_margin)
+    batcher = batchers.get(key)
+    if batcher is None:
+        batcher = batching.MicroBatcher(predict_rows)
+        batchers.put(key, batcher, size=1)
+    return batcher
+
+async def csv_body_chunks(http_request, features, chunk_size):
+    """Feature chunks parsed from a CSV request body as it arrives"""
+    chunker = predictor.CSVChunker(features, chunk_size)
+    async for data in http_request.stream():
+        # Parsing runs off the event loop; a body piece completes at most a few chunks
+        for X in await run_in_threadpool(lambda: list(chunker.feed(data))):
+            yield X
+    for X in await run_in_threadpool(lambda: list(chunker.close())):
+        yield X
+
+async def arrow_body_chunks(http_request, features, chunk_size):
+    """Feature chunks read from an Arrow IPC stream request body
+
+    The body is spooled to a temporary file, on disk beyond
+    PREDICT_SPOOL_BYTES, and its record batches read back one at a time.
+    """
+    with tempfile.SpooledTemporaryFile(max_size=PREDICT_SPOOL_BYTES) as spool:
+        async for data in http_request.stream():
+            spool.write(data)
+        spool.seek(0)
+        chunks = predictor.arrow_chunks(spool, features, chunk_size)
+        while True:
+            X = await run_in_threadpool(next, chunks, None)
+            if X is None:
+                break
+            yield X
+
+async def stream_predictions(model_id, engine, chunks, score):
+    """NDJSON records for each scored chunk, then a summary with the throughput"""
+    start = time.perf_counter()
+    n_rows = 0
+    n_chunks = 0
+    predict_time = 0.0
+    classes = None
+    error = None
     try:
-        # For mock model or unavailable libraries
-        if not any([XGBOOST_AVAILABLE, LIGHTGBM_AVAILABLE, CATBOOST_AVAILABLE]):
-            # Generate random feature importances
-            importances = np.random.rand(len(feature_names))
-            total = sum(importances)
-            importances = [imp/total for imp in importances]
-            return [{"feature": feature, "importance": imp} for feature, imp in zip(feature_names, importances)]
-            
-        if algorithm == "xgboost" and XGBOOST_AVAILABLE:
-            # Get feature importance
-            try:
-                importance = model.get_score(importance_type='gain')
-                # Convert to array format
-                result = []
-                for feature in feature_names:
-                    if feature in importance:
-                        result.append({"feature": feature, "importance": importance[feature]})
-                    else:
-                        result.append({"feature": feature, "importance": 0})
-                return result
-            except:
-                # Fall back to feature_importances_ attribute
-                if hasattr(model, 'feature_importances_'):
-                    return [{"feature": feature, "importance": imp} 
-                            for feature, imp in zip(feature_names, model.feature_importances_)]
-            
-        elif algorithm == "lightgbm" and LIGHTGBM_AVAILABLE:
-            try:
-                importance = model.feature_importance(importance_type='gain')
-                return [{"feature": feature, "importance": imp} for feature, imp in zip(feature_names, importance)]
-            except:
-                # Fall back to feature_importances_ attribute
-                if hasattr(model, 'feature_importances_'):
-                    return [{"feature": feature, "importance": imp} 
-                            for feature, imp in zip(feature_names, model.feature_importances_)]
-            
-        elif algorithm == "catboost" and CATBOOST_AVAILABLE:
-            try:
-                importance = model.get_feature_importance()
-                return [{"feature": feature, "importance": imp} for feature, imp in zip(feature_names, importance)]
-            except:
-                # Fall back to feature_importances_ attribute
-                if hasattr(model, 'feature_importances_'):
-                    return [{"feature": feature, "importance": imp} 
-                            for feature, imp in zip(feature_names, model.feature_importances_)]
-        
-        # If we get here, generate mock importances
-        importances = np.random.rand(len(feature_names))
-        total = sum(importances)
-        importances = [imp/total for imp in importances]
-        return [{"feature": feature, "importance": imp} for feature, imp in zip(feature_names, importances)]
-            
-    except Exception as e:
-        logger.error(f"Error getting feature importance: {str(e)}")
-        # Return mock data in case of error
-        importances = np.random.rand(len(feature_names))
-        total = sum(importances)
-        importances = [imp/total for imp in importances]
-        return [{"feature": feature, "importance": imp} for feature, imp in zip(feature_names, importances)]
+        async for X in chunks:
+            result = await run_in_threadpool(score, X)
+            classes = result.pop("classes", None)
+            predict_time += result.pop("predict_time")
+            yield json.dumps({"chunk": n_chunks, "start": n_rows, "n_rows": len(X), **result}) + "\n"
+            n_rows += len(X)
+            n_chunks += 1
+    except ValueError as e:
+        # The response has started, so errors are reported in-band
+        error = str(e)
+        yield json.dumps({"error": error}) + "\n"
+    elapsed = time.perf_counter() - start
+    summary = {
+        "model_id": model_id,
+        "engine": engine,
+        "n_rows": n_rows,
+        "n_chunks": n_chunks,
+        "elapsed": elapsed,
+        "predict_time": predict_time,
+        "rows_per_second": n_rows / elapsed if elapsed > 0 else None,
+        "completed": error is None
+    }
+    if classes is not None:
+        summary["classes"] = classes
+    yield json.dumps({"summary": summary}) + "\n"
+
+def count_trees(model_id):
+    """Number of trees of a stored model"""
+    arrays = get_tree_arrays(model_id)
+    if arrays is not None:
+        return arrays.n_trees
+    model_info = models[model_id]
+    return get_n_estimators(model_info["model"], model_info["algorithm"])
 
 def get_n_estimators(model, algorithm):
     """Get the number of trees in the model"""
     try:
         if algorithm == "xgboost" and XGBOOST_AVAILABLE:
-            return model.best_ntree_limit if hasattr(model, 'best_ntree_limit') else len(model.get_booster().get_dump())
+            return len(model.get_dump())
         elif algorithm == "lightgbm" and LIGHTGBM_AVAILABLE:
-            return model.n_estimators_
+            return model.num_trees()
         elif algorithm == "catboost" and CATBOOST_AVAILABLE:
             return model.tree_count_
         elif hasattr(model, 'n_estimators'):
@@ -548,7 +1519,7 @@ def get_tree_structure(model, algorithm, tree_index, feature_names):
         if algorithm == "xgboost" and XGBOOST_AVAILABLE:
             # Get the tree dump
             try:
-                tree_dump = model.get_booster().get_dump(dump_format='json')
+                tree_dump = model.get_dump(dump_format='json')
                 if tree_index < len(tree_dump):
                     return json.loads(tree_dump[tree_index])
                 else:
@@ -560,15 +1531,15 @@ def get_tree_structure(model, algorithm, tree_index, feature_names):
         elif algorithm == "lightgbm" and LIGHTGBM_AVAILABLE:
             # LightGBM tree structure
             try:
-                tree_info = model.booster_.dump_model()['tree_info'][tree_index]
+                tree_info = model.dump_model()['tree_info'][tree_index]
                 return tree_info
             except:
                 # Mock tree for demo
                 return create_mock_tree(feature_names)
             
         elif algorithm == "catboost" and CATBOOST_AVAILABLE:
-            # CatBoost tree structure is more complex
-            # For simplicity, return a mock tree for demo
+            # CatBoost trees are served from the columnar arrays; only reached
+            # if their conversion failed
             return create_mock_tree(feature_names)
             
         else:
@@ -609,6 +1580,53 @@ def create_mock_tree(feature_names):
         "leaf_count": max_nodes // 2 + 1
     }
 
+def run_benchmark(dataset_name, target_column, task_type):
+    """Benchmark every installed library on a dataset, or return the cached benchmark
+
+    The libraries run concurrently on the worker pool, each limited to an
+    equal share of the CPU budget.
+    """
+    cache_key = (dataset_name, training.dataset_hashes[dataset_name], target_column, task_type)
+    with benchmark_lock:
+        cached = benchmark_cache.get(cache_key)
+        if cached is not None:
+            return {**cached, "cached": True}
+
+        algorithms = [name for name in ["xgboost", "lightgbm", "catboost"] if training.is_available(name)]
+        threads = benchmark.fair_thread_share(len(algorithms), job_manager.cpu_budget.cores)
+        request = {
+            "dataset_name": dataset_name,
+            "target_column": target_column,
+            "categorical_features": None,
+            "test_size": 0.2,
+            "random_state": 42,
+            "task_type": task_type
+        }
+        job_ids = [job_manager.submit(benchmark.benchmark_algorithm, name, request, kind="benchmark", threads=threads)
+                   for name in algorithms]
+        jobs = job_manager.wait(job_ids)
+        if jobs is None:
+            raise HTTPException(status_code=503, detail="Benchmark interrupted by shutdown")
+        failed = [job for job in jobs if job["status"] != "completed"]
+        if failed:
+            raise HTTPException(status_code=500, detail=f"Benchmark {failed[0]['status']}: {failed[0]['error']}")
+
+        results = {
+            "dataset_hash": cache_key[1],
+            "target_column": target_column,
+            "threads_per_algorithm": threads,
+            "settings": {
+                "warmup_runs": benchmark.WARMUP_RUNS,
+                "train_repeats": benchmark.TRAIN_REPEATS,
+                "batch_repeats": benchmark.BATCH_REPEATS,
+                "single_row_repeats": benchmark.SINGLE_ROW_REPEATS
+            },
+            "timestamp": time.time(),
+            "algorithms": {job["result"]["algorithm"]: job["result"] for job in jobs}
+        }
+        benchmark_cache.put(cache_key, results, size=len(json.dumps(results)))
+        return {**results, "cached": False}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,130 @@
+"""Micro-batching of concurrent prediction requests"""
+import asyncio
+import bisect
+import os
+import threading
+import time
+
+import numpy as np
+
+# How long the first request of a batch waits for others to join
+BATCH_WINDOW_MS = float(os.environ.get("PREDICT_BATCH_WINDOW_MS", 2.0))
+# Rows that trigger a batch before the window ends; larger requests are not batched
+MAX_BATCH_SIZE = int(os.environ.get("PREDICT_MAX_BATCH_SIZE", 256))
+
+# Histogram bucket upper bounds; an extra bucket counts everything above the last
+QUEUE_WAIT_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 25, 50, 100, 250, 1000)
+
+class Histogram:
+    """Counts of observations per bucket, by upper bound, with their sum"""
+    def __init__(self, bounds):
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        with self.lock:
+            self.counts[bisect.bisect_left(self.bounds, value)] += 1
+            self.count += 1
+            self.sum += value
+
+    def stats(self):
+        with self.lock:
+            buckets = [{"le": bound, "count": count} for bound, count in zip(self.bounds, self.counts)]
+            buckets.append({"le": None, "count": self.counts[-1]})
+            return {
+                "count": self.count,
+                "sum": self.sum,
+                "mean": self.sum / self.count if self.count else 0.0,
+                "buckets": buckets
+            }
+
+def batch_size_buckets(max_batch_size):
+    """Powers of two up to the maximum batch size"""
+    bounds = [1]
+    while bounds[-1] < max_batch_size:
+        bounds.append(min(bounds[-1] * 2, max_batch_size))
+    return bounds
+
+class MicroBatcher:
+    """Coalesce concurrent predictions for one model into vectorized calls
+
+    The first request to arrive opens a batch that is scored once window
+    seconds have passed or once max_batch_size rows have joined, whichever
+    comes first. predict_rows runs in the event loop's default executor and
+    its output is split back into the rows of each request. Must be used
+    from a single event loop.
+    """
+    def __init__(self, predict_rows, window=BATCH_WINDOW_MS / 1000.0, max_batch_size=MAX_BATCH_SIZE):
+        self.predict_rows = predict_rows
+        self.window = window
+        self.max_batch_size = max_batch_size
+        # (rows, future, enqueue time) of the open batch
+        self.pending = []
+        self.pending_rows = 0
+        self.timer = None
+        self.running = set()
+        self.batch_sizes = Histogram(batch_size_buckets(max_batch_size))
+        self.queue_waits = Histogram(QUEUE_WAIT_BUCKETS_MS)
+
+    async def predict(self, X):
+        """Predictions for the rows of X, scored together with concurrent requests
+
+        Returns (prediction, info) where info describes the batch the rows
+        were scored in.
+        """
+        loop = asyncio.get_running_loop()
+        if self.pending_rows and self.pending_rows + len(X) > self.max_batch_size:
+            self._flush()
+        future = loop.create_future()
+        self.pending.append((X, future, time.perf_counter()))
+        self.pending_rows += len(X)
+        if self.pending_rows >= self.max_batch_size:
+            self._flush()
+        elif self.timer is None:
+            self.timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def stats(self):
+        return {
+            "window_ms": self.window * 1000.0,
+            "max_batch_size": self.max_batch_size,
+            "pending_rows": self.pending_rows,
+            "batch_size": self.batch_sizes.stats(),
+            "queue_wait_ms": self.queue_waits.stats()
+        }
+
+    def _flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        batch, self.pending, self.pending_rows = self.pending, [], 0
+        if batch:
+            # Keep a reference so the task is not garbage collected while running
+            task = asyncio.ensure_future(self._run(batch))
+            self.running.add(task)
+            task.add_done_callback(self.running.discard)
+
+    async def _run(self, batch):
+        started = time.perf_counter()
+        for _, _, enqueued in batch:
+            self.queue_waits.observe((started - enqueued) * 1000.0)
+        X = batch[0][0] if len(batch) == 1 else np.concatenate([rows for rows, _, _ in batch])
+        self.batch_sizes.observe(len(X))
+        try:
+            prediction = np.asarray(await asyncio.get_running_loop().run_in_executor(None, self.predict_rows, X))
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        info = {"batch_size": len(X), "batch_requests": len(batch), "predict_time": time.perf_counter() - started}
+        offset = 0
+        for rows, future, enqueued in batch:
+            # Waiting requests may have been cancelled by a client disconnect
+            if not future.done():
+                future.set_result((prediction[offset:offset + len(rows)],
+                                   {**info, "queue_wait": started - enqueued}))
+            offset += len(rows)
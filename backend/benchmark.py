@@ -0,0 +1,158 @@
+"""Side-by-side benchmark of the boosting libraries on one dataset"""
+import numpy as np
+import os
+import resource
+import threading
+import time
+
+from training import (DEFAULT_PARAMS, native_params, fit_model, predict_test,
+                      prediction_metrics, split_dataset)
+
+from splits import catboost_frame
+from predictor import row_predictor
+
+# Untimed runs before measuring, so imports, allocations and caches are warm
+WARMUP_RUNS = int(os.environ.get("BENCHMARK_WARMUP_RUNS", 1))
+# Timed training runs; the median is reported
+TRAIN_REPEATS = int(os.environ.get("BENCHMARK_TRAIN_REPEATS", 3))
+# Timed predictions of the whole test set
+BATCH_REPEATS = int(os.environ.get("BENCHMARK_BATCH_REPEATS", 20))
+# Timed single-row predictions, cycling through the test set
+SINGLE_ROW_REPEATS = int(os.environ.get("BENCHMARK_SINGLE_ROW_REPEATS", 200))
+
+LATENCY_PERCENTILES = (50, 95, 99)
+
+def infer_task_type(y):
+    """Classification for targets holding a few integer labels, regression otherwise"""
+    values = y.dropna().to_numpy()
+    if values.dtype.kind in "biu" or (values.dtype.kind == "f" and np.all(np.mod(values, 1) == 0)):
+        if len(np.unique(values)) <= max(2, min(20, len(values) // 10)):
+            return "classification"
+    return "regression"
+
+def fair_thread_share(n_runs, cores):
+    """Threads per concurrent run when cores are split evenly"""
+    return max(1, cores // max(1, n_runs))
+
+def current_rss():
+    """Resident set size of this process in bytes"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # No procfs: fall back to the lifetime peak, which only ever grows
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+class PeakMemorySampler:
+    """Track the peak resident memory above the starting level while active
+
+    Native libraries allocate outside the Python heap, so the process RSS is
+    sampled from a background thread instead of using tracemalloc.
+    """
+    def __init__(self, interval=0.002):
+        self.interval = interval
+        self.baseline = 0
+        self.peak = 0
+        self.done = threading.Event()
+        self.thread = threading.Thread(target=self._sample, daemon=True)
+
+    def __enter__(self):
+        self.baseline = self.peak = current_rss()
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.done.set()
+        self.thread.join()
+        self.peak = max(self.peak, current_rss())
+
+    @property
+    def peak_bytes(self):
+        return max(0, self.peak - self.baseline)
+
+    def _sample(self):
+        while not self.done.wait(self.interval):
+            self.peak = max(self.peak, current_rss())
+
+def latency_summary(seconds):
+    """Percentiles and mean of a list of timings, in milliseconds"""
+    millis = np.asarray(seconds) * 1000.0
+    summary = {f"p{q}": float(np.percentile(millis, q)) for q in LATENCY_PERCENTILES}
+    summary["mean"] = float(millis.mean())
+    return summary
+
+def predict_rows(model, algorithm, X, categorical_indices):
+    """Predict raw float32 feature rows the way a serving path would"""
+    if algorithm == "xgboost":
+        return model.inplace_predict(X)
+    elif algorithm == "lightgbm":
+        return model.predict(X)
+    elif algorithm == "catboost":
+        if categorical_indices:
+            return model.predict(catboost_frame(X, model.feature_names_, categorical_indices))
+        return model.predict(X)
+    raise ValueError(f"Unsupported algorithm: {algorithm}")
+
+def benchmark_algorithm(progress, algorithm, request, threads):
+    """Benchmark one library on a dataset split; runs inside a pool worker
+
+    request holds dataset_name, target_column, categorical_features, test_size,
+    random_state and task_type. Training uses the default parameters with the
+    threads granted by the job manager, so concurrently benchmarked libraries
+    share the machine evenly.
+    """
+    split = split_dataset(request)
+    task_type = request["task_type"]
+    params, rounds = native_params(algorithm, DEFAULT_PARAMS[algorithm], task_type, len(split.classes),
+                                   request["random_state"], threads)
+    total = WARMUP_RUNS + TRAIN_REPEATS
+
+    # Warm-up runs also build the split's cached training containers
+    for run in range(WARMUP_RUNS):
+        fit_model(algorithm, split, task_type, params, rounds)
+        progress.update(run + 1, total)
+
+    train_times = []
+    with PeakMemorySampler() as memory:
+        for run in range(TRAIN_REPEATS):
+            start = time.perf_counter()
+            model = fit_model(algorithm, split, task_type, params, rounds)
+            train_times.append(time.perf_counter() - start)
+            progress.update(WARMUP_RUNS + run + 1, total)
+
+    classes = split.classes if task_type == "classification" else None
+    metrics = prediction_metrics(split.y_test, predict_test(model, algorithm, split, task_type, params),
+                                 task_type, classes)
+
+    X = split.X_test
+    predict_rows(model, algorithm, X, split.categorical_indices)
+    batch_times = []
+    for _ in range(BATCH_REPEATS):
+        start = time.perf_counter()
+        predict_rows(model, algorithm, X, split.categorical_indices)
+        batch_times.append(time.perf_counter() - start)
+
+    # Single rows go through the serving fast path
+    fast = row_predictor(model, algorithm, task_type, split.features, split.categorical_indices)
+    rows = [X[i % len(X)] for i in range(SINGLE_ROW_REPEATS)]
+    fast.predict(rows[0])
+    single_times = []
+    for row in rows:
+        start = time.perf_counter()
+        fast.predict(row)
+        single_times.append(time.perf_counter() - start)
+
+    return {
+        "algorithm": algorithm,
+        "threads": threads,
+        "rounds": rounds,
+        "train_time": {
+            "median": float(np.median(train_times)),
+            "min": float(np.min(train_times)),
+            "runs": [float(t) for t in train_times]
+        },
+        "batch_latency_ms": {**latency_summary(batch_times), "rows": len(X)},
+        "single_row_latency_ms": latency_summary(single_times),
+        "memory_peak_mb": memory.peak_bytes / (1024 * 1024),
+        "metrics": metrics
+    }
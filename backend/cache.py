@@ -0,0 +1,152 @@
+"""Bounded in-memory caches"""
+from collections import OrderedDict
+import hashlib
+import json
+import threading
+
+import numpy as np
+
+class LRUCache:
+    """Least-recently-used cache bounded by entry count and estimated bytes"""
+    def __init__(self, max_entries, max_bytes, on_evict=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        self.entries = OrderedDict()
+        self.sizes = {}
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.RLock()
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+    def put(self, key, value, size):
+        """Insert value with its estimated size in bytes, evicting old entries as needed"""
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            if size > self.max_bytes:
+                # Never cache an entry larger than the whole budget
+                return
+            self.entries[key] = value
+            self.sizes[key] = size
+            self.total_bytes += size
+            while len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes:
+                oldest = next(iter(self.entries))
+                value = self._remove(oldest)
+                self.evictions += 1
+                if self.on_evict is not None:
+                    self.on_evict(oldest, value)
+
+    def pop(self, key, default=None):
+        with self.lock:
+            if key not in self.entries:
+                return default
+            return self._remove(key)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.sizes.clear()
+            self.total_bytes = 0
+
+    def __contains__(self, key):
+        with self.lock:
+            return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.total_bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+    def _remove(self, key):
+        value = self.entries.pop(key)
+        self.total_bytes -= self.sizes.pop(key)
+        return value
+
+class PredictionCache:
+    """Per-row results of one model keyed by a hash of the row's float32 bytes
+
+    Each row can have a cached prediction, raw margin and feature
+    contributions, stored as separate entries of one LRU budget. Entries are
+    also told apart by the engine that computed them, whose results may
+    differ in the last bits.
+    """
+    KINDS = ("prediction", "margin", "contributions")
+
+    def __init__(self, max_entries, max_bytes):
+        self.entries = LRUCache(max_entries=max_entries, max_bytes=max_bytes)
+
+    @staticmethod
+    def row_keys(X):
+        """Digest of every row of a float32 matrix"""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        return [hashlib.blake2b(row.tobytes(), digest_size=16).digest() for row in X]
+
+    @classmethod
+    def kind(cls, engine, output):
+        """Entry kind of one engine's output, such as compiled:margin"""
+        if output not in cls.KINDS:
+            raise ValueError(f"Unknown output {output}, expected one of {', '.join(cls.KINDS)}")
+        return f"{engine}:{output}"
+
+    def get_many(self, keys, kind):
+        """Cached values for the rows, None where missing"""
+        return [self.entries.get((key, kind)) for key in keys]
+
+    def put_many(self, keys, kind, values):
+        for key, value in zip(keys, values):
+            value = np.array(value)
+            # Key, tuple and array header overhead on top of the data
+            self.entries.put((key, kind), value, size=value.nbytes + 200)
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        return self.entries.stats()
+
+def training_cache_key(request, dataset_hash, default_params, warm_start=None):
+    """Canonical hash of a training request and the content of its dataset
+
+    A warm-started training continues a base model, so the key also holds
+    that model's id and the rounds it had.
+    """
+    canonical = {
+        "algorithm": request["algorithm"],
+        # Explicitly passing a default value must not produce a different key
+        "params": {**default_params, **request["params"]},
+        "dataset_name": request["dataset_name"],
+        "dataset_hash": dataset_hash,
+        "target_column": request["target_column"],
+        "categorical_features": sorted(request["categorical_features"] or []),
+        "test_size": request["test_size"],
+        "random_state": request["random_state"],
+        "task_type": request["task_type"],
+        "early_stopping_rounds": request.get("early_stopping_rounds"),
+        "max_seconds": request.get("max_seconds"),
+        "warm_start": [warm_start["model_id"], warm_start["base_rounds"]] if warm_start else None
+    }
+    encoded = json.dumps(canonical, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
@@ -0,0 +1,158 @@
+"""Per-feature contributions (SHAP values) of stored models"""
+import json
+import os
+import time
+
+import numpy as np
+
+from model_store import load_native
+from splits import catboost_frame
+from staged import objective_name
+
+# The shap fallback is optional
+try:
+    import shap
+    SHAP_AVAILABLE = True
+except Exception:
+    SHAP_AVAILABLE = False
+
+# "native" uses the library's own TreeSHAP, "shap" a shap.TreeExplainer and
+# "auto" the library first, falling back to shap when it fails
+METHODS = ("auto", "native", "shap")
+
+# Rows explained per chunk by a background explain job, between progress
+# updates and cancellation checks; requests with more rows than one chunk run as a job
+EXPLAIN_CHUNK_ROWS = int(os.environ.get("EXPLAIN_CHUNK_ROWS", 2000))
+
+def library_input(model, algorithm, X, categorical_indices):
+    """X in the form the model's library and shap accept"""
+    if algorithm == "catboost" and categorical_indices:
+        import catboost as cb
+        return cb.Pool(catboost_frame(X, model.feature_names_, categorical_indices), cat_features=categorical_indices)
+    return X
+
+def native_contributions(model, algorithm, X, categorical_indices, threads=None):
+    """(n_rows, n_outputs, n_features + 1) contributions from the library's TreeSHAP
+
+    The last column of every output is its expected value, so each row's
+    contributions sum to its raw margin.
+    """
+    if algorithm == "xgboost":
+        import xgboost as xgb
+        if threads:
+            model.set_param({"nthread": threads})
+        matrix = xgb.DMatrix(X, missing=np.nan, feature_names=model.feature_names,
+                             feature_types=model.feature_types, enable_categorical=True)
+        contributions = model.predict(matrix, pred_contribs=True)
+    elif algorithm == "lightgbm":
+        contributions = model.predict(X, pred_contrib=True, **({"num_threads": threads} if threads else {}))
+    elif algorithm == "catboost":
+        import catboost as cb
+        data = library_input(model, algorithm, X, categorical_indices)
+        contributions = model.get_feature_importance(data if isinstance(data, cb.Pool) else cb.Pool(data),
+                                                     type="ShapValues", thread_count=threads or -1)
+    else:
+        raise ValueError(f"Unsupported algorithm: {algorithm}")
+    # LightGBM concatenates the outputs of multiclass models
+    return np.asarray(contributions, dtype=np.float64).reshape(len(X), -1, X.shape[1] + 1)
+
+def xgboost_has_categorical_splits(booster):
+    trees = json.loads(booster.save_raw("json"))["learner"]["gradient_booster"]["model"]["trees"]
+    return any(tree.get("categories") for tree in trees)
+
+def shap_reads_xgboost():
+    """Whether the installed shap can load XGBoost boosters
+
+    shap before 0.42 reads them with np.int, which numpy 1.24 removed.
+    """
+    if not SHAP_AVAILABLE or hasattr(np, "int"):
+        return SHAP_AVAILABLE
+    major, minor = (int(part) for part in shap.__version__.split(".")[:2])
+    return (major, minor) >= (0, 42)
+
+def check_shap(model, algorithm):
+    """Raise ValueError when shap cannot explain the model"""
+    if not SHAP_AVAILABLE:
+        raise ValueError("The shap fallback requires shap, which is not installed")
+    if algorithm == "xgboost" and xgboost_has_categorical_splits(model):
+        # shap reads boosters through the legacy binary format, which cannot hold categorical splits
+        raise ValueError("shap cannot explain XGBoost models with categorical splits; use method native")
+    if algorithm == "xgboost" and not shap_reads_xgboost():
+        raise ValueError(f"shap {shap.__version__} cannot read XGBoost models with numpy {np.__version__}; "
+                         "use method native or shap 0.42 or later")
+
+def shap_explainer(model, algorithm):
+    """shap.TreeExplainer of a model; expensive to build, so callers keep it"""
+    check_shap(model, algorithm)
+    if algorithm == "lightgbm" and "objective" not in model.params:
+        # shap reads the objective from params, which boosters loaded from a file lack
+        model.params["objective"] = objective_name(model, algorithm)
+    return shap.TreeExplainer(model)
+
+def shap_contributions(explainer, model, algorithm, X, categorical_indices):
+    """Same layout as native_contributions, from a shap.TreeExplainer"""
+    values = explainer.shap_values(library_input(model, algorithm, X, categorical_indices))
+    expected = np.atleast_1d(np.asarray(explainer.expected_value, dtype=np.float64))
+    if isinstance(values, list) and len(values) == 2 and algorithm == "lightgbm" and objective_name(model, algorithm) == "binary":
+        # shap gives both classes of LightGBM binary classifiers; the margin is the positive one
+        values, expected = values[1], expected[1:]
+    if isinstance(values, list):
+        # One (n_rows, n_features) array per output
+        values = np.stack(values, axis=1)
+    else:
+        values = np.asarray(values)
+        # Newer shap versions put the outputs last
+        values = values[:, None, :] if values.ndim == 2 else values.transpose(0, 2, 1)
+    base = np.broadcast_to(expected[None, :, None], (len(X), values.shape[1], 1))
+    return np.concatenate([values.astype(np.float64), base], axis=2)
+
+def contributions(model, algorithm, X, categorical_indices, method="auto", get_explainer=None, threads=None):
+    """(contributions, method used) of the rows of X, laid out as by native_contributions
+
+    get_explainer returns the model's shap explainer and is only called when
+    shap is used, so a cached explainer can be passed in.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown method {method}, expected one of {', '.join(METHODS)}")
+    if method != "shap":
+        try:
+            return native_contributions(model, algorithm, X, categorical_indices, threads), "native"
+        except Exception:
+            if method == "native" or not SHAP_AVAILABLE:
+                raise
+    explainer = get_explainer() if get_explainer is not None else shap_explainer(model, algorithm)
+    return shap_contributions(explainer, model, algorithm, X, categorical_indices), "shap"
+
+def explain_rows(progress, model_path, algorithm, task_type, X, categorical_indices, method, chunk_rows, threads):
+    """Explain a large batch chunk by chunk inside one pool worker, reporting rows done as progress
+
+    Chunks run one after another; the library's TreeSHAP spreads each over
+    the job's threads. Returns {"contributions", "method", "rows",
+    "explain_time"}; a cancelled job returns the chunks finished so far.
+    """
+    started = time.perf_counter()
+    model = load_native(algorithm, task_type, model_path)
+    explainer = []
+
+    def get_explainer():
+        if not explainer:
+            explainer.append(shap_explainer(model, algorithm))
+        return explainer[0]
+
+    parts = []
+    done = 0
+    progress.update(0, len(X))
+    for start in range(0, len(X), chunk_rows):
+        if progress.cancelled():
+            break
+        part, method = contributions(model, algorithm, X[start:start + chunk_rows], categorical_indices, method,
+                                     get_explainer, threads)
+        parts.append(part)
+        done += len(part)
+        progress.update(done, len(X))
+    return {
+        "contributions": np.concatenate(parts) if parts else np.empty((0, 0, X.shape[1] + 1)),
+        "method": method,
+        "rows": done,
+        "explain_time": time.perf_counter() - started
+    }
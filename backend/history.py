@@ -0,0 +1,104 @@
+"""Training histories held in columns, with shape-preserving downsampling for plots"""
+import numpy as np
+
+# Metrics where larger values are better; everything else is a loss
+HIGHER_IS_BETTER = {"auc", "aucpr", "pr_auc", "average_precision", "accuracy", "map", "ndcg", "precision", "recall",
+                    "f1", "r2", "prauc", "totalf1"}
+
+def higher_is_better(metric):
+    # Parameterized names such as ndcg@5 or map:3 share the base metric's direction
+    return metric.lower().split("@")[0].split(":")[0] in HIGHER_IS_BETTER
+
+class MetricHistory:
+    """Per-round evaluation metrics, one float64 column per (dataset, metric)
+
+    Columns grow by doubling, so appending a round is amortized O(1) instead
+    of one dict per round. Columns first seen after some rounds are NaN
+    for the earlier ones.
+    """
+    def __init__(self):
+        self.size = 0
+        self.iterations = np.empty(64, dtype=np.int64)
+        # "dataset/metric" -> values
+        self.columns = {}
+
+    def append(self, iteration, metrics):
+        """Record {dataset: {metric: value}} of one round"""
+        if self.size == len(self.iterations):
+            capacity = 2 * len(self.iterations)
+            self.iterations = np.resize(self.iterations, capacity)
+            for key, values in self.columns.items():
+                grown = np.full(capacity, np.nan)
+                grown[:self.size] = values[:self.size]
+                self.columns[key] = grown
+        self.iterations[self.size] = iteration
+        for dataset, dataset_metrics in metrics.items():
+            for metric, value in dataset_metrics.items():
+                key = f"{dataset}/{metric}"
+                if key not in self.columns:
+                    self.columns[key] = np.full(len(self.iterations), np.nan)
+                self.columns[key][self.size] = value
+        self.size += 1
+
+    def arrays(self):
+        """Trimmed copies: "iterations" and one array per "dataset/metric" key"""
+        arrays = {"iterations": self.iterations[:self.size].copy()}
+        arrays.update((key, values[:self.size].copy()) for key, values in self.columns.items())
+        return arrays
+
+def series_keys(arrays):
+    """(dataset, metric) of every series in history arrays"""
+    return [tuple(key.split("/", 1)) for key in arrays if key != "iterations"]
+
+def lttb(x, y, n_out):
+    """Indices of n_out points of (x, y) chosen by Largest-Triangle-Three-Buckets
+
+    The first and last points are kept. The points in between are split
+    into n_out - 2 buckets, and each bucket keeps the point that forms the
+    largest triangle with the point kept before it and the mean of the next
+    bucket, which preserves the peaks and the shape of the curve.
+    """
+    n = len(x)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        raise ValueError("Downsampling keeps at least 3 points")
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(n_out - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_x = x[stop:edges[bucket + 2]].mean()
+            next_y = y[stop:edges[bucket + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        # Twice the triangle areas of every candidate in the bucket
+        areas = np.abs((x[previous] - next_x) * (y[start:stop] - y[previous])
+                       - (x[previous] - x[start:stop]) * (next_y - y[previous]))
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+def series_summary(iterations, values, higher_is_better):
+    """Exact extremes, best and final values of a series, ignoring NaNs"""
+    valid = np.flatnonzero(~np.isnan(values))
+    if not valid.size:
+        return {"n_points": 0}
+    best = valid[np.argmax(values[valid]) if higher_is_better else np.argmin(values[valid])]
+    lowest = valid[np.argmin(values[valid])]
+    highest = valid[np.argmax(values[valid])]
+    return {
+        "n_points": int(valid.size),
+        "min": float(values[lowest]),
+        "min_iteration": int(iterations[lowest]),
+        "max": float(values[highest]),
+        "max_iteration": int(iterations[highest]),
+        "best_iteration": int(iterations[best]),
+        "best_value": float(values[best]),
+        "final_iteration": int(iterations[valid[-1]]),
+        "final_value": float(values[valid[-1]])
+    }
@@ -0,0 +1,392 @@
+"""Background job execution on a bounded process pool"""
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+import multiprocessing
+import asyncio
+import os
+import queue
+import threading
+import logging
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Job states after which nothing changes any more
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+
+# Minimum seconds between two lookups of a worker's cancellation flag
+CANCEL_CHECK_INTERVAL = 0.01
+
+# Finished job records kept for status lookups, by count and by seconds since they finished
+FINISHED_JOBS_MAX = int(os.environ.get("FINISHED_JOBS_MAX", 1000))
+FINISHED_JOB_TTL = float(os.environ.get("FINISHED_JOB_TTL", 3600))
+
+class ProgressReporter:
+    """Picklable handle a worker uses to send job events back to the API process"""
+    def __init__(self, job_id, events, cancellations):
+        self.job_id = job_id
+        self.events = events
+        self.cancellations = cancellations
+        self.last_cancel_check = 0.0
+        self.cancel_requested = False
+
+    def started(self):
+        self.events.put((self.job_id, "started", None))
+
+    def update(self, iteration, total, metrics=None):
+        self.events.put((self.job_id, "progress", {"iteration": iteration, "total": total, "metrics": metrics}))
+
+    def cancelled(self):
+        """Whether the job has been cancelled; cheap enough to call after every boosting round"""
+        now = time.monotonic()
+        if not self.cancel_requested and now - self.last_cancel_check >= CANCEL_CHECK_INTERVAL:
+            # Asking the manager process costs a round trip, so lookups are throttled
+            self.last_cancel_check = now
+            self.cancel_requested = self.job_id in self.cancellations
+        return self.cancel_requested
+
+def run_job(fn, progress, args, threads):
+    """Entry point executed inside a pool worker"""
+    progress.started()
+    return fn(progress, *args, threads=threads)
+
+class CPUBudget:
+    """Process-wide budget of cores handed out to jobs as explicit thread counts"""
+    def __init__(self, cores):
+        self.cores = max(1, cores)
+        self.allocations = {}
+
+    @property
+    def allocated(self):
+        return sum(self.allocations.values())
+
+    def try_acquire(self, job_id, threads):
+        if self.allocated + threads > self.cores:
+            return False
+        self.allocations[job_id] = threads
+        return True
+
+    def release(self, job_id):
+        self.allocations.pop(job_id, None)
+
+class JobManager:
+    """Run jobs on a bounded ProcessPoolExecutor and track their status and progress
+
+    Every job is granted a number of threads from a shared CPU budget before it
+    is handed to the pool and passes them to the boosting library explicitly.
+    Jobs that don't fit in the remaining budget wait in a FIFO queue.
+
+    Running jobs are cancelled cooperatively: workers poll a shared set of
+    cancelled job ids through ProgressReporter.cancelled().
+
+    Progress history and stream subscribers are dropped once a job's terminal
+    event is published. Finished job records are kept for lookups until more
+    than max_finished jobs have finished after them or finished_ttl seconds
+    have passed.
+    """
+    def __init__(self, max_workers, initializer=None, initargs=(), cpu_budget=None, threads_per_job=None,
+                 max_finished=None, finished_ttl=None):
+        # Spawn workers so they never inherit the API process' threads
+        context = multiprocessing.get_context("spawn")
+        self.manager = context.Manager()
+        self.events = self.manager.Queue()
+        # Ids of cancelled running jobs, shared with the workers
+        self.cancellations = self.manager.dict()
+        self.executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=context,
+            initializer=initializer,
+            initargs=initargs
+        )
+        self.max_workers = max_workers
+        self.cpu_budget = CPUBudget(cpu_budget or os.cpu_count() or 1)
+        # By default the budget is split evenly across the pool's workers
+        self.threads_per_job = threads_per_job or max(1, self.cpu_budget.cores // max_workers)
+        # Jobs waiting for threads: (job_id, fn, args, threads, on_complete)
+        self.pending = deque()
+        self.jobs = {}
+        # Progress events per job, replayed to late stream subscribers
+        self.history = {}
+        # asyncio queues of stream subscribers per job, with their event loops
+        self.subscribers = {}
+        # (finish time, job id) of finished jobs, oldest first
+        self.finished = deque()
+        self.max_finished = FINISHED_JOBS_MAX if max_finished is None else max_finished
+        self.finished_ttl = FINISHED_JOB_TTL if finished_ttl is None else finished_ttl
+        self.lock = threading.Lock()
+        # Notified whenever a job completes or fails
+        self.job_finished = threading.Condition(self.lock)
+        self.stopped = threading.Event()
+        self.listener = threading.Thread(target=self._listen, name="job-events", daemon=True)
+        self.listener.start()
+
+    def submit(self, fn, *args, kind="train", on_complete=None, job_id=None, threads=None):
+        """Queue fn(progress, *args, threads=n) on the pool and return the job id
+
+        threads defaults to threads_per_job and is capped at the CPU budget.
+        """
+        job_id = job_id or uuid.uuid4().hex[:12]
+        threads = min(threads or self.threads_per_job, self.cpu_budget.cores)
+        with self.lock:
+            self.jobs[job_id] = {
+                "job_id": job_id,
+                "kind": kind,
+                "status": "queued",
+                "threads": threads,
+                "progress": {"iteration": 0, "total": None, "fraction": 0.0},
+                "created": time.time(),
+                "started": None,
+                "finished": None,
+                "result": None,
+                "error": None,
+                "cancel_requested": False,
+                "keep_partial": False
+            }
+            self.history[job_id] = []
+            self.subscribers[job_id] = []
+            self.pending.append((job_id, fn, args, threads, on_complete))
+        self._dispatch()
+        return job_id
+
+    def add_completed(self, result, kind="train", job_id=None):
+        """Record a job whose result is already known, e.g. served from a cache"""
+        job_id = job_id or uuid.uuid4().hex[:12]
+        now = time.time()
+        with self.lock:
+            self.jobs[job_id] = {
+                "job_id": job_id,
+                "kind": kind,
+                "status": "completed",
+                "threads": 0,
+                "progress": {"iteration": None, "total": None, "fraction": 1.0},
+                "created": now,
+                "started": now,
+                "finished": now,
+                "result": result,
+                "error": None,
+                "cancel_requested": False,
+                "keep_partial": False
+            }
+            self._retire(job_id)
+        return job_id
+
+    def get(self, job_id):
+        """Return a snapshot of the job record, or None if unknown"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            return {**job, "progress": dict(job["progress"])}
+
+    def wait(self, job_ids, timeout=None):
+        """Block until all jobs have finished and return their snapshots
+
+        Snapshots are taken as the jobs finish; a job whose record has already
+        expired gets None. Returns None if the timeout expires first.
+        """
+        deadline = time.time() + timeout if timeout is not None else None
+        snapshots = {}
+        with self.job_finished:
+            while True:
+                for job_id in job_ids:
+                    job = self.jobs.get(job_id)
+                    if job_id not in snapshots and (job is None or job["status"] in FINISHED_STATUSES):
+                        snapshots[job_id] = {**job, "progress": dict(job["progress"])} if job is not None else None
+                if len(snapshots) == len(set(job_ids)):
+                    return [snapshots[job_id] for job_id in job_ids]
+                remaining = deadline - time.time() if deadline is not None else None
+                if (remaining is not None and remaining <= 0) or self.stopped.is_set():
+                    return None
+                self.job_finished.wait(timeout=min(remaining, 1.0) if remaining is not None else 1.0)
+
+    def cancel(self, job_id, keep_partial=False):
+        """Cancel a queued or running job
+
+        A queued job never starts. A running job stops after its current
+        boosting round; with keep_partial its partially trained result is
+        still passed to on_complete. Returns the job snapshot, or None if the
+        job is unknown; raises ValueError if it has already finished.
+        """
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            if job["status"] in FINISHED_STATUSES:
+                raise ValueError(f"Job {job_id} has already {job['status']}")
+            job["cancel_requested"] = True
+            job["keep_partial"] = keep_partial
+            queued = [entry for entry in self.pending if entry[0] == job_id]
+            if queued:
+                self.pending.remove(queued[0])
+                job["status"] = "cancelled"
+                job["finished"] = time.time()
+                self._publish(job_id, self._terminal_event(job))
+                self._retire(job_id)
+                self.job_finished.notify_all()
+            snapshot = {**job, "progress": dict(job["progress"])}
+        if not queued:
+            self.cancellations[job_id] = True
+        return snapshot
+
+    def cpu_stats(self):
+        """CPU budget, current thread allocation per running job and queue depth"""
+        with self.lock:
+            return {
+                "budget": self.cpu_budget.cores,
+                "allocated": self.cpu_budget.allocated,
+                "available": self.cpu_budget.cores - self.cpu_budget.allocated,
+                "threads_per_job": self.threads_per_job,
+                "max_workers": self.max_workers,
+                "allocations": [
+                    {"job_id": job_id, "kind": self.jobs[job_id]["kind"], "threads": threads}
+                    for job_id, threads in self.cpu_budget.allocations.items()
+                ],
+                "queue_depth": len(self.pending),
+                "queued": [
+                    {"job_id": job_id, "kind": self.jobs[job_id]["kind"], "threads": threads}
+                    for job_id, _, _, threads, _ in self.pending
+                ]
+            }
+
+    def subscribe(self, job_id, loop):
+        """Register an asyncio queue receiving the job's events
+
+        Returns the events published so far and the queue, or None if the job is unknown.
+        """
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            events = asyncio.Queue()
+            if job["status"] in FINISHED_STATUSES:
+                # Nothing more will be published; the progress history is gone
+                return [self._terminal_event(job)], events
+            self.subscribers[job_id].append((loop, events))
+            return list(self.history[job_id]), events
+
+    def unsubscribe(self, job_id, events):
+        with self.lock:
+            if job_id in self.subscribers:
+                self.subscribers[job_id] = [(loop, q) for loop, q in self.subscribers[job_id] if q is not events]
+
+    def shutdown(self):
+        self.stopped.set()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.listener.join(timeout=1)
+        self.manager.shutdown()
+
+    def _dispatch(self):
+        """Hand queued jobs to the pool, in order, while their threads fit in the budget"""
+        ready = []
+        with self.lock:
+            while self.pending and not self.stopped.is_set():
+                job_id, fn, args, threads, on_complete = self.pending[0]
+                if not self.cpu_budget.try_acquire(job_id, threads):
+                    break
+                self.pending.popleft()
+                ready.append((job_id, fn, args, threads, on_complete))
+
+        # Submitted outside the lock: a done callback may run synchronously
+        for job_id, fn, args, threads, on_complete in ready:
+            progress = ProgressReporter(job_id, self.events, self.cancellations)
+            try:
+                future = self.executor.submit(run_job, fn, progress, args, threads)
+            except RuntimeError:
+                # Pool already shut down
+                with self.lock:
+                    self.cpu_budget.release(job_id)
+                continue
+            future.add_done_callback(lambda f, job_id=job_id, on_complete=on_complete: self._finish(job_id, f, on_complete))
+
+    def _listen(self):
+        """Apply events sent by workers and finished futures to the job records"""
+        while not self.stopped.is_set():
+            try:
+                job_id, event, data = self.events.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                # Manager process has gone away during shutdown
+                break
+
+            with self.lock:
+                job = self.jobs.get(job_id)
+                if job is None or job["status"] in FINISHED_STATUSES:
+                    continue
+                if event == "finished":
+                    job["status"], job["result"], job["error"] = data
+                    job["finished"] = time.time()
+                    if job["status"] == "completed":
+                        job["progress"]["fraction"] = 1.0
+                    self._publish(job_id, self._terminal_event(job))
+                    self._retire(job_id)
+                    self.job_finished.notify_all()
+                elif event == "started":
+                    job["status"] = "running"
+                    job["started"] = time.time()
+                    self._publish(job_id, {"event": "started", "data": {"job_id": job_id}})
+                elif event == "progress":
+                    job["progress"] = {
+                        "iteration": data["iteration"],
+                        "total": data["total"],
+                        "fraction": min(data["iteration"] / data["total"], 1.0) if data["total"] else 0.0
+                    }
+                    progress_event = {"event": "progress", "data": data}
+                    self.history[job_id].append(progress_event)
+                    self._publish(job_id, progress_event)
+
+    def _publish(self, job_id, event):
+        """Push an event to the job's stream subscribers; called with the lock held"""
+        for loop, events in self.subscribers.get(job_id, []):
+            loop.call_soon_threadsafe(events.put_nowait, event)
+
+    def _retire(self, job_id):
+        """Drop a finished job's events and subscribers and expire old job records; called with the lock held"""
+        self.history.pop(job_id, None)
+        self.subscribers.pop(job_id, None)
+        now = time.time()
+        self.finished.append((now, job_id))
+        while self.finished and (len(self.finished) > self.max_finished
+                                 or now - self.finished[0][0] > self.finished_ttl):
+            _, expired = self.finished.popleft()
+            self.jobs.pop(expired, None)
+
+    @staticmethod
+    def _terminal_event(job):
+        if job["status"] == "completed":
+            return {"event": "completed", "data": job["result"]}
+        if job["status"] == "cancelled":
+            return {"event": "cancelled", "data": {"job_id": job["job_id"], "result": job["result"]}}
+        return {"event": "failed", "data": {"error": job["error"]}}
+
+    def _finish(self, job_id, future, on_complete):
+        """Record the outcome of a finished job and start queued jobs its threads make room for"""
+        with self.lock:
+            self.cpu_budget.release(job_id)
+        if self.stopped.is_set():
+            return
+        self._dispatch()
+        with self.lock:
+            cancelled = self.jobs[job_id]["cancel_requested"]
+            keep_partial = self.jobs[job_id]["keep_partial"]
+        if cancelled:
+            self.cancellations.pop(job_id, None)
+        try:
+            result = future.result()
+            if cancelled and not keep_partial:
+                result, status, error = None, "cancelled", None
+            else:
+                if on_complete is not None:
+                    result = on_complete(result)
+                status, error = ("cancelled" if cancelled else "completed"), None
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {str(e)}")
+            result, status, error = None, "failed", str(e)
+
+        # Route the outcome through the event queue so it is applied after
+        # every progress event the worker sent before returning
+        try:
+            self.events.put((job_id, "finished", (status, result, error)))
+        except (EOFError, OSError):
+            logger.warning(f"Could not record outcome of job {job_id}: job manager is shutting down")
@@ -0,0 +1,225 @@
+"""Persistent store of trained models with a memory-bounded cache in front of it"""
+import json
+import logging
+import os
+import threading
+
+import numpy as np
+
+from cache import LRUCache
+from training import MockModel
+
+# Conditionally import model libraries to avoid errors if not installed
+try:
+    import xgboost as xgb
+    XGBOOST_AVAILABLE = True
+except Exception:
+    XGBOOST_AVAILABLE = False
+
+try:
+    import lightgbm as lgb
+    LIGHTGBM_AVAILABLE = True
+except Exception:
+    LIGHTGBM_AVAILABLE = False
+
+try:
+    import catboost as cb
+    CATBOOST_AVAILABLE = True
+except Exception:
+    CATBOOST_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Native file format of each library's models
+MODEL_EXTENSIONS = {
+    "xgboost": ".ubj",
+    "lightgbm": ".txt",
+    "catboost": ".cbm"
+}
+
+def save_native(model, algorithm, path):
+    """Write a model in its library's native format"""
+    if algorithm == "xgboost":
+        # The .ubj extension selects UBJSON
+        model.save_model(path)
+    elif algorithm == "lightgbm":
+        model.save_model(path)
+    elif algorithm == "catboost":
+        model.save_model(path, format="cbm")
+    else:
+        raise ValueError(f"Unsupported algorithm: {algorithm}")
+
+def load_native(algorithm, task_type, path):
+    """Read a model written by save_native"""
+    if algorithm == "xgboost" and XGBOOST_AVAILABLE:
+        model = xgb.Booster()
+        model.load_model(path)
+        return model
+    elif algorithm == "lightgbm" and LIGHTGBM_AVAILABLE:
+        return lgb.Booster(model_file=path)
+    elif algorithm == "catboost" and CATBOOST_AVAILABLE:
+        model = cb.CatBoostClassifier() if task_type == "classification" else cb.CatBoostRegressor()
+        return model.load_model(path, format="cbm")
+    raise ValueError(f"Cannot load {algorithm} models")
+
+class ModelStore:
+    """Trained models kept on disk, with the most recently used ones in memory
+
+    Model info (everything but the model object) is held in memory for all
+    models and written next to the model file as JSON. Model objects are
+    cached up to a byte budget, estimated from the size of their files, and
+    loaded again from disk on the first access after eviction.
+
+    Supports `model_id in store`, `store[model_id]` (the model info including
+    the "model" object) and `store[model_id] = model_info`.
+    """
+    def __init__(self, directory, max_bytes, max_entries=1024):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.info = {}
+        self.models = LRUCache(max_entries=max_entries, max_bytes=max_bytes, on_evict=self._evicted)
+        # Called with (model_id, reason) when a model object is evicted from
+        # memory ("evicted") or a model id is stored again ("replaced")
+        self.listeners = []
+        # Models without a native format (mock models) stay in memory
+        self.pinned = {}
+        self.lock = threading.Lock()
+        self.loads = 0
+        self._scan()
+
+    def __contains__(self, model_id):
+        return model_id in self.info
+
+    def __len__(self):
+        return len(self.info)
+
+    def __getitem__(self, model_id):
+        return {**self.info[model_id], "model": self.load(model_id)}
+
+    def __setitem__(self, model_id, model_info):
+        self.put(model_id, model_info)
+
+    def put(self, model_id, model_info):
+        """Persist a model and its info and cache the model object"""
+        model = model_info["model"]
+        info = {key: value for key, value in model_info.items() if key != "model"}
+        algorithm = info["algorithm"]
+        if model_id in self.info:
+            self._notify(model_id, "replaced")
+
+        if isinstance(model, MockModel) or algorithm not in MODEL_EXTENSIONS:
+            # Nothing to persist; kept in memory for the lifetime of the process
+            self.pinned[model_id] = model
+            self.info[model_id] = info
+            return
+
+        path = self._model_path(model_id, algorithm)
+        # Write to temporary files first so a crash never leaves a truncated model
+        tmp_path = path + ".tmp" + MODEL_EXTENSIONS[algorithm]
+        save_native(model, algorithm, tmp_path)
+        os.replace(tmp_path, path)
+        info_path = self._info_path(model_id)
+        with open(info_path + ".tmp", "w") as f:
+            json.dump(info, f, default=str)
+        os.replace(info_path + ".tmp", info_path)
+
+        self.info[model_id] = info
+        self.models.put(model_id, model, size=os.path.getsize(path))
+
+    def load(self, model_id):
+        """Return the model object, reading it from disk if it is not cached"""
+        if model_id in self.pinned:
+            return self.pinned[model_id]
+        model = self.models.get(model_id)
+        if model is not None:
+            return model
+        with self.lock:
+            # Another thread may have loaded it while this one waited
+            if model_id in self.models:
+                return self.models.get(model_id)
+            info = self.info[model_id]
+            path = self._model_path(model_id, info["algorithm"])
+            model = load_native(info["algorithm"], info["task_type"], path)
+            self.models.put(model_id, model, size=os.path.getsize(path))
+            self.loads += 1
+            logger.info(f"Loaded model {model_id} from {path}")
+            return model
+
+    def model_path(self, model_id):
+        """File of a stored model in its native format; None for models kept only in memory"""
+        if model_id in self.pinned:
+            return None
+        return self._model_path(model_id, self.info[model_id]["algorithm"])
+
+    def put_history(self, model_id, arrays):
+        """Persist a model's training history, given as named NumPy arrays"""
+        path = self._history_path(model_id)
+        with open(path + ".tmp", "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(path + ".tmp", path)
+
+    def history(self, model_id):
+        """Training history arrays of a model, or None if none was recorded"""
+        path = self._history_path(model_id)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            return {name: data[name] for name in data.files}
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def metadata(self):
+        """Info of every stored model, without the model objects"""
+        return dict(self.info)
+
+    def stats(self):
+        disk_bytes = 0
+        for model_id, info in self.info.items():
+            if model_id not in self.pinned:
+                path = self._model_path(model_id, info["algorithm"])
+                if os.path.exists(path):
+                    disk_bytes += os.path.getsize(path)
+        return {
+            "models": len(self.info),
+            "disk_bytes": disk_bytes,
+            "pinned": len(self.pinned),
+            "loads_from_disk": self.loads,
+            "cache": self.models.stats()
+        }
+
+    def _evicted(self, model_id, model):
+        self._notify(model_id, "evicted")
+
+    def _notify(self, model_id, reason):
+        for listener in self.listeners:
+            try:
+                listener(model_id, reason)
+            except Exception as e:
+                logger.error(f"Model listener failed for {model_id}: {str(e)}")
+
+    def _model_path(self, model_id, algorithm):
+        return os.path.join(self.directory, model_id + MODEL_EXTENSIONS[algorithm])
+
+    def _info_path(self, model_id):
+        return os.path.join(self.directory, model_id + ".json")
+
+    def _history_path(self, model_id):
+        return os.path.join(self.directory, model_id + ".history.npz")
+
+    def _scan(self):
+        """Index the models written by earlier runs"""
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith(".json"):
+                continue
+            model_id = name[:-len(".json")]
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    info = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.error(f"Skipping unreadable model info {name}: {str(e)}")
+                continue
+            if info.get("algorithm") in MODEL_EXTENSIONS and os.path.exists(self._model_path(model_id, info["algorithm"])):
+                self.info[model_id] = info
+        if self.info:
+            logger.info(f"Found {len(self.info)} stored models in {self.directory}")
@@ -0,0 +1,86 @@
+"""Compact encodings of responses made of metadata and typed arrays"""
+import json
+
+import numpy as np
+
+# Binary encodings are optional
+try:
+    import pyarrow as pa
+    PYARROW_AVAILABLE = True
+except Exception:
+    PYARROW_AVAILABLE = False
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except Exception:
+    MSGPACK_AVAILABLE = False
+
+MEDIA_TYPES = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "msgpack": "application/msgpack",
+    "json": "application/json"
+}
+
+def available_formats():
+    formats = []
+    if PYARROW_AVAILABLE:
+        formats.append("arrow")
+    if MSGPACK_AVAILABLE:
+        formats.append("msgpack")
+    formats.append("json")
+    return formats
+
+def negotiate(accept, requested=None):
+    """Format named by requested, or else the first available one the Accept header lists
+
+    Returns None when requested names an unavailable format. Without a
+    match the response falls back to JSON.
+    """
+    formats = available_formats()
+    if requested:
+        return requested if requested in formats else None
+    for entry in (accept or "").split(","):
+        media_type = entry.split(";")[0].strip().lower()
+        for name in formats:
+            if media_type == MEDIA_TYPES[name] or (name == "msgpack" and media_type == "application/x-msgpack"):
+                return name
+    return "json"
+
+def encode(meta, arrays, fmt):
+    """Serialize JSON-ready metadata and named NumPy arrays; returns (body, media type)
+
+    - arrow: an IPC stream with one record batch of a single row; every
+      array is a list column, the metadata is JSON in the schema metadata
+      under "meta".
+    - msgpack: a map of the metadata plus "arrays", each array a map of
+      dtype (NumPy type string, little-endian), shape and raw data bytes.
+    - json: the metadata plus "arrays" of nested lists, NaN as null.
+    """
+    if fmt == "arrow":
+        columns = [pa.array([np.ascontiguousarray(array).ravel()]) for array in arrays.values()]
+        shapes = {name: list(array.shape) for name, array in arrays.items()}
+        schema_meta = {"meta": json.dumps({**meta, "shapes": shapes})}
+        batch = pa.RecordBatch.from_arrays(columns, names=list(arrays)).replace_schema_metadata(schema_meta)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, batch.schema) as writer:
+            writer.write_batch(batch)
+        return sink.getvalue().to_pybytes(), MEDIA_TYPES["arrow"]
+    if fmt == "msgpack":
+        encoded = {}
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            array = array.astype(array.dtype.newbyteorder("<"), copy=False)
+            encoded[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "data": array.tobytes()}
+        return msgpack.packb({**meta, "arrays": encoded}, use_bin_type=True), MEDIA_TYPES["msgpack"]
+    if fmt == "json":
+        lists = {name: json_ready(array) for name, array in arrays.items()}
+        return json.dumps({**meta, "arrays": lists}).encode("utf-8"), MEDIA_TYPES["json"]
+    raise ValueError(f"Unknown format {fmt}")
+
+def json_ready(array):
+    """Nested lists of an array, with NaN replaced by None"""
+    array = np.asarray(array)
+    if array.dtype.kind == "f" and np.isnan(array).any():
+        return np.where(np.isnan(array), None, array.astype(object)).tolist()
+    return array.tolist()
@@ -0,0 +1,360 @@
+"""Inference over stored models, natively or with a NumPy predictor compiled from TreeArrays"""
+import numpy as np
+import pandas as pd
+import io
+import os
+import threading
+
+from trees import MISSING_AS_ZERO, MISSING_ZERO_DEFAULT, supports, extract_tree_arrays
+from staged import margin_to_prediction, objective_name
+from splits import catboost_frame
+
+# Inference engines accepted by the predict endpoints
+ENGINES = ("native", "compiled")
+
+# Upper bound on the (row, tree) pairs routed at once by a compiled predictor;
+# larger batches are split into row chunks to bound the index arrays
+CHUNK_PAIRS = int(os.environ.get("PREDICTOR_CHUNK_PAIRS", 1 << 16))
+
+# Arrow IPC input is optional
+try:
+    import pyarrow as pa
+    PYARROW_AVAILABLE = True
+except Exception:
+    PYARROW_AVAILABLE = False
+
+# Rows scored per chunk of a streamed prediction
+STREAM_CHUNK_ROWS = int(os.environ.get("PREDICT_STREAM_CHUNK_ROWS", 10000))
+
+# LightGBM treats values this close to zero as zero
+ZERO_THRESHOLD = 1e-35
+
+def rows_to_matrix(rows, features):
+    """float32 feature matrix from rows given as value lists in feature order or as
+    {feature: value} dicts; None and absent features are missing values"""
+    index = {feature: i for i, feature in enumerate(features)}
+    X = np.full((len(rows), len(features)), np.nan, dtype=np.float32)
+    for i, row in enumerate(rows):
+        if isinstance(row, dict):
+            unknown = [name for name in row if name not in index]
+            if unknown:
+                raise ValueError(f"Unknown features: {', '.join(unknown)}")
+            for name, value in row.items():
+                if value is not None:
+                    X[i, index[name]] = value
+        else:
+            if len(row) != len(features):
+                raise ValueError(f"Row {i} has {len(row)} values, expected {len(features)}")
+            X[i] = [np.nan if value is None else value for value in row]
+    return X
+
+def frame_to_matrix(frame, features):
+    """float32 feature matrix from a DataFrame holding a subset of the features, in any order"""
+    unknown = [col for col in frame.columns if col not in features]
+    if unknown:
+        raise ValueError(f"Unknown features: {', '.join(map(str, unknown))}")
+    return np.ascontiguousarray(frame.reindex(columns=features).to_numpy(dtype=np.float32))
+
+class CSVChunker:
+    """Incremental CSV parser turning a byte stream into float32 chunks of chunk_size rows
+
+    The first line is a header naming the model's features, in any order;
+    absent features and empty fields are missing values. Only the current
+    chunk and a partial line are held in memory.
+    """
+    def __init__(self, features, chunk_size):
+        self.features = features
+        self.chunk_size = chunk_size
+        self.header = None
+        self.partial = b""
+        self.lines = []
+
+    def feed(self, data):
+        """Consume bytes and yield every chunk they complete"""
+        lines = (self.partial + data).split(b"\n")
+        self.partial = lines.pop()
+        for line in lines:
+            yield from self._add(line)
+
+    def close(self):
+        """Yield the last, possibly short, chunk"""
+        yield from self._add(self.partial)
+        self.partial = b""
+        if self.lines:
+            yield self._flush()
+
+    def _add(self, line):
+        line = line.rstrip(b"\r")
+        if not line.strip():
+            return
+        if self.header is None:
+            self.header = [name.strip().strip('"') for name in line.decode("utf-8").split(",")]
+            frame_to_matrix(pd.DataFrame(columns=self.header), self.features)
+            return
+        self.lines.append(line)
+        if len(self.lines) == self.chunk_size:
+            yield self._flush()
+
+    def _flush(self):
+        frame = pd.read_csv(io.BytesIO(b"\n".join(self.lines)), header=None, names=self.header)
+        self.lines = []
+        return frame_to_matrix(frame, self.features)
+
+def arrow_chunks(source, features, chunk_size):
+    """float32 chunks of at most chunk_size rows from an Arrow IPC stream
+
+    source is a seekable file holding the stream; record batches are read
+    one at a time. Nulls are missing values.
+    """
+    if not PYARROW_AVAILABLE:
+        raise ValueError("Arrow input requires pyarrow")
+    reader = pa.ipc.open_stream(pa.PythonFile(source, mode="r"))
+    names = reader.schema.names
+    frame_to_matrix(pd.DataFrame(columns=names), features)
+    for batch in reader:
+        for offset in range(0, batch.num_rows, chunk_size):
+            part = batch.slice(offset, chunk_size)
+            X = np.full((part.num_rows, len(features)), np.nan, dtype=np.float32)
+            for name, column in zip(names, part.columns):
+                values = column.cast(pa.float64()).to_numpy(zero_copy_only=False)
+                X[:, features.index(name)] = values
+            yield X
+
+def native_predict(model, algorithm, task_type, X, categorical_indices, output_margin=False):
+    """Probabilities (classification), values (regression) or raw margins from the model's library
+
+    X is a float32 feature matrix with categorical features as category codes.
+    Binary classifiers return the probability of the positive class.
+    """
+    if algorithm == "xgboost":
+        return model.inplace_predict(X, predict_type="margin" if output_margin else "value")
+    elif algorithm == "lightgbm":
+        return model.predict(X, raw_score=output_margin)
+    elif algorithm == "catboost":
+        data = catboost_frame(X, model.feature_names_, categorical_indices) if categorical_indices else X
+        if output_margin:
+            return model.predict(data, prediction_type="RawFormulaVal")
+        if task_type == "classification":
+            y_proba = model.predict(data, prediction_type="Probability")
+            return y_proba[:, 1] if y_proba.shape[1] == 2 else y_proba
+        return model.predict(data)
+    raise ValueError(f"Unsupported algorithm: {algorithm}")
+
+def native_leaves(model, algorithm, X, categorical_indices, trees_per_round=1):
+    """(n_rows, n_trees) leaf id reached in every tree, from one call to the model's library
+
+    Ids are the library's own, as kept in TreeArrays.native_id. CatBoost
+    reports one leaf per multiclass tree, which TreeArrays splits into
+    trees_per_round trees with the same leaf.
+    """
+    if algorithm == "xgboost":
+        import xgboost as xgb
+        matrix = xgb.DMatrix(X, missing=np.nan, feature_names=model.feature_names,
+                             feature_types=model.feature_types, enable_categorical=True)
+        return model.predict(matrix, pred_leaf=True).reshape(len(X), -1)
+    elif algorithm == "lightgbm":
+        return model.predict(X, pred_leaf=True).reshape(len(X), -1)
+    elif algorithm == "catboost":
+        data = catboost_frame(X, model.feature_names_, categorical_indices) if categorical_indices else X
+        leaves = np.asarray(model.calc_leaf_indexes(data)).reshape(len(X), -1)
+        return np.repeat(leaves, trees_per_round, axis=1)
+    raise ValueError(f"Unsupported algorithm: {algorithm}")
+
+class CompiledPredictor:
+    """Vectorized evaluation of all trees of a TreeArrays ensemble over a batch of rows
+
+    Every (row, tree) pair starts at the tree's root. Each step gathers the
+    split feature and threshold of every pair's node, compares and moves the
+    pair to the chosen child, so a batch takes as many NumPy passes as the
+    deepest tree has levels. Leaf values are summed per output and mapped
+    through the objective's link function.
+    """
+    def __init__(self, arrays, objective):
+        if arrays.opaque_nodes:
+            raise ValueError("The model splits on encoded categorical values that cannot be evaluated from raw features")
+        self.arrays = arrays
+        self.objective = objective
+        self.roots = arrays.tree_offsets[:-1].astype(np.int64)
+        self.n_outputs = arrays.trees_per_round
+        self.bias = np.zeros(self.n_outputs) if arrays.bias is None else np.asarray(arrays.bias, dtype=np.float64)
+
+        # Leaves point to themselves through a dummy split, so every step can
+        # move all pairs without masking the ones that already reached a leaf
+        leaf = arrays.feature < 0
+        nodes = np.arange(arrays.n_nodes, dtype=np.int64)
+        self.feature = np.where(leaf, 0, arrays.feature).astype(np.int64)
+        # Left child at 2 * node, right child at 2 * node + 1
+        self.children = np.column_stack([np.where(leaf, nodes, arrays.left),
+                                         np.where(leaf, nodes, arrays.right)]).astype(np.int64).ravel()
+        self.threshold = np.where(leaf, 0.0, arrays.threshold)
+        self.default_left = arrays.default_left
+        self.depth = self._max_depth()
+
+        # Categorical splits as rows of a (split, code) membership table
+        self.category_row = np.full(arrays.n_nodes, -1, dtype=np.int32)
+        n_codes = 1 + max((int(c.max()) for c in arrays.categories.values() if len(c)), default=0)
+        self.category_table = np.zeros((len(arrays.categories), n_codes), dtype=bool)
+        for row, (node, codes) in enumerate(sorted(arrays.categories.items())):
+            self.category_row[node] = row
+            self.category_table[row, codes[codes >= 0]] = True
+        self.has_missing_types = bool(np.any(arrays.missing_type != 0))
+
+    @property
+    def nbytes(self):
+        own = [self.roots, self.feature, self.children, self.threshold, self.category_row, self.category_table]
+        return self.arrays.nbytes + sum(array.nbytes for array in own)
+
+    @property
+    def n_features(self):
+        return len(self.arrays.feature_names)
+
+    def leaves(self, X):
+        """(n_rows, n_trees) ensemble-wide index of the leaf each row reaches in each tree"""
+        X = self._check(X)
+        n_trees = self.arrays.n_trees
+        chunk = max(1, CHUNK_PAIRS // max(1, n_trees))
+        return np.concatenate([self._route(X[start:start + chunk]) for start in range(0, max(len(X), 1), chunk)])
+
+    def margin(self, X):
+        """Raw scores; (n_rows,) for single-output models, (n_rows, n_outputs) otherwise"""
+        X = self._check(X)
+        arrays = self.arrays
+        n_trees = arrays.n_trees
+        margin = np.empty((len(X), self.n_outputs))
+        chunk = max(1, CHUNK_PAIRS // max(1, n_trees))
+        for start in range(0, len(X), chunk):
+            values = arrays.value[self._route(X[start:start + chunk])]
+            # Tree t adds to output t % trees_per_round
+            margin[start:start + chunk] = values.reshape(len(values), -1, self.n_outputs).sum(axis=1)
+        margin = arrays.scale * margin + self.bias
+        return margin[:, 0] if self.n_outputs == 1 else margin
+
+    def predict(self, X, output_margin=False):
+        """Same outputs as native_predict"""
+        margin = self.margin(X)
+        return margin if output_margin else margin_to_prediction(margin, self.objective)
+
+    def _check(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected rows of {self.n_features} features, got shape {X.shape}")
+        return X
+
+    def _max_depth(self):
+        """Number of splits on the longest root-to-leaf path"""
+        depth = 0
+        frontier = self.roots
+        while True:
+            frontier = frontier[self.arrays.feature[frontier] >= 0]
+            if not frontier.size:
+                return depth
+            frontier = np.concatenate([self.arrays.left[frontier], self.arrays.right[frontier]])
+            depth += 1
+
+    def _route(self, X):
+        n_rows, n_features = X.shape
+        # Flat (row, tree) pairs, row-major, and the offset of each pair's row in X
+        nodes = np.tile(self.roots, n_rows)
+        row_offsets = np.repeat(np.arange(n_rows, dtype=np.int64) * n_features, len(self.roots))
+        values = X.astype(np.float64).ravel()
+        has_nan = bool(np.isnan(values).any())
+        for _ in range(self.depth):
+            x = values[row_offsets + self.feature[nodes]]
+            go_right = ~self._go_left(nodes, x, has_nan)
+            nodes = self.children[2 * nodes + go_right]
+        return nodes.reshape(n_rows, len(self.roots))
+
+    def _go_left(self, nodes, x, has_nan):
+        arrays = self.arrays
+        if self.has_missing_types:
+            missing_type = arrays.missing_type[nodes]
+            missing = np.isnan(x)
+            as_zero = missing & (missing_type == MISSING_AS_ZERO)
+            x = np.where(as_zero, 0.0, x)
+            missing = (missing & ~as_zero) | ((missing_type == MISSING_ZERO_DEFAULT) & (np.abs(x) <= ZERO_THRESHOLD))
+        else:
+            missing = np.isnan(x) if has_nan else None
+
+        go_left = x < self.threshold[nodes]
+
+        if len(self.category_table):
+            category_row = self.category_row[nodes]
+            categorical = np.flatnonzero(category_row >= 0)
+            if categorical.size:
+                codes = x[categorical]
+                n_codes = self.category_table.shape[1]
+                valid = (codes >= 0) & (codes < n_codes)
+                member = self.category_table[category_row[categorical], np.where(valid, codes, 0).astype(np.int64)]
+                go_left[categorical] = valid & member
+
+        if missing is None:
+            return go_left
+        return np.where(missing, self.default_left[nodes], go_left)
+
+class RowPredictor:
+    """Single-row predictions of one model without pandas or input conversion
+
+    The row is copied into a preallocated float32 buffer in the stored feature
+    order and passed straight to XGBoost's inplace_predict and LightGBM's
+    Booster.predict, or the compiled predictor (CatBoost models without
+    encoded categorical splits). Outputs match native_predict for one row,
+    whatever their shape. Calls are serialized, since the buffer is shared.
+    """
+    def __init__(self, model, algorithm, task_type, n_features, categorical_indices=(), compiled=None,
+                 output_margin=False):
+        self.model = model
+        self.algorithm = algorithm
+        self.task_type = task_type
+        self.n_features = n_features
+        self.categorical_indices = list(categorical_indices)
+        self.compiled = compiled
+        self.output_margin = output_margin
+        self.row = np.empty((1, n_features), dtype=np.float32)
+        self.lock = threading.Lock()
+        if algorithm == "xgboost":
+            self.predict_type = "margin" if output_margin else "value"
+            self._predict = self._xgboost
+        elif algorithm == "lightgbm":
+            self._predict = self._lightgbm
+        elif compiled is not None:
+            self._predict = self._compiled
+        else:
+            self._predict = self._native
+
+    def predict(self, values):
+        """Prediction for one row of n_features values: a float, or an array of per-class outputs"""
+        if len(values) != self.n_features:
+            raise ValueError(f"Expected {self.n_features} values, got {len(values)}")
+        with self.lock:
+            self.row[0] = values
+            return self._first(self._predict())
+
+    @staticmethod
+    def _first(out):
+        # Scalar outputs (binary, regression, multi:softmax) become floats
+        out = np.asarray(out)[0]
+        return float(out) if out.ndim == 0 else out
+
+    def _xgboost(self):
+        return self.model.inplace_predict(self.row, predict_type=self.predict_type, missing=np.nan,
+                                          validate_features=False)
+
+    def _lightgbm(self):
+        return self.model.predict(self.row, raw_score=self.output_margin)
+
+    def _compiled(self):
+        return self.compiled.predict(self.row, output_margin=self.output_margin)
+
+    def _native(self):
+        return native_predict(self.model, self.algorithm, self.task_type, self.row, self.categorical_indices,
+                              self.output_margin)
+
+def row_predictor(model, algorithm, task_type, features, categorical_indices=(), compiled=None, output_margin=False):
+    """RowPredictor for a model, compiling the trees of models without a native fast path"""
+    if compiled is None and algorithm not in ("xgboost", "lightgbm") and supports(algorithm):
+        try:
+            compiled = CompiledPredictor(extract_tree_arrays(model, algorithm, features), objective_name(model, algorithm))
+        except ValueError:
+            # Encoded categorical splits; the native library is used instead
+            compiled = None
+    return RowPredictor(model, algorithm, task_type, len(features), categorical_indices, compiled, output_margin)
@@ -0,0 +1,180 @@
+"""Cached train/test splits and reusable native training containers"""
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+import os
+import threading
+
+from cache import LRUCache
+
+# Conditionally import model libraries to avoid errors if not installed
+try:
+    import xgboost as xgb
+    XGBOOST_AVAILABLE = True
+except Exception:
+    XGBOOST_AVAILABLE = False
+
+try:
+    import lightgbm as lgb
+    LIGHTGBM_AVAILABLE = True
+except Exception:
+    LIGHTGBM_AVAILABLE = False
+
+try:
+    import catboost as cb
+    CATBOOST_AVAILABLE = True
+except Exception:
+    CATBOOST_AVAILABLE = False
+
+# LightGBM parameters fixed when a Dataset is constructed; a constructed
+# Dataset can only be reused by trainings that agree on all of them
+LIGHTGBM_DATASET_PARAMS = (
+    "linear_tree", "max_bin", "max_bin_by_feature", "min_data_in_bin", "bin_construct_sample_cnt",
+    "data_random_seed", "is_enable_sparse", "enable_bundle", "use_missing", "zero_as_missing",
+    "feature_pre_filter", "pre_partition", "forcedbins_filename", "precise_float_parser",
+    "seed", "random_seed", "random_state"
+)
+
+# CatBoost quantization parameters that determine the borders of a quantized Pool
+CATBOOST_QUANTIZATION_PARAMS = ("border_count", "max_bin", "feature_border_type", "nan_mode")
+
+class PreparedSplit:
+    """Train/test split of a dataset held as contiguous float32 arrays
+
+    Native containers (DMatrix, Dataset, Pool) are built on first use and kept,
+    so repeated trainings on the same split skip preprocessing and binning.
+    """
+    def __init__(self, X, y, categorical_features, test_size, random_state):
+        self.features = list(X.columns)
+        self.categorical_indices = [self.features.index(col) for col in categorical_features or [] if col in self.features]
+
+        # Categorical columns are stored as category codes, missing values as NaN
+        columns = []
+        for index, col in enumerate(self.features):
+            values = X[col]
+            if index in self.categorical_indices:
+                codes = values.astype('category').cat.codes.to_numpy()
+                columns.append(np.where(codes < 0, np.nan, codes))
+            else:
+                columns.append(values.to_numpy(dtype=np.float64))
+        matrix = np.column_stack(columns).astype(np.float32) if columns else np.empty((len(X), 0), dtype=np.float32)
+
+        X_train, X_test, y_train, y_test = train_test_split(
+            matrix, y.to_numpy(), test_size=test_size, random_state=random_state
+        )
+        self.X_train = np.ascontiguousarray(X_train)
+        self.X_test = np.ascontiguousarray(X_test)
+        self.y_train = y_train
+        self.y_test = y_test
+
+        # Classification labels encoded as 0..n_classes-1 for the native APIs
+        self.classes = np.unique(y.to_numpy())
+        self.containers = {}
+        self.lock = threading.Lock()
+
+    @property
+    def nbytes(self):
+        # Native containers are budgeted at roughly the size of the raw arrays
+        raw = self.X_train.nbytes + self.X_test.nbytes + self.y_train.nbytes + self.y_test.nbytes
+        return 2 * raw
+
+    def encoded_labels(self, y):
+        return np.searchsorted(self.classes, y).astype(np.float32)
+
+    def labels(self, task_type, y):
+        return self.encoded_labels(y) if task_type == "classification" else y.astype(np.float32)
+
+    def xgboost_matrices(self, task_type, max_bin=256, quantile=True):
+        """(train, test) matrix pair: QuantileDMatrix sharing the training quantiles, or plain DMatrix
+
+        QuantileDMatrix only works with the hist tree methods and tree
+        boosters; other params need quantile=False.
+        """
+        key = ("xgboost", task_type, max_bin if quantile else None)
+        with self.lock:
+            if key not in self.containers:
+                feature_types = ["c" if i in self.categorical_indices else "q" for i in range(len(self.features))]
+                common = {"feature_names": self.features, "feature_types": feature_types, "enable_categorical": True}
+                if quantile:
+                    train = xgb.QuantileDMatrix(self.X_train, label=self.labels(task_type, self.y_train),
+                                                max_bin=max_bin, **common)
+                    test = xgb.QuantileDMatrix(self.X_test, label=self.labels(task_type, self.y_test),
+                                               max_bin=max_bin, ref=train, **common)
+                else:
+                    train = xgb.DMatrix(self.X_train, label=self.labels(task_type, self.y_train), **common)
+                    test = xgb.DMatrix(self.X_test, label=self.labels(task_type, self.y_test), **common)
+                self.containers[key] = (train, test)
+            return self.containers[key]
+
+    def lightgbm_datasets(self, task_type, params, fresh=False):
+        """(train, test) constructed Datasets for the given dataset-level params
+
+        With fresh=True new, unconstructed Datasets are returned that reuse the
+        cached bin boundaries, for trainings that modify their Datasets, such as
+        continuing from an init_model.
+        """
+        dataset_params = {name: params[name] for name in LIGHTGBM_DATASET_PARAMS if name in params}
+        # Keep all features so later trainings may use different min_data_in_leaf values
+        dataset_params.setdefault("feature_pre_filter", False)
+        dataset_params["verbose"] = -1
+        key = ("lightgbm", task_type, tuple(sorted((k, str(v)) for k, v in dataset_params.items())))
+        with self.lock:
+            if key not in self.containers:
+                train = self._lightgbm_dataset(self.X_train, self.y_train, task_type, dataset_params).construct()
+                test = self._lightgbm_dataset(self.X_test, self.y_test, task_type, dataset_params, reference=train).construct()
+                self.containers[key] = (train, test)
+            train, test = self.containers[key]
+        if fresh:
+            train = self._lightgbm_dataset(self.X_train, self.y_train, task_type, dataset_params, reference=train)
+            test = self._lightgbm_dataset(self.X_test, self.y_test, task_type, dataset_params, reference=train)
+        return train, test
+
+    def _lightgbm_dataset(self, X, y, task_type, dataset_params, reference=None):
+        # An empty list would still make LightGBM warn about categorical_feature on every run
+        return lgb.Dataset(X, label=self.labels(task_type, y), feature_name=self.features,
+                           categorical_feature=self.categorical_indices or "auto", params=dataset_params,
+                           reference=reference, free_raw_data=False)
+
+    def catboost_pools(self, params):
+        """(train, test) Pools; the training Pool is quantized once per set of borders"""
+        quantization = {name: params[name] for name in CATBOOST_QUANTIZATION_PARAMS if name in params}
+        key = ("catboost", tuple(sorted((k, str(v)) for k, v in quantization.items())))
+        with self.lock:
+            if key not in self.containers:
+                train = self.catboost_pool(self.X_train, self.y_train)
+                train.quantize(**quantization)
+                # Evaluation data is quantized with the training borders during fit
+                test = self.catboost_pool(self.X_test, self.y_test)
+                self.containers[key] = (train, test)
+            return self.containers[key]
+
+    def catboost_pool(self, X, y=None):
+        """Raw CatBoost Pool, with categorical codes passed as integers"""
+        return cb.Pool(catboost_frame(X, self.features, self.categorical_indices), label=y,
+                       cat_features=self.categorical_indices or None)
+
+def catboost_frame(X, features, categorical_indices):
+    """Feature DataFrame accepted by CatBoost, which rejects float categorical values"""
+    frame = pd.DataFrame(X, columns=features)
+    for index in categorical_indices:
+        col = features[index]
+        frame[col] = np.nan_to_num(frame[col].to_numpy(), nan=-1).astype(np.int64)
+    return frame
+
+# Splits shared by all trainings in this process
+split_cache = LRUCache(
+    max_entries=int(os.environ.get("SPLIT_CACHE_ENTRIES", 16)),
+    max_bytes=int(os.environ.get("SPLIT_CACHE_BYTES", 512 * 1024 * 1024))
+)
+
+def get_split(dataset_name, df, dataset_hash, target_column, categorical_features, test_size, random_state):
+    """Return the cached PreparedSplit for these settings, building it on a miss"""
+    key = (dataset_name, dataset_hash, target_column, tuple(sorted(categorical_features or [])),
+           test_size, random_state)
+    split = split_cache.get(key)
+    if split is None:
+        X = df.drop(columns=[target_column])
+        y = df[target_column]
+        split = PreparedSplit(X, y, categorical_features, test_size, random_state)
+        split_cache.put(key, split, size=split.nbytes)
+    return split
@@ -0,0 +1,169 @@
+"""Predictions and metrics after intermediate numbers of boosting rounds"""
+import numpy as np
+import json
+
+from training import XGBOOST_AVAILABLE, LIGHTGBM_AVAILABLE, CATBOOST_AVAILABLE, boosted_rounds, prediction_metrics
+
+from splits import catboost_frame
+
+if XGBOOST_AVAILABLE:
+    import xgboost as xgb
+
+def stage_iterations(n_rounds, step):
+    """Iterations at which to evaluate: every step-th round plus the final one"""
+    iterations = list(range(step, n_rounds + 1, step))
+    if not iterations or iterations[-1] != n_rounds:
+        iterations.append(n_rounds)
+    return iterations
+
+def staged_margins(model, algorithm, X, iterations, categorical_indices=()):
+    """Yield (iteration, raw margin) for each requested iteration in increasing order
+
+    X is a float32 feature matrix as held by PreparedSplit. Margins are
+    accumulated incrementally, so every tree is evaluated once no matter how
+    many stages are requested.
+    """
+    if algorithm == "xgboost" and XGBOOST_AVAILABLE:
+        booster = model
+        matrix_args = {"feature_names": booster.feature_names, "feature_types": booster.feature_types,
+                       "enable_categorical": True}
+        data = xgb.DMatrix(X, **matrix_args)
+        # A zero base margin replaces base_score, so a prediction over an
+        # iteration range returns only the sum of those trees
+        first = booster.predict(data, output_margin=True, iteration_range=(0, 1))
+        tree_only = xgb.DMatrix(X, base_margin=np.zeros(first.size), **matrix_args)
+        margin = first - booster.predict(tree_only, output_margin=True, iteration_range=(0, 1))
+        previous = 0
+        for iteration in iterations:
+            margin = margin + booster.predict(tree_only, output_margin=True, iteration_range=(previous, iteration))
+            previous = iteration
+            yield iteration, margin
+
+    elif algorithm == "lightgbm" and LIGHTGBM_AVAILABLE:
+        booster = model
+        margin = 0.0
+        previous = 0
+        for iteration in iterations:
+            margin = margin + booster.predict(X, raw_score=True, start_iteration=previous,
+                                              num_iteration=iteration - previous)
+            previous = iteration
+            yield iteration, margin
+
+    elif algorithm == "catboost" and CATBOOST_AVAILABLE:
+        # staged_predict keeps the running sum internally
+        n_rounds = boosted_rounds(model, algorithm)
+        step = iterations[0]
+        wanted = set(iterations)
+        features = model.feature_names_
+        data = catboost_frame(X, features, list(categorical_indices))
+        staged = model.staged_predict(data, prediction_type="RawFormulaVal", eval_period=step)
+        for index, margin in enumerate(staged):
+            iteration = min((index + 1) * step, n_rounds)
+            if iteration in wanted:
+                yield iteration, margin
+
+    else:
+        raise ValueError(f"Staged predictions are not supported for {algorithm}")
+
+def objective_name(model, algorithm):
+    """Name of the training objective or loss function"""
+    if algorithm == "xgboost":
+        return json.loads(model.save_config())["learner"]["objective"]["name"]
+    elif algorithm == "lightgbm":
+        # Boosters loaded from a model string have no params; the model header
+        # holds the objective, e.g. "binary sigmoid:1"
+        return model.params.get("objective") or model.dump_model(num_iteration=1)["objective"].split(" ")[0]
+    elif algorithm == "catboost":
+        return model.get_all_params()["loss_function"]
+    return ""
+
+def margin_to_prediction(margin, objective):
+    """Apply the objective's link function to raw margins"""
+    objective = objective.lower()
+    if objective in ("binary:logistic", "reg:logistic", "binary", "cross_entropy", "logloss", "crossentropy"):
+        return 1.0 / (1.0 + np.exp(-margin))
+    if objective.startswith("multi") or objective in ("softmax", "multiclass", "multiclassova"):
+        shifted = np.exp(margin - margin.max(axis=1, keepdims=True))
+        return shifted / shifted.sum(axis=1, keepdims=True)
+    if objective in ("count:poisson", "reg:gamma", "reg:tweedie", "poisson", "gamma", "tweedie"):
+        return np.exp(margin)
+    return margin
+
+def quantize(values, low, high):
+    """uint8 codes of values on [low, high], where value = low + code / 255 * (high - low)"""
+    if not high > low:
+        return np.zeros(np.shape(values), dtype=np.uint8)
+    return np.clip(np.rint((np.asarray(values) - low) / (high - low) * 255), 0, 255).astype(np.uint8)
+
+def staged_rasters(model, algorithm, task_type, X, shape, iterations, categorical_indices=()):
+    """uint8 rasters of the predictions on the rows of X after each iteration
+
+    X holds the points of a grid of the given shape, row-major. Returns
+    (arrays, scale): arrays["raster"] is (n_stages,) + shape and holds the
+    probability of the positive class for binary classifiers, the probability
+    of the most likely class for multiclass ones (whose index is in
+    arrays["label"]) and the value for regressors, all quantized on
+    scale = (low, high). Regression values are scaled over all stages, so
+    rasters of different stages are comparable.
+    """
+    objective = objective_name(model, algorithm)
+    n_stages = len(iterations)
+    values = np.empty((n_stages,) + tuple(shape))
+    labels = None
+    for stage, (_, margin) in enumerate(staged_margins(model, algorithm, X, iterations, categorical_indices)):
+        prediction = margin_to_prediction(np.asarray(margin, dtype=np.float64), objective)
+        if prediction.ndim == 2 and prediction.shape[1] > 1:
+            if labels is None:
+                labels = np.empty((n_stages,) + tuple(shape), dtype=np.uint8)
+            labels[stage] = prediction.argmax(axis=1).reshape(shape)
+            prediction = prediction.max(axis=1)
+        values[stage] = prediction.reshape(shape)
+
+    if task_type == "classification":
+        scale = (0.0, 1.0)
+    else:
+        scale = (float(values.min()), float(values.max())) if values.size else (0.0, 0.0)
+    arrays = {"raster": quantize(values, *scale)}
+    if labels is not None:
+        arrays["label"] = labels
+    return arrays, scale
+
+def residuals(y, prediction, task_type, classes=None):
+    """Per-sample residuals of one stage's predictions
+
+    Regression residuals are y - prediction. For classifiers they are one
+    minus the probability given to the true class, whether prediction holds
+    positive-class probabilities (binary) or one column per class.
+    """
+    prediction = np.asarray(prediction, dtype=np.float64)
+    if task_type != "classification":
+        return np.asarray(y, dtype=np.float64) - prediction
+    labels = np.searchsorted(classes, y)
+    if prediction.ndim == 2:
+        true_probability = np.take_along_axis(prediction, labels[:, None], axis=1)[:, 0]
+    else:
+        true_probability = np.where(labels == 1, prediction, 1.0 - prediction)
+    return 1.0 - true_probability
+
+def staged_metrics(model, algorithm, task_type, split, step):
+    """Test metrics every step rounds, computed from one incremental pass over the trees"""
+    n_rounds = boosted_rounds(model, algorithm)
+    if not n_rounds:
+        raise ValueError("Cannot determine the number of boosting rounds of the model")
+    objective = objective_name(model, algorithm)
+    classes = split.classes if task_type == "classification" else None
+
+    iterations = []
+    metrics = {}
+    stages = staged_margins(model, algorithm, split.X_test, stage_iterations(n_rounds, step), split.categorical_indices)
+    for iteration, margin in stages:
+        prediction = margin_to_prediction(np.asarray(margin), objective)
+        iterations.append(iteration)
+        for name, value in prediction_metrics(split.y_test, prediction, task_type, classes).items():
+            metrics.setdefault(name, []).append(value)
+
+    return {
+        "step": step,
+        "iterations": iterations,
+        "metrics": metrics
+    }
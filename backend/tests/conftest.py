@@ -0,0 +1,111 @@
+"""Shared fixtures; the backend modules import each other as top-level modules"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.datasets import load_breast_cancer, load_diabetes, load_wine
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import training  # noqa: E402
+from jobs import JobManager  # noqa: E402
+
+class Progress:
+    """ProgressReporter stand-in recording every update"""
+    def __init__(self, cancel_after=None):
+        self.updates = []
+        self.cancel_after = cancel_after
+
+    def started(self):
+        pass
+
+    def update(self, done, total, metrics=None):
+        self.updates.append((done, total))
+
+    def cancelled(self):
+        return self.cancel_after is not None and len(self.updates) >= self.cancel_after
+
+def sklearn_frame(loader):
+    data = loader()
+    df = pd.DataFrame(data.data, columns=data.feature_names)
+    df["target"] = data.target
+    return df
+
+def mixed_frame(n_samples=600, seed=0):
+    """Numeric features with missing values and zeros next to a categorical one"""
+    rng = np.random.RandomState(seed)
+    x1 = rng.rand(n_samples) * 10
+    x2 = rng.rand(n_samples)
+    color = rng.randint(0, 5, n_samples)
+    x1[rng.rand(n_samples) < 0.1] = np.nan
+    x2[rng.rand(n_samples) < 0.2] = 0.0
+    y = np.where(np.isnan(x1), 3.0, x1) + 2.0 * (color % 2) + 4.0 * (x2 == 0) + rng.randn(n_samples) * 0.1
+    return pd.DataFrame({"x1": x1, "x2": x2, "color": color.astype(float), "target": y})
+
+@pytest.fixture(scope="session")
+def datasets():
+    dataset_map = {
+        "breast_cancer": sklearn_frame(load_breast_cancer),
+        "wine": sklearn_frame(load_wine),
+        "diabetes": sklearn_frame(load_diabetes),
+        "mixed": mixed_frame()
+    }
+    training.register_datasets(dataset_map)
+    return dataset_map
+
+@pytest.fixture
+def progress():
+    return Progress()
+
+@pytest.fixture(scope="module")
+def manager():
+    """JobManager with a single worker and a single core"""
+    manager = JobManager(max_workers=1, cpu_budget=1)
+    yield manager
+    manager.shutdown()
+
+def training_request(algorithm, dataset_name, task_type, params=None, categorical_features=(), **extra):
+    """TrainingRequest dict as built by the API"""
+    return {
+        "algorithm": algorithm,
+        "params": params or {},
+        "dataset_name": dataset_name,
+        "target_column": "target",
+        "categorical_features": list(categorical_features),
+        "test_size": 0.2,
+        "random_state": 42,
+        "task_type": task_type,
+        **extra
+    }
+
+@pytest.fixture(scope="session")
+def client(tmp_path_factory):
+    """TestClient of the API with its worker pool running and an empty model store"""
+    # Read when app is imported
+    os.environ["MODEL_STORE_DIR"] = str(tmp_path_factory.mktemp("model_store"))
+    os.environ.setdefault("TRAINING_WORKERS", "1")
+    from fastapi.testclient import TestClient
+    import app
+    with TestClient(app.app) as client:
+        yield client
+
+def wait_for_job(client, job_id, timeout=120):
+    """Poll a job until it has finished and return its record"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = client.get(f"/jobs/{job_id}").json()
+        if job["status"] in ("completed", "failed", "cancelled"):
+            return job
+        time.sleep(0.05)
+    raise TimeoutError(f"Job {job_id} did not finish")
+
+def train_via_api(client, algorithm, dataset_name, task_type, params=None, **extra):
+    """Payload of a completed /train job"""
+    response = client.post("/train", json=training_request(algorithm, dataset_name, task_type, params, **extra))
+    assert response.status_code == 202, response.text
+    job = wait_for_job(client, response.json()["job_id"])
+    assert job["status"] == "completed", job["error"]
+    return job["result"]
@@ -0,0 +1,18 @@
+"""Job functions run by the JobManager tests; spawned workers import them by module name"""
+import time
+
+def count(progress, total, threads=None):
+    for iteration in range(1, total + 1):
+        progress.update(iteration, total)
+    return {"total": total, "threads": threads}
+
+def fail(progress, threads=None):
+    raise RuntimeError("job failed")
+
+def sleep(progress, seconds, threads=None):
+    deadline = time.time() + seconds
+    rounds = 0
+    while time.time() < deadline and not progress.cancelled():
+        time.sleep(0.01)
+        rounds += 1
+    return {"rounds": rounds}
@@ -0,0 +1,87 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+import batching
+from conftest import train_via_api
+
+class Recorder:
+    """predict_rows that records the size of every call"""
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, X):
+        self.calls.append(len(X))
+        return X.sum(axis=1)
+
+def run_concurrently(batcher, requests):
+    async def main():
+        return await asyncio.gather(*(batcher.predict(X) for X in requests))
+    return asyncio.run(main())
+
+def test_concurrent_requests_share_one_call():
+    predict_rows = Recorder()
+    batcher = batching.MicroBatcher(predict_rows, window=0.05, max_batch_size=64)
+    requests = [np.full((1, 3), i, dtype=np.float32) for i in range(5)] + [np.ones((4, 3), dtype=np.float32)]
+    results = run_concurrently(batcher, requests)
+    assert predict_rows.calls == [9]
+    for X, (prediction, info) in zip(requests, results):
+        np.testing.assert_array_equal(prediction, X.sum(axis=1))
+        assert info["batch_size"] == 9 and info["batch_requests"] == 6
+    stats = batcher.stats()
+    assert stats["batch_size"]["count"] == 1 and stats["batch_size"]["sum"] == 9
+    assert stats["queue_wait_ms"]["count"] == 6
+    assert stats["pending_rows"] == 0
+
+def test_full_batches_are_scored_before_the_window_ends():
+    predict_rows = Recorder()
+    # Only the last batch waits out the window
+    batcher = batching.MicroBatcher(predict_rows, window=0.05, max_batch_size=4)
+    results = run_concurrently(batcher, [np.ones((1, 2), dtype=np.float32)] * 8 + [np.ones((3, 2), dtype=np.float32)] * 4)
+    assert predict_rows.calls == [4, 4, 3, 3, 3, 3]
+    assert [len(prediction) for prediction, _ in results] == [1] * 8 + [3] * 4
+
+def test_errors_reach_every_waiting_request():
+    def predict_rows(X):
+        raise ValueError("bad rows")
+    batcher = batching.MicroBatcher(predict_rows, window=0.01)
+
+    async def main():
+        return await asyncio.gather(*(batcher.predict(np.ones((1, 2))) for _ in range(3)), return_exceptions=True)
+    assert [str(result) for result in asyncio.run(main())] == ["bad rows"] * 3
+
+def test_histogram_buckets():
+    histogram = batching.Histogram([1, 2, 4])
+    for value in (1, 2, 3, 5, 0.5):
+        histogram.observe(value)
+    stats = histogram.stats()
+    assert [bucket["count"] for bucket in stats["buckets"]] == [2, 1, 1, 1]
+    assert stats["buckets"][-1]["le"] is None
+    assert stats["mean"] == pytest.approx(2.3)
+    assert batching.batch_size_buckets(256) == [1, 2, 4, 8, 16, 32, 64, 128, 256]
+    assert batching.batch_size_buckets(100)[-1] == 100
+
+def test_batched_predict_requests(client, datasets):
+    model_id = train_via_api(client, "lightgbm", "wine", "classification", {"n_estimators": 5})["model_id"]
+    rows = datasets["wine"].drop(columns="target").head(12).values.tolist()
+
+    def predict(row):
+        response = client.post(f"/models/{model_id}/predict", json={"rows": [row], "batch": True})
+        assert response.status_code == 200
+        return response.json()
+
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        batched = list(pool.map(predict, rows))
+    assert all(1 <= result["batch"]["batch_requests"] <= len(rows) for result in batched)
+    unbatched = client.post(f"/models/{model_id}/predict", json={"rows": rows, "batch": False}).json()
+    np.testing.assert_allclose([result["predictions"][0] for result in batched], unbatched["predictions"], rtol=1e-6)
+    assert "batch" not in unbatched
+
+    stats = client.get("/admin/batching").json()
+    batcher = next(batcher for batcher in stats["batchers"]
+                   if batcher["model_id"] == model_id and batcher["engine"] == "native")
+    assert batcher["queue_wait_ms"]["count"] == len(rows)
+    assert batcher["batch_size"]["sum"] == len(rows)
+    assert stats["max_batch_size"] == batching.MAX_BATCH_SIZE
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from cache import LRUCache, PredictionCache, training_cache_key
+from conftest import train_via_api, training_request
+
+def test_lru_cache_evicts_least_recently_used():
+    evicted = []
+    cache = LRUCache(max_entries=2, max_bytes=100, on_evict=lambda key, value: evicted.append(key))
+    cache.put("a", 1, size=10)
+    cache.put("b", 2, size=10)
+    assert cache.get("a") == 1
+    cache.put("c", 3, size=10)
+    assert evicted == ["b"]
+    assert "a" in cache and "c" in cache and "b" not in cache
+    stats = cache.stats()
+    assert (stats["entries"], stats["bytes"], stats["hits"], stats["evictions"]) == (2, 20, 1, 1)
+
+def test_lru_cache_bounds_bytes():
+    cache = LRUCache(max_entries=10, max_bytes=100)
+    cache.put("a", 1, size=60)
+    cache.put("b", 2, size=60)
+    assert "a" not in cache and cache.stats()["bytes"] == 60
+    # Entries larger than the whole budget are not cached
+    cache.put("c", 3, size=200)
+    assert "c" not in cache
+    assert cache.pop("b") == 2 and len(cache) == 0
+
+def test_training_cache_key_ignores_explicit_defaults():
+    request = training_request("xgboost", "wine", "classification", categorical_features=["b", "a"])
+    defaults = {"max_depth": 3}
+    key = training_cache_key(request, "hash", defaults)
+    assert key == training_cache_key({**request, "params": {"max_depth": 3}, "categorical_features": ["a", "b"]},
+                                     "hash", defaults)
+    assert key != training_cache_key({**request, "params": {"max_depth": 4}}, "hash", defaults)
+    assert key != training_cache_key(request, "other", defaults)
+
+def test_training_cache_key_covers_warm_start_and_time_budget():
+    request = training_request("xgboost", "wine", "classification", {"n_estimators": 20}, early_stopping_rounds=5)
+    key = training_cache_key(request, "hash", {})
+    warm_start = {"model": None, "model_id": "base", "base_rounds": 10, "added_rounds": 10}
+    warm_key = training_cache_key({**request, "base_model_id": "base"}, "hash", {}, warm_start)
+    assert warm_key != key
+    assert warm_key != training_cache_key({**request, "base_model_id": "base"}, "hash", {},
+                                          {**warm_start, "base_rounds": 8, "added_rounds": 12})
+    assert training_cache_key({**request, "max_seconds": 5.0}, "hash", {}) != key
+
+def test_training_results_are_served_from_the_cache(client, datasets):
+    params = {"n_estimators": 6, "max_depth": 2}
+    first = train_via_api(client, "xgboost", "wine", "classification", params)
+    response = client.post("/train", json=training_request("xgboost", "wine", "classification", params))
+    assert response.json()["cached"] and response.json()["status"] == "completed"
+    assert response.json()["model_id"] == first["model_id"]
+    assert client.get(f"/jobs/{response.json()['job_id']}").json()["result"]["cached"]
+
+def test_warm_started_trainings_are_cached_apart(client, datasets):
+    base = train_via_api(client, "xgboost", "wine", "classification", {"n_estimators": 4, "max_depth": 3})
+    params = {"n_estimators": 8, "max_depth": 3}
+    scratch = train_via_api(client, "xgboost", "wine", "classification", params)
+    continued = train_via_api(client, "xgboost", "wine", "classification", params, base_model_id=base["model_id"])
+    assert not continued.get("cached") and continued["warm_start"]["base_model_id"] == base["model_id"]
+    # A later from-scratch request still gets the from-scratch model
+    again = train_via_api(client, "xgboost", "wine", "classification", params)
+    assert again["cached"] and again["model_id"] == scratch["model_id"] and again["warm_start"] is None
+
+def test_prediction_cache_keeps_engines_apart():
+    cache = PredictionCache(max_entries=100, max_bytes=1 << 20)
+    X = np.arange(6, dtype=np.float32).reshape(2, 3)
+    keys = cache.row_keys(X)
+    native, compiled = PredictionCache.kind("native", "prediction"), PredictionCache.kind("compiled", "prediction")
+    cache.put_many(keys, native, [0.25, 0.75])
+    assert cache.get_many(keys, compiled) == [None, None]
+    assert cache.get_many(keys, PredictionCache.kind("native", "margin")) == [None, None]
+    assert [float(value) for value in cache.get_many(keys, native)] == [0.25, 0.75]
+
+def test_prediction_cache_rejects_unknown_outputs():
+    with pytest.raises(ValueError):
+        PredictionCache.kind("native", "leaves")
+
+def test_predict_serves_cached_rows(client, datasets):
+    model_id = train_via_api(client, "lightgbm", "diabetes", "regression", {"n_estimators": 5})["model_id"]
+    rows = datasets["diabetes"].drop(columns="target").head(6).values.tolist()
+    assert client.get(f"/models/{model_id}/prediction-cache").json()["enabled"] is False
+    assert client.put(f"/models/{model_id}/prediction-cache", json={"max_entries": 100}).json()["enabled"]
+    url = f"/models/{model_id}/predict"
+    first = client.post(url, json={"rows": rows[:4], "batch": False}).json()
+    assert first["cache"] == {"hits": 0, "misses": 4}
+    second = client.post(url, json={"rows": rows, "batch": False}).json()
+    assert second["cache"] == {"hits": 4, "misses": 2}
+    np.testing.assert_allclose(second["predictions"][:4], first["predictions"])
+    # Compiled predictions are cached apart from native ones
+    assert client.post(url, json={"rows": rows, "engine": "compiled", "batch": False}).json()["cache"]["hits"] == 0
+    row = client.post(f"/models/{model_id}/predict-row", json={"values": rows[0]}).json()
+    again = client.post(f"/models/{model_id}/predict-row", json={"values": rows[0]}).json()
+    assert not row["cached"] and again["cached"] and again["prediction"] == row["prediction"]
+    client.put(f"/models/{model_id}/prediction-cache", json={"enabled": False})
+    assert "cache" not in client.post(url, json={"rows": rows, "batch": False}).json()
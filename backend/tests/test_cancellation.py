@@ -0,0 +1,50 @@
+import time
+
+import jobfns
+from conftest import train_via_api, training_request, wait_for_job
+
+def test_cancel_queued_and_running_jobs(manager):
+    running = manager.submit(jobfns.sleep, 30)
+    # The budget of one thread keeps the second job queued
+    queued = manager.submit(jobfns.count, 3)
+    assert manager.cancel(queued)["status"] == "cancelled"
+    manager.cancel(running, keep_partial=True)
+    job, = manager.wait([running], timeout=60)
+    assert job["status"] == "cancelled" and job["result"]["rounds"] >= 0
+    job, = manager.wait([queued], timeout=60)
+    assert job["result"] is None
+
+def submit_long_training(client):
+    request = training_request("xgboost", "breast_cancer", "classification",
+                               {"n_estimators": 100000, "learning_rate": 0.01, "max_depth": 6})
+    job_id = client.post("/train", json=request).json()["job_id"]
+    deadline = time.time() + 60
+    while client.get(f"/jobs/{job_id}").json()["progress"]["iteration"] in (0, None) and time.time() < deadline:
+        time.sleep(0.02)
+    return job_id
+
+def test_delete_keeps_the_partial_model(client, datasets):
+    job_id = submit_long_training(client)
+    response = client.delete(f"/jobs/{job_id}", params={"keep_partial": True})
+    assert response.status_code == 200 and response.json()["cancel_requested"]
+    job = wait_for_job(client, job_id)
+    assert job["status"] == "cancelled"
+    payload = job["result"]
+    assert payload["stopped"] == "cancelled" and 0 < payload["rounds_trained"] < 100000
+    assert client.get(f"/models/{payload['model_id']}").status_code == 200
+    # Finished jobs cannot be cancelled again
+    assert client.delete(f"/jobs/{job_id}").status_code == 409
+
+def test_delete_without_partial_model(client, datasets):
+    job_id = submit_long_training(client)
+    client.delete(f"/jobs/{job_id}")
+    job = wait_for_job(client, job_id)
+    assert job["status"] == "cancelled" and job["result"] is None
+    assert client.delete("/jobs/unknown").status_code == 404
+
+def test_time_budget_stops_training(client, datasets):
+    payload = train_via_api(client, "lightgbm", "breast_cancer", "classification",
+                            {"n_estimators": 100000, "learning_rate": 0.01}, max_seconds=0.5)
+    assert payload["stopped"] == "time_limit" and 0 < payload["rounds_trained"] < 100000
+    request = training_request("lightgbm", "wine", "classification", max_seconds=0)
+    assert client.post("/train", json=request).status_code == 400
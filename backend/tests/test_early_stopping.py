@@ -0,0 +1,23 @@
+import pytest
+
+from conftest import train_via_api, training_request
+
+@pytest.mark.parametrize("algorithm,params", [
+    ("xgboost", {"n_estimators": 300, "learning_rate": 0.5}),
+    ("lightgbm", {"n_estimators": 300, "learning_rate": 0.5}),
+    ("catboost", {"iterations": 300, "learning_rate": 0.5})
+])
+def test_early_stopped_models_are_cut_to_the_best_iteration(client, datasets, algorithm, params):
+    payload = train_via_api(client, algorithm, "breast_cancer", "classification", params, early_stopping_rounds=5)
+    early_stopping = payload["early_stopping"]
+    assert early_stopping["stopped_early"]
+    assert early_stopping["rounds_requested"] == 300
+    assert early_stopping["best_iteration"] < early_stopping["rounds_trained"] < 300
+    assert early_stopping["trees_dropped"] == early_stopping["rounds_trained"] - early_stopping["best_iteration"]
+    assert early_stopping["time_saved"] > 0
+    # The stored model only holds the rounds up to the best one
+    assert payload["rounds_trained"] == early_stopping["best_iteration"]
+
+def test_early_stopping_rounds_must_be_positive(client, datasets):
+    request = training_request("xgboost", "wine", "classification", early_stopping_rounds=0)
+    assert client.post("/train", json=request).status_code == 400
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+import explain
+import predictor
+from conftest import train_via_api, wait_for_job
+from test_predictor import train
+
+@pytest.mark.parametrize("algorithm", ["xgboost", "lightgbm", "catboost"])
+@pytest.mark.parametrize("dataset_name,task_type", [("wine", "classification"), ("diabetes", "regression")])
+def test_native_contributions_sum_to_the_margin(datasets, algorithm, dataset_name, task_type):
+    model, X, split = train(algorithm, dataset_name, task_type)
+    contributions, method = explain.contributions(model, algorithm, X, split.categorical_indices, "native")
+    assert method == "native"
+    margin = np.asarray(predictor.native_predict(model, algorithm, task_type, X, split.categorical_indices,
+                                                 output_margin=True), dtype=np.float64)
+    np.testing.assert_allclose(contributions.sum(axis=2).reshape(margin.shape), margin, rtol=0,
+                               atol=1e-4 * max(1.0, np.abs(margin).max()))
+
+def test_shap_rejects_xgboost_categorical_splits(datasets):
+    model, X, split = train("xgboost", "mixed", "regression", categorical_features=["color"])
+    assert explain.xgboost_has_categorical_splits(model)
+    assert not explain.xgboost_has_categorical_splits(train("xgboost", "mixed", "regression")[0])
+    with pytest.raises(ValueError, match="categorical splits"):
+        explain.check_shap(model, "xgboost")
+    # The library's own TreeSHAP handles them
+    assert explain.contributions(model, "xgboost", X, split.categorical_indices)[1] == "native"
+
+def test_unknown_method(datasets):
+    model, X, split = train("lightgbm", "diabetes", "regression")
+    with pytest.raises(ValueError):
+        explain.contributions(model, "lightgbm", X, [], "exact")
+
+def test_shap_on_xgboost(datasets):
+    model, X, split = train("xgboost", "diabetes", "regression")
+    if not explain.shap_reads_xgboost():
+        with pytest.raises(ValueError, match="numpy"):
+            explain.check_shap(model, "xgboost")
+        return
+    contributions, method = explain.contributions(model, "xgboost", X, split.categorical_indices, "shap")
+    assert method == "shap"
+    native, _ = explain.contributions(model, "xgboost", X, split.categorical_indices, "native")
+    np.testing.assert_allclose(contributions.sum(axis=2), native.sum(axis=2), rtol=1e-4, atol=1e-4)
+
+@pytest.fixture(scope="module")
+def wine_models(client, datasets):
+    params = {"n_estimators": 5, "max_depth": 3}
+    return {algorithm: train_via_api(client, algorithm, "wine", "classification", params)["model_id"]
+            for algorithm in ("xgboost", "lightgbm")}
+
+def wine_rows(datasets, n):
+    return datasets["wine"].drop(columns="target").head(n).values.tolist()
+
+def test_explain_endpoint_sums_to_the_margin(client, datasets, wine_models):
+    rows = wine_rows(datasets, 5)
+    for algorithm, model_id in wine_models.items():
+        response = client.post(f"/models/{model_id}/explain", json={"rows": rows, "method": "native"})
+        assert response.status_code == 200
+        result = response.json()
+        assert result["method"] == "native" and result["n_explained"] == 5
+        assert len(result["outputs"]) == 3 and len(result["contributions"][0][0]) == len(result["features"])
+        margin = client.post(f"/models/{model_id}/predict", json={"rows": rows, "output_margin": True}).json()
+        total = np.asarray(result["contributions"]).sum(axis=2) + np.asarray(result["base_value"])
+        np.testing.assert_allclose(total, margin["predictions"], rtol=1e-4, atol=1e-4)
+
+def test_explain_endpoint_with_shap(client, datasets, wine_models):
+    rows = wine_rows(datasets, 3)
+    lightgbm = client.post(f"/models/{wine_models['lightgbm']}/explain", json={"rows": rows, "method": "shap"})
+    assert lightgbm.status_code == 200 and lightgbm.json()["method"] == "shap"
+    native = client.post(f"/models/{wine_models['lightgbm']}/explain", json={"rows": rows, "method": "native"}).json()
+    np.testing.assert_allclose(lightgbm.json()["contributions"], native["contributions"], rtol=1e-4, atol=1e-4)
+    xgboost = client.post(f"/models/{wine_models['xgboost']}/explain", json={"rows": rows, "method": "shap"})
+    if explain.shap_reads_xgboost():
+        assert xgboost.status_code == 200 and xgboost.json()["method"] == "shap"
+    else:
+        # A 400 naming the versions rather than a failure inside shap
+        assert xgboost.status_code == 400 and "numpy" in xgboost.json()["detail"]
+    assert client.post(f"/models/{wine_models['xgboost']}/explain", json={"rows": rows, "method": "exact"}).status_code == 400
+
+def test_large_batches_are_explained_by_a_job(client, datasets, wine_models, monkeypatch):
+    monkeypatch.setattr(explain, "EXPLAIN_CHUNK_ROWS", 4)
+    rows = wine_rows(datasets, 10)
+    response = client.post(f"/models/{wine_models['xgboost']}/explain", json={"rows": rows})
+    assert response.status_code == 202
+    assert response.json()["rows_to_explain"] == 10
+    job = wait_for_job(client, response.json()["job_id"])
+    assert job["status"] == "completed", job["error"]
+    assert job["result"]["n_explained"] == 10 and job["result"]["method"] == "native"
+    direct = client.post(f"/models/{wine_models['xgboost']}/explain", json={"rows": rows[:4]}).json()
+    np.testing.assert_allclose(job["result"]["contributions"][:4], direct["contributions"], rtol=1e-6)
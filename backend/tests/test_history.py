@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from conftest import train_via_api
+from history import MetricHistory, higher_is_better, lttb, series_keys, series_summary
+from test_payloads import DECODERS
+
+def test_metric_history_grows_columns():
+    history = MetricHistory()
+    for iteration in range(100):
+        metrics = {"train": {"logloss": 1.0 / (iteration + 1)}}
+        if iteration >= 50:
+            metrics["valid"] = {"auc": iteration / 100}
+        history.append(iteration, metrics)
+    arrays = history.arrays()
+    np.testing.assert_array_equal(arrays["iterations"], np.arange(100))
+    assert np.isnan(arrays["valid/auc"][:50]).all()
+    assert arrays["valid/auc"][99] == 0.99
+    assert sorted(series_keys(arrays)) == [("train", "logloss"), ("valid", "auc")]
+
+def test_higher_is_better():
+    assert higher_is_better("auc") and higher_is_better("ndcg@5") and higher_is_better("map:3")
+    assert not higher_is_better("logloss") and not higher_is_better("rmse")
+
+def test_lttb_keeps_endpoints_and_peaks():
+    x = np.arange(1000, dtype=np.float64)
+    y = np.sin(x / 50)
+    y[437] = 25.0
+    selected = lttb(x, y, 50)
+    assert len(selected) == 50
+    assert selected[0] == 0 and selected[-1] == 999
+    assert np.all(np.diff(selected) > 0)
+    assert 437 in selected
+
+def test_lttb_returns_everything_when_short():
+    np.testing.assert_array_equal(lttb(np.arange(5), np.arange(5), 10), np.arange(5))
+    with pytest.raises(ValueError):
+        lttb(np.arange(10), np.arange(10), 2)
+
+def test_series_summary_ignores_nans():
+    iterations = np.arange(5)
+    values = np.array([np.nan, 0.5, 0.2, 0.4, np.nan])
+    summary = series_summary(iterations, values, higher_is_better=False)
+    assert summary["n_points"] == 3
+    assert (summary["best_iteration"], summary["best_value"]) == (2, 0.2)
+    assert (summary["final_iteration"], summary["final_value"]) == (3, 0.4)
+    assert summary["max"] == 0.5
+    assert series_summary(iterations, np.full(5, np.nan), True) == {"n_points": 0}
+
+def test_history_endpoint_downsamples(client, datasets):
+    model_id = train_via_api(client, "xgboost", "breast_cancer", "classification", {"n_estimators": 60})["model_id"]
+    url = f"/models/{model_id}/history"
+    response = client.get(url, params={"points": 10, "format": "json"})
+    assert response.status_code == 200
+    meta, columns = DECODERS["json"](response.content)
+    assert meta["series"] and meta["downsampled"] and meta["rounds"] == 60
+    for series in meta["series"]:
+        key = f"{series['dataset']}/{series['metric']}"
+        iterations = columns[f"{key}/iteration"]
+        assert series["returned_points"] == len(iterations) == 10 and series["n_points"] == 60
+        # LTTB keeps the first and last rounds, counted from 1
+        assert iterations[0] == 1 and iterations[-1] == 60 and np.all(np.diff(iterations) > 0)
+        assert columns[f"{key}/value"][-1] == pytest.approx(series["final_value"])
+    full_meta, full = DECODERS["json"](client.get(url, params={"full": True, "format": "json"}).content)
+    series = full_meta["series"][0]
+    key = f"{series['dataset']}/{series['metric']}"
+    assert len(full[f"{key}/value"]) == 60
+    # The summary covers every round, downsampled or not
+    assert series["best_value"] == (np.max if series["higher_is_better"] else np.min)(full[f"{key}/value"])
+    selected_meta, selected = DECODERS["json"](client.get(url, params={
+        "dataset": series["dataset"], "metric": series["metric"], "format": "json"}).content)
+    assert [(s["dataset"], s["metric"]) for s in selected_meta["series"]] == [(series["dataset"], series["metric"])]
+    assert client.get(url, params={"metric": "unknown"}).status_code == 404
+    assert client.get(url, params={"points": 2}).status_code == 400
+    assert client.get("/models/unknown/history").status_code == 404
@@ -0,0 +1,93 @@
+import json
+import time
+
+import pytest
+
+import jobfns
+from conftest import training_request, wait_for_job
+from jobs import JobManager
+
+def test_job_completes_with_progress(manager):
+    job_id = manager.submit(jobfns.count, 5)
+    job, = manager.wait([job_id], timeout=60)
+    assert job["status"] == "completed"
+    assert job["result"] == {"total": 5, "threads": 1}
+    assert job["progress"]["fraction"] == 1.0
+
+def test_on_complete_transforms_the_result(manager):
+    job_id = manager.submit(jobfns.count, 2, on_complete=lambda result: result["total"] * 10)
+    job, = manager.wait([job_id], timeout=60)
+    assert job["result"] == 20
+
+def test_failed_job_records_the_error(manager):
+    job_id = manager.submit(jobfns.fail)
+    job, = manager.wait([job_id], timeout=60)
+    assert job["status"] == "failed" and "job failed" in job["error"]
+    assert manager.get("unknown") is None
+
+def test_train_endpoint_runs_a_job(client, datasets):
+    response = client.post("/train", json={"algorithm": "lightgbm", "params": {"n_estimators": 5},
+                                           "dataset_name": "wine", "target_column": "target"})
+    assert response.status_code == 202
+    job = wait_for_job(client, response.json()["job_id"])
+    assert job["status"] == "completed" and job["kind"] == "train"
+    model_id = job["result"]["model_id"]
+    assert client.get(f"/models/{model_id}").status_code == 200
+    assert client.get("/jobs/unknown").status_code == 404
+
+def test_train_endpoint_reports_failures(client, datasets):
+    result = client.post("/train", json={"algorithm": "xgboost", "params": {"n_estimators": 5, "max_depth": -3},
+                                         "dataset_name": "wine", "target_column": "target"})
+    job = wait_for_job(client, result.json()["job_id"])
+    assert job["status"] == "failed" and job["error"]
+
+def test_finished_jobs_drop_events_and_subscribers(manager):
+    job_id = manager.submit(jobfns.count, 3)
+    manager.wait([job_id], timeout=60)
+    assert job_id not in manager.history and job_id not in manager.subscribers
+    # Late subscribers only get the terminal event
+    backlog, _ = manager.subscribe(job_id, None)
+    assert [event["event"] for event in backlog] == ["completed"]
+    assert job_id not in manager.subscribers
+
+def test_finished_job_records_expire():
+    manager = JobManager(max_workers=1, cpu_budget=1, max_finished=2, finished_ttl=60)
+    try:
+        job_ids = [manager.add_completed(index) for index in range(3)]
+        assert manager.get(job_ids[0]) is None
+        assert [manager.get(job_id)["result"] for job_id in job_ids[1:]] == [1, 2]
+        manager.finished_ttl = 0
+        time.sleep(0.01)
+        manager.add_completed(3)
+        assert all(manager.get(job_id) is None for job_id in job_ids)
+        assert not manager.history and not manager.subscribers
+    finally:
+        manager.shutdown()
+
+def read_events(client, job_id):
+    """(event, data) pairs of a job's Server-Sent Events stream"""
+    events = []
+    with client.stream("GET", f"/jobs/{job_id}/stream") as response:
+        assert response.headers["content-type"].startswith("text/event-stream")
+        event = None
+        for line in response.iter_lines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                events.append((event, json.loads(line[len("data: "):])))
+    return events
+
+def test_stream_sends_progress_in_order(client, datasets):
+    request = training_request("xgboost", "breast_cancer", "classification", {"n_estimators": 8})
+    job_id = client.post("/train", json=request).json()["job_id"]
+    events = read_events(client, job_id)
+    names = [name for name, _ in events]
+    assert names[-1] == "completed" and names.count("completed") == 1
+    iterations = [data["iteration"] for name, data in events if name == "progress"]
+    # Progress sent before the client subscribed is replayed first
+    assert iterations == list(range(1, 9))
+    assert all("train" in data["metrics"] for name, data in events if name == "progress")
+    assert events[-1][1]["model_id"] == wait_for_job(client, job_id)["result"]["model_id"]
+    # Once finished the stream only replays the outcome
+    assert [name for name, _ in read_events(client, job_id)] == ["completed"]
+    assert client.get("/jobs/unknown/stream").status_code == 404
@@ -0,0 +1,55 @@
+import numpy as np
+
+import predictor
+from conftest import train_via_api
+from model_store import ModelStore
+from test_predictor import train
+
+def model_info(algorithm, model, split, task_type):
+    return {"algorithm": algorithm, "task_type": task_type, "features": split.features, "dataset": "wine",
+            "metrics": {}, "timestamp": 0.0, "model": model}
+
+def test_models_survive_eviction_and_restarts(tmp_path, datasets):
+    events = []
+    store = ModelStore(str(tmp_path), max_bytes=1 << 30, max_entries=1)
+    store.add_listener(lambda model_id, reason: events.append((model_id, reason)))
+    expected = {}
+    for algorithm in ("xgboost", "lightgbm", "catboost"):
+        model, X, split = train(algorithm, "wine", "classification")
+        store[algorithm] = model_info(algorithm, model, split, "classification")
+        expected[algorithm] = predictor.native_predict(model, algorithm, "classification", X, [])
+    # One model fits in memory, so the first two were evicted and are read back from disk
+    assert events == [("xgboost", "evicted"), ("lightgbm", "evicted")]
+    for algorithm, prediction in expected.items():
+        model = store[algorithm]["model"]
+        np.testing.assert_allclose(predictor.native_predict(model, algorithm, "classification", X, []), prediction)
+    # Each load evicts the model read before it
+    assert store.stats()["loads_from_disk"] == 3
+
+    store.put_history("xgboost", {"iterations": np.arange(3)})
+    restarted = ModelStore(str(tmp_path), max_bytes=1 << 30)
+    assert sorted(restarted.metadata()) == ["catboost", "lightgbm", "xgboost"]
+    assert restarted.model_path("lightgbm").endswith(".txt")
+    np.testing.assert_array_equal(restarted.history("xgboost")["iterations"], np.arange(3))
+    assert restarted.history("lightgbm") is None
+    model = restarted.load("catboost")
+    np.testing.assert_allclose(predictor.native_predict(model, "catboost", "classification", X, []),
+                               expected["catboost"])
+
+def test_storing_a_model_again_notifies_listeners(tmp_path, datasets):
+    store = ModelStore(str(tmp_path), max_bytes=1 << 30)
+    events = []
+    store.add_listener(lambda model_id, reason: events.append(reason))
+    model, X, split = train("lightgbm", "wine", "classification")
+    store["m"] = model_info("lightgbm", model, split, "classification")
+    store["m"] = model_info("lightgbm", model, split, "classification")
+    assert events == ["replaced"] and len(store) == 1
+
+def test_model_endpoints(client, datasets):
+    payload = train_via_api(client, "lightgbm", "wine", "classification", {"n_estimators": 5})
+    model_id = payload["model_id"]
+    assert model_id in [model["id"] for model in client.get("/models").json()["models"]]
+    info = client.get(f"/models/{model_id}").json()
+    assert info["n_trees"] == 15 and info["algorithm"] == "lightgbm"
+    assert client.get("/models/unknown").status_code == 404
+    assert client.get("/cache/models").json()["models"] >= 1
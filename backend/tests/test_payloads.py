@@ -0,0 +1,75 @@
+import json
+
+import numpy as np
+import pytest
+
+import payloads
+
+META = {"model_id": "m", "shape": [2, 3]}
+
+def sample_arrays():
+    return {
+        "values": np.array([[0.5, np.nan, -1.0], [2.0, 3.5, 1e-9]]),
+        "labels": np.array([[0, 1, 2], [2, 1, 0]], dtype=np.uint8),
+        "counts": np.arange(4, dtype=np.int32),
+        "scores": np.linspace(0, 1, 5, dtype=np.float32)
+    }
+
+def decode_arrow(body):
+    pa = pytest.importorskip("pyarrow")
+    table = pa.ipc.open_stream(body).read_all()
+    meta = json.loads(table.schema.metadata[b"meta"])
+    shapes = meta.pop("shapes")
+    arrays = {name: np.asarray(table.column(name)[0].values.to_numpy(zero_copy_only=False)).reshape(shapes[name])
+              for name in table.column_names}
+    return meta, arrays
+
+def decode_msgpack(body):
+    msgpack = pytest.importorskip("msgpack")
+    meta = msgpack.unpackb(body, raw=False)
+    arrays = {name: np.frombuffer(array["data"], dtype=np.dtype(array["dtype"])).reshape(array["shape"])
+              for name, array in meta.pop("arrays").items()}
+    return meta, arrays
+
+def decode_json(body):
+    meta = json.loads(body)
+    arrays = {name: np.array(values, dtype=np.float64) for name, values in meta.pop("arrays").items()}
+    return meta, arrays
+
+DECODERS = {"arrow": decode_arrow, "msgpack": decode_msgpack, "json": decode_json}
+
+@pytest.mark.parametrize("fmt", ["arrow", "msgpack", "json"])
+def test_encode_round_trip(fmt):
+    if fmt not in payloads.available_formats():
+        pytest.skip(f"{fmt} is not installed")
+    arrays = sample_arrays()
+    body, media_type = payloads.encode(META, arrays, fmt)
+    assert media_type == payloads.MEDIA_TYPES[fmt]
+    meta, decoded = DECODERS[fmt](body)
+    assert meta == META
+    assert list(decoded) == list(arrays)
+    for name, array in arrays.items():
+        assert decoded[name].shape == array.shape
+        np.testing.assert_array_equal(decoded[name], array)
+        if fmt != "json":
+            assert decoded[name].dtype == array.dtype
+
+def test_json_writes_nan_as_null():
+    body, _ = payloads.encode({}, {"values": np.array([1.0, np.nan])}, "json")
+    assert json.loads(body)["arrays"]["values"] == [1.0, None]
+
+def test_negotiate():
+    formats = payloads.available_formats()
+    assert formats[-1] == "json"
+    assert payloads.negotiate(None) == "json"
+    assert payloads.negotiate("text/html") == "json"
+    assert payloads.negotiate(None, "json") == "json"
+    assert payloads.negotiate(None, "xml") is None
+    if "msgpack" in formats:
+        assert payloads.negotiate("application/x-msgpack;q=0.9, application/json") == "msgpack"
+    if "arrow" in formats:
+        assert payloads.negotiate("application/vnd.apache.arrow.stream") == "arrow"
+
+def test_encode_rejects_unknown_formats():
+    with pytest.raises(ValueError):
+        payloads.encode({}, {}, "xml")
@@ -0,0 +1,96 @@
+import io
+import json
+
+import numpy as np
+import pytest
+
+from conftest import train_via_api
+
+@pytest.fixture(scope="module")
+def cancer_model(client, datasets):
+    return train_via_api(client, "xgboost", "breast_cancer", "classification", {"n_estimators": 5, "max_depth": 3})["model_id"]
+
+@pytest.fixture(scope="module")
+def cancer_rows(datasets):
+    return datasets["breast_cancer"].drop(columns="target").head(23)
+
+def read_records(response):
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+def test_predict_json_rows_with_both_engines(client, cancer_model, cancer_rows):
+    rows = cancer_rows.values.tolist()
+    native = client.post(f"/models/{cancer_model}/predict", json={"rows": rows, "engine": "native", "batch": False})
+    compiled = client.post(f"/models/{cancer_model}/predict", json={"rows": rows, "engine": "compiled", "batch": False})
+    assert native.status_code == 200 and compiled.status_code == 200
+    native, compiled = native.json(), compiled.json()
+    assert native["n_rows"] == compiled["n_rows"] == len(rows)
+    assert native["engine"] == "native" and compiled["engine"] == "compiled"
+    np.testing.assert_allclose(native["predictions"], compiled["predictions"], rtol=1e-5, atol=1e-6)
+    assert native["labels"] == compiled["labels"]
+    # Rows may also name their features
+    named = client.post(f"/models/{cancer_model}/predict", json={"rows": cancer_rows.head(2).to_dict("records")})
+    np.testing.assert_allclose(named.json()["predictions"], native["predictions"][:2], rtol=1e-5)
+
+def test_predict_streams_csv_in_chunks(client, cancer_model, cancer_rows):
+    buffer = io.StringIO()
+    # Columns in reverse order are matched by name
+    cancer_rows[cancer_rows.columns[::-1]].to_csv(buffer, index=False)
+    response = client.post(f"/models/{cancer_model}/predict", params={"chunk_size": 10},
+                           content=buffer.getvalue().encode(), headers={"content-type": "text/csv"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    *chunks, last = read_records(response)
+    assert [chunk["n_rows"] for chunk in chunks] == [10, 10, 3]
+    assert [chunk["start"] for chunk in chunks] == [0, 10, 20]
+    summary = last["summary"]
+    assert summary["completed"] and summary["n_rows"] == len(cancer_rows) and summary["n_chunks"] == 3
+    assert summary["rows_per_second"] > 0
+    expected = client.post(f"/models/{cancer_model}/predict", json={"rows": cancer_rows.values.tolist()}).json()
+    streamed = [prediction for chunk in chunks for prediction in chunk["predictions"]]
+    np.testing.assert_allclose(streamed, expected["predictions"], rtol=1e-5)
+
+def test_predict_reports_bad_csv_in_band(client, cancer_model, cancer_rows):
+    body = ",".join(cancer_rows.columns) + "\n" + "\n".join(["1.0," * (len(cancer_rows.columns) - 1) + "x"] * 3)
+    response = client.post(f"/models/{cancer_model}/predict", params={"chunk_size": 2},
+                           content=body.encode(), headers={"content-type": "text/csv"})
+    assert response.status_code == 200
+    records = read_records(response)
+    assert "error" in records[-2]
+    assert not records[-1]["summary"]["completed"]
+
+def test_predict_streams_arrow_batches(client, cancer_model, cancer_rows):
+    pa = pytest.importorskip("pyarrow")
+    table = pa.Table.from_pandas(cancer_rows, preserve_index=False)
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table, max_chunksize=7)
+    response = client.post(f"/models/{cancer_model}/predict", params={"chunk_size": 10, "engine": "compiled"},
+                           content=sink.getvalue(), headers={"content-type": "application/vnd.apache.arrow.stream"})
+    assert response.status_code == 200
+    *chunks, last = read_records(response)
+    assert sum(chunk["n_rows"] for chunk in chunks) == last["summary"]["n_rows"] == len(cancer_rows)
+    assert all(chunk["n_rows"] <= 10 for chunk in chunks)
+
+def test_predict_rejects_bad_requests(client, cancer_model):
+    url = f"/models/{cancer_model}/predict"
+    assert client.post(url, params={"chunk_size": 0}, content=b"a\n1", headers={"content-type": "text/csv"}).status_code == 400
+    assert client.post(url, content=b"rows", headers={"content-type": "text/plain"}).status_code == 415
+    assert client.post(url, json={"rows": [[1.0, 2.0]]}).status_code == 400
+    assert client.post("/models/unknown/predict", json={"rows": [[1.0]]}).status_code == 404
+
+def test_predict_row_matches_predict(client, cancer_model, cancer_rows):
+    row = cancer_rows.iloc[0].tolist()
+    single = client.post(f"/models/{cancer_model}/predict-row", json={"values": row})
+    assert single.status_code == 200
+    single = single.json()
+    rows = client.post(f"/models/{cancer_model}/predict", json={"rows": [row], "batch": False}).json()
+    assert single["prediction"] == pytest.approx(rows["predictions"][0], rel=1e-5)
+    assert single["label"] == rows["labels"][0]
+    margin = client.post(f"/models/{cancer_model}/predict-row", json={"values": row, "output_margin": True}).json()
+    assert "label" not in margin
+    # Binary models predict the positive class probability
+    assert 1 / (1 + np.exp(-margin["prediction"])) == pytest.approx(single["prediction"], rel=1e-5)
+    missing = client.post(f"/models/{cancer_model}/predict-row", json={"values": [None] * len(row)})
+    assert missing.status_code == 200
+    assert client.post(f"/models/{cancer_model}/predict-row", json={"values": row[:3]}).status_code == 400
+    assert client.post("/models/unknown/predict-row", json={"values": row}).status_code == 404
@@ -0,0 +1,107 @@
+import lightgbm as lgb
+import numpy as np
+import pytest
+import xgboost as xgb
+from sklearn.datasets import load_diabetes, load_wine
+
+import predictor
+import training
+import trees
+from conftest import Progress, training_request
+
+ROUNDS_PARAM = {"xgboost": "n_estimators", "lightgbm": "n_estimators", "catboost": "iterations"}
+
+# XGBoost sums leaf values in float32, the others and the compiled predictor
+# in float64; tolerances are relative to the largest output
+TOLERANCE = {"xgboost": 1e-5, "lightgbm": 1e-9, "catboost": 1e-9}
+
+def train(algorithm, dataset_name, task_type, params=None, categorical_features=()):
+    """(model, test matrix with NaNs in its first column, split) of a small model"""
+    request = training_request(algorithm, dataset_name, task_type, {ROUNDS_PARAM[algorithm]: 20, **(params or {})},
+                               categorical_features)
+    model = training.train_model(Progress(), "m", request)["model_info"]["model"]
+    split = training.split_dataset(request)
+    X = split.X_test.copy()
+    X[::5, 0] = np.nan
+    return model, X, split
+
+def compiled(model, algorithm, split):
+    arrays = trees.extract_tree_arrays(model, algorithm, split.features)
+    return predictor.CompiledPredictor(arrays, predictor.objective_name(model, algorithm))
+
+def assert_matches_native(model, algorithm, task_type, X, split):
+    fast = compiled(model, algorithm, split)
+    for output_margin in (False, True):
+        native = np.asarray(predictor.native_predict(model, algorithm, task_type, X, split.categorical_indices,
+                                                     output_margin), dtype=np.float64)
+        scale = max(1.0, float(np.abs(native).max()))
+        np.testing.assert_allclose(fast.predict(X, output_margin=output_margin), native, rtol=0,
+                                   atol=TOLERANCE[algorithm] * scale)
+
+@pytest.mark.parametrize("algorithm", ["xgboost", "lightgbm", "catboost"])
+@pytest.mark.parametrize("dataset_name,task_type", [
+    ("breast_cancer", "classification"),
+    ("wine", "classification"),
+    ("diabetes", "regression")
+])
+def test_compiled_predictor_matches_native(datasets, algorithm, dataset_name, task_type):
+    model, X, split = train(algorithm, dataset_name, task_type)
+    assert np.isnan(X).any()
+    assert_matches_native(model, algorithm, task_type, X, split)
+
+@pytest.mark.parametrize("algorithm", ["xgboost", "lightgbm"])
+def test_compiled_predictor_matches_native_on_categorical_splits(datasets, algorithm):
+    model, X, split = train(algorithm, "mixed", "regression", categorical_features=["color"])
+    assert compiled(model, algorithm, split).arrays.categories
+    assert_matches_native(model, algorithm, "regression", X, split)
+
+def test_compiled_predictor_rejects_catboost_encoded_categories(datasets):
+    model, X, split = train("catboost", "mixed", "regression", categorical_features=["color"])
+    with pytest.raises(ValueError):
+        compiled(model, "catboost", split)
+
+@pytest.mark.parametrize("params,missing_type", [
+    ({}, trees.MISSING_DEFAULT),
+    ({"use_missing": False}, trees.MISSING_AS_ZERO),
+    ({"zero_as_missing": True}, trees.MISSING_ZERO_DEFAULT)
+])
+def test_compiled_predictor_follows_lightgbm_missing_types(datasets, params, missing_type):
+    model, X, split = train("lightgbm", "mixed", "regression", params)
+    splits = compiled(model, "lightgbm", split).arrays
+    assert missing_type in splits.missing_type[splits.feature >= 0]
+    assert_matches_native(model, "lightgbm", "regression", X, split)
+
+@pytest.fixture(scope="module")
+def wine():
+    X, y = load_wine(return_X_y=True)
+    X = X.astype(np.float32)
+    X[::7, 2] = np.nan
+    return X, y
+
+@pytest.mark.parametrize("objective", ["multi:softmax", "multi:softprob"])
+@pytest.mark.parametrize("output_margin", [False, True])
+def test_xgboost_row_predictor_matches_native(wine, objective, output_margin):
+    X, y = wine
+    booster = xgb.train({"objective": objective, "num_class": 3, "verbosity": 0}, xgb.DMatrix(X, y), 5)
+    fast = predictor.RowPredictor(booster, "xgboost", "classification", X.shape[1], output_margin=output_margin)
+    expected = predictor.native_predict(booster, "xgboost", "classification", X[:10], [], output_margin)
+    for row, native in zip(X[:10], expected):
+        np.testing.assert_array_equal(np.asarray(fast.predict(row)), native)
+
+@pytest.mark.parametrize("output_margin", [False, True])
+def test_lightgbm_row_predictor_matches_native(wine, output_margin):
+    X, y = wine
+    booster = lgb.train({"objective": "multiclass", "num_class": 3, "verbose": -1}, lgb.Dataset(X, y), 5)
+    fast = predictor.RowPredictor(booster, "lightgbm", "classification", X.shape[1], output_margin=output_margin)
+    expected = predictor.native_predict(booster, "lightgbm", "classification", X[:10], [], output_margin)
+    for row, native in zip(X[:10], expected):
+        np.testing.assert_array_equal(fast.predict(row), native)
+
+def test_row_predictor_returns_floats_for_single_outputs():
+    X, y = load_diabetes(return_X_y=True)
+    X = X.astype(np.float32)
+    booster = lgb.train({"objective": "regression", "verbose": -1}, lgb.Dataset(X, y), 5)
+    fast = predictor.RowPredictor(booster, "lightgbm", "regression", X.shape[1])
+    assert isinstance(fast.predict(X[0]), float)
+    with pytest.raises(ValueError):
+        fast.predict(X[0, :3])
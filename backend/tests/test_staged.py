@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+
+import training
+from conftest import Progress, train_via_api, training_request, wait_for_job
+from staged import residuals, stage_iterations
+from test_payloads import DECODERS
+
+def test_stage_iterations_end_at_the_last_round():
+    assert stage_iterations(10, 3) == [3, 6, 9, 10]
+    assert stage_iterations(9, 3) == [3, 6, 9]
+    assert stage_iterations(2, 5) == [2]
+
+@pytest.mark.parametrize("algorithm,rounds_param", [
+    ("xgboost", "n_estimators"),
+    ("lightgbm", "n_estimators"),
+    ("catboost", "iterations")
+])
+@pytest.mark.parametrize("dataset_name,task_type", [
+    ("breast_cancer", "classification"),
+    ("wine", "classification"),
+    ("diabetes", "regression")
+])
+def test_final_staged_metrics_match_the_model_metrics(datasets, algorithm, rounds_param, dataset_name, task_type):
+    request = training_request(algorithm, dataset_name, task_type, {rounds_param: 12})
+    payload = training.train_model(Progress(), "m", request, staged_step=5)["payload"]
+    staged = payload["staged_metrics"]
+    assert staged["iterations"] == [5, 10, 12]
+    for name, value in payload["metrics"].items():
+        if isinstance(value, float):
+            assert staged["metrics"][name][-1] == pytest.approx(value, rel=1e-4, abs=1e-6)
+
+def test_residuals():
+    np.testing.assert_allclose(residuals(np.array([1.0, 2.0]), np.array([0.5, 2.5]), "regression"), [0.5, -0.5])
+    binary = residuals(np.array([0, 1]), np.array([0.2, 0.9]), "classification", np.array([0, 1]))
+    np.testing.assert_allclose(binary, [0.2, 0.1])
+    multiclass = residuals(np.array([2]), np.array([[0.1, 0.2, 0.7]]), "classification", np.array([0, 1, 2]))
+    np.testing.assert_allclose(multiclass, [0.3])
+
+def test_staged_evaluation_endpoint(client, datasets):
+    request = {**training_request("lightgbm", "diabetes", "regression", {"n_estimators": 12}), "step": 4}
+    response = client.post("/staged-evaluation", json=request)
+    assert response.status_code == 202
+    result = wait_for_job(client, response.json()["job_id"])["result"]
+    staged = result["staged_metrics"]
+    assert staged["step"] == 4 and staged["iterations"] == [4, 8, 12]
+    assert staged["metrics"]["rmse"][-1] == pytest.approx(result["metrics"]["rmse"])
+    # The cached model is evaluated again for a different step
+    cached = client.post("/staged-evaluation", json={**request, "step": 6}).json()
+    assert cached["cached"] and cached["result"]["staged_metrics"]["iterations"] == [6, 12]
+    assert client.post("/staged-evaluation", json={**request, "step": 0}).status_code == 400
+
+def test_decision_boundary_endpoint(client, datasets):
+    import app
+    model_id = train_via_api(client, "xgboost", "wine", "classification", {"n_estimators": 6})["model_id"]
+    url = f"/models/{model_id}/decision-boundary"
+    response = client.get(url, params={"resolution": 8, "step": 2, "format": "json"})
+    assert response.status_code == 200
+    meta, arrays = DECODERS["json"](response.content)
+    assert meta["iterations"] == [2, 4, 6] and meta["scale"] == [0.0, 1.0] and not meta["cached"]
+    assert arrays["raster"].shape == arrays["label"].shape == (3, 8, 8)
+    # The last stage is the model's prediction over the grid
+    projection = app.pca_models["wine"]
+    grid_x, grid_y = np.meshgrid(np.linspace(*meta["x_range"], 8), np.linspace(*meta["y_range"], 8))
+    points = projection["pca"].inverse_transform(np.column_stack([grid_x.ravel(), grid_y.ravel()]))
+    features = client.get(f"/models/{model_id}").json()["features"]
+    rows = points[:, [projection["columns"].index(col) for col in features]].astype(np.float32).tolist()
+    prediction = client.post(f"/models/{model_id}/predict", json={"rows": rows, "batch": False}).json()
+    np.testing.assert_array_equal(arrays["label"][-1].ravel(), np.argmax(prediction["predictions"], axis=1))
+    np.testing.assert_allclose(arrays["raster"][-1].ravel() / 255, np.max(prediction["predictions"], axis=1), atol=1 / 255)
+    again = client.get(url, params={"resolution": 8, "step": 2, "format": "json"})
+    assert DECODERS["json"](again.content)[0]["cached"]
+    # Stages default to at most BOUNDARY_STAGES
+    meta, _ = DECODERS["json"](client.get(url, params={"resolution": 4, "format": "json"}).content)
+    assert meta["iterations"][-1] == 6 and len(meta["iterations"]) <= app.BOUNDARY_STAGES
+    assert client.get(url, params={"resolution": 1}).status_code == 400
+    assert client.get(url, params={"step": 0}).status_code == 400
+    assert client.get(url, params={"format": "xml"}).status_code == 406
+    assert client.get("/models/unknown/decision-boundary").status_code == 404
+
+def test_regression_boundaries_share_one_scale(client, datasets):
+    model_id = train_via_api(client, "lightgbm", "diabetes", "regression", {"n_estimators": 6})["model_id"]
+    response = client.get(f"/models/{model_id}/decision-boundary", params={"resolution": 6, "step": 3, "format": "json"})
+    meta, arrays = DECODERS["json"](response.content)
+    low, high = meta["scale"]
+    assert low < high and "label" not in arrays
+    # The extremes over all stages use the ends of the scale
+    assert arrays["raster"].min() == 0 and arrays["raster"].max() == 255
+
+def test_residuals_endpoint(client, datasets):
+    result = train_via_api(client, "lightgbm", "diabetes", "regression", {"n_estimators": 6})
+    url = f"/models/{result['model_id']}/residuals"
+    response = client.get(url, params={"step": 2, "format": "json"})
+    assert response.status_code == 200
+    meta, arrays = DECODERS["json"](response.content)
+    assert meta["iterations"] == [2, 4, 6] and meta["precision"] == "float16" and not meta["cached"]
+    assert arrays["train"].shape == (3, meta["n_train"]) and arrays["test"].shape == (3, meta["n_test"])
+    assert meta["n_train"] + meta["n_test"] == len(datasets["diabetes"])
+    # The last stage gives the model's test metrics
+    assert np.sqrt(np.mean(arrays["test"][-1] ** 2)) == pytest.approx(result["metrics"]["rmse"], rel=1e-2)
+    np.testing.assert_allclose(meta["summary"]["test"]["mean_abs"], np.abs(arrays["test"]).mean(axis=1), rtol=1e-2)
+    assert DECODERS["json"](client.get(url, params={"step": 2, "format": "json"}).content)[0]["cached"]
+
+    meta, codes = DECODERS["json"](client.get(url, params={"step": 2, "precision": "uint8", "format": "json"}).content)
+    low, high = meta["scale"]
+    decoded = low + codes["test"] / 255 * (high - low)
+    np.testing.assert_allclose(decoded, arrays["test"], atol=(high - low) / 255 + 0.1)
+    assert client.get(url, params={"step": 0}).status_code == 400
+    assert client.get(url, params={"precision": "float64"}).status_code == 400
+    assert client.get("/models/unknown/residuals").status_code == 404
+
+def test_classification_residuals_are_probabilities(client, datasets):
+    model_id = train_via_api(client, "xgboost", "wine", "classification", {"n_estimators": 4})["model_id"]
+    meta, arrays = DECODERS["json"](client.get(f"/models/{model_id}/residuals", params={"format": "json"}).content)
+    assert meta["iterations"] == [1, 2, 3, 4]
+    for values in arrays.values():
+        assert np.all((values >= 0) & (values <= 1))
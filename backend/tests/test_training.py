@@ -0,0 +1,42 @@
+import warnings
+
+import numpy as np
+import pytest
+
+import training
+from conftest import Progress, training_request
+
+@pytest.mark.parametrize("params", [
+    {"tree_method": "hist"},
+    {"tree_method": "exact"},
+    {"tree_method": "approx"},
+    {"booster": "gblinear"}
+])
+@pytest.mark.parametrize("dataset_name,task_type", [("breast_cancer", "classification"), ("diabetes", "regression")])
+def test_xgboost_params_outside_hist(datasets, dataset_name, task_type, params):
+    request = training_request("xgboost", dataset_name, task_type, {"n_estimators": 10, **params})
+    result = training.train_model(Progress(), "m", request)
+    metrics = result["payload"]["metrics"]
+    assert all(np.isfinite(value) for value in metrics.values() if isinstance(value, float))
+    assert len(result["history"]["iterations"]) == 10
+
+@pytest.mark.parametrize("algorithm,rounds_param", [
+    ("xgboost", "n_estimators"),
+    ("lightgbm", "n_estimators"),
+    ("catboost", "iterations")
+])
+def test_warm_start_progress_counts_added_rounds(datasets, algorithm, rounds_param):
+    request = training_request(algorithm, "breast_cancer", "classification", {rounds_param: 5})
+    base = training.train_model(Progress(), "base", request)["model_info"]["model"]
+    progress = Progress()
+    warm_start = {"model": base, "model_id": "base", "base_rounds": 5, "added_rounds": 3}
+    result = training.train_model(progress, "m", request, warm_start=warm_start)
+    assert progress.updates == [(1, 3), (2, 3), (3, 3)]
+    assert result["payload"]["rounds_trained"] == 8
+
+def test_lightgbm_without_categorical_features_does_not_warn(datasets):
+    request = training_request("lightgbm", "wine", "classification", {"n_estimators": 5})
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        training.train_model(Progress(), "m", request)
+    assert not [w for w in caught if "categorical_feature" in str(w.message)]
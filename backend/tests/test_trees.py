@@ -0,0 +1,196 @@
+import numpy as np
+import pytest
+
+import payloads
+import predictor
+import trees
+from conftest import train_via_api
+from test_payloads import DECODERS
+from test_predictor import train
+
+@pytest.fixture(scope="module", params=[
+    ("xgboost", "wine", "classification"),
+    ("lightgbm", "wine", "classification"),
+    ("catboost", "diabetes", "regression")
+], ids=lambda case: "-".join(case))
+def ensemble(request, datasets):
+    algorithm, dataset_name, task_type = request.param
+    model, X, split = train(algorithm, dataset_name, task_type)
+    arrays = trees.extract_tree_arrays(model, algorithm, split.features)
+    return algorithm, model, X, split, arrays
+
+def test_tree_offsets_cover_all_nodes(ensemble):
+    algorithm, model, X, split, arrays = ensemble
+    assert arrays.tree_offsets[0] == 0 and arrays.tree_offsets[-1] == arrays.n_nodes
+    assert arrays.n_trees == predictor.native_leaves(model, algorithm, X[:1], split.categorical_indices,
+                                                     arrays.trees_per_round).shape[1]
+    splits = np.flatnonzero(arrays.feature >= 0)
+    # Children lie in their parent's tree, after the parent
+    tree_of = np.searchsorted(arrays.tree_offsets, np.arange(arrays.n_nodes), side="right") - 1
+    for child in (arrays.left[splits], arrays.right[splits]):
+        assert np.all(child > splits)
+        np.testing.assert_array_equal(tree_of[child], tree_of[splits])
+
+def test_subtree_summaries(ensemble):
+    arrays = ensemble[4]
+    roots = arrays.tree_offsets[:-1]
+    assert arrays.subtree_leaves[roots].sum() == np.count_nonzero(arrays.feature < 0)
+    leaves = arrays.feature < 0
+    np.testing.assert_array_equal(arrays.subtree_min[leaves], arrays.value[leaves])
+    assert np.all(arrays.subtree_min[roots] <= arrays.subtree_max[roots])
+    np.testing.assert_array_equal(arrays.depth[roots], 0)
+    np.testing.assert_array_equal(arrays.parent[roots], -1)
+
+def test_compiled_leaves_match_native_leaf_ids(ensemble):
+    algorithm, model, X, split, arrays = ensemble
+    compiled = predictor.CompiledPredictor(arrays, predictor.objective_name(model, algorithm))
+    native = predictor.native_leaves(model, algorithm, X, split.categorical_indices, arrays.trees_per_round)
+    np.testing.assert_array_equal(compiled.leaves(X), arrays.leaf_nodes(native))
+
+def test_collapsed_subtrees_expand_to_the_full_tree(ensemble):
+    arrays = ensemble[4]
+    tree_index = arrays.n_trees - 1
+    full = {node["id"]: node for node in arrays.tree_structure(tree_index, max_depth=None)["nodes"]}
+    shallow = arrays.tree_structure(tree_index, max_depth=1)
+    assert shallow["truncated"] == (shallow["depth"] > 1)
+    # Expanding every collapsed node, level by level, lists each node of the tree once
+    listed = {}
+    pending = [shallow]
+    while pending:
+        structure = pending.pop()
+        for node in structure["nodes"]:
+            if node.get("collapsed"):
+                assert node["summary"]["leaf_count"] == arrays.subtree_leaves[arrays.tree_offsets[tree_index] + node["id"]]
+                assert node["summary"]["value_min"] <= node["summary"]["value_max"]
+                pending.append(arrays.tree_structure(tree_index, max_depth=1, node_id=node["id"]))
+            else:
+                assert listed.setdefault(node["id"], node) == full[node["id"]]
+    assert listed.keys() == full.keys()
+    with pytest.raises(IndexError):
+        arrays.tree_structure(tree_index, node_id=len(full))
+
+def test_paths_run_from_root_to_leaf(ensemble):
+    algorithm, model, X, split, arrays = ensemble
+    native = predictor.native_leaves(model, algorithm, X[:5], split.categorical_indices, arrays.trees_per_round)
+    leaves = arrays.leaf_nodes(native)
+    paths, lengths = arrays.paths(leaves)
+    roots = arrays.tree_offsets[:-1]
+    np.testing.assert_array_equal(paths[..., 0], 0)
+    last = np.take_along_axis(paths, (lengths - 1)[..., None], axis=-1)[..., 0]
+    np.testing.assert_array_equal(last + roots[None, :], leaves)
+
+def test_staged_margins_end_at_the_native_margin(ensemble):
+    algorithm, model, X, split, arrays = ensemble
+    native = predictor.native_leaves(model, algorithm, X, split.categorical_indices, arrays.trees_per_round)
+    n_rounds = arrays.n_trees // arrays.trees_per_round
+    margins = arrays.staged_margins(arrays.leaf_nodes(native), [1, n_rounds])
+    expected = np.asarray(predictor.native_predict(model, algorithm, "regression" if arrays.trees_per_round == 1 else
+                                                   "classification", X, split.categorical_indices, output_margin=True))
+    np.testing.assert_allclose(margins[-1].reshape(expected.shape), expected, rtol=0,
+                               atol=1e-5 * max(1.0, np.abs(expected).max()))
+
+def test_tree_slice_uses_local_indices(ensemble):
+    arrays = ensemble[4]
+    meta, sliced = arrays.tree_slice(1, 3)
+    start, stop = arrays.tree_range(1)[0], arrays.tree_range(2)[1]
+    assert sliced["tree_offsets"][0] == 0 and sliced["tree_offsets"][-1] == stop - start
+    children = sliced["left"][sliced["feature"] >= 0]
+    assert children.min() > 0 and children.max() < stop - start
+    assert (meta["start"], meta["stop"], meta["n_trees"]) == (1, 3, arrays.n_trees)
+
+@pytest.fixture(scope="module")
+def stored_model(client, datasets):
+    return train_via_api(client, "xgboost", "wine", "classification", {"n_estimators": 4, "max_depth": 4})["model_id"]
+
+def test_visualize_tree_endpoint(client, stored_model):
+    request = {"model_id": stored_model, "algorithm": "xgboost", "tree_index": 2, "max_depth": None}
+    response = client.post("/visualize-tree", json=request)
+    assert response.status_code == 200
+    structure = response.json()["tree_structure"]
+    nodes = structure["nodes"]
+    assert [node["id"] for node in nodes] == sorted(node["id"] for node in nodes)
+    assert sum(node.get("leaf", False) for node in nodes) == structure["leaf_count"]
+    assert not structure["truncated"] and structure["root"] == 0
+    by_id = {node["id"]: node for node in nodes}
+    for node in nodes:
+        if not node.get("leaf"):
+            assert node["left"] in by_id and node["right"] in by_id
+            assert node["feature"] in client.get(f"/models/{stored_model}").json()["features"]
+    # 4 rounds of 3 classes
+    assert client.post("/visualize-tree", json={**request, "tree_index": 12}).status_code == 400
+    assert client.post("/visualize-tree", json={**request, "algorithm": "lightgbm"}).status_code == 400
+    assert client.post("/visualize-tree", json={**request, "model_id": "unknown"}).status_code == 404
+
+def test_collapsed_nodes_expand_through_the_api(client, stored_model):
+    request = {"model_id": stored_model, "algorithm": "xgboost", "tree_index": 0, "max_depth": 1}
+    shallow = client.post("/visualize-tree", json=request).json()["tree_structure"]
+    assert shallow["truncated"]
+    collapsed = [node for node in shallow["nodes"] if node.get("collapsed")]
+    assert collapsed and all("left" not in node for node in collapsed)
+    node = collapsed[0]
+    url = f"/models/{stored_model}/trees/0/nodes/{node['id']}"
+    expanded = client.get(url, params={"max_depth": 1}).json()
+    assert expanded["node_id"] == node["id"] and expanded["tree_structure"]["root"] == node["id"]
+    subtree = expanded["tree_structure"]["nodes"]
+    assert subtree[0]["id"] == node["id"] and "left" in subtree[0]
+    # The same subtree as a /visualize-tree request rooted at the node
+    again = client.post("/visualize-tree", json={**request, "node_id": node["id"]}).json()["tree_structure"]
+    assert again["nodes"] == subtree
+    whole = client.get(url, params={"max_depth": 100}).json()["tree_structure"]
+    assert not whole["truncated"] and whole["leaf_count"] == node["summary"]["leaf_count"]
+    assert client.get(url, params={"max_depth": -1}).status_code == 400
+    assert client.get(f"/models/{stored_model}/trees/0/nodes/100000").status_code == 404
+    assert client.get(f"/models/{stored_model}/trees/12/nodes/0").status_code == 400
+
+@pytest.mark.parametrize("fmt", ["json", "msgpack", "arrow"])
+def test_tree_range_endpoint(client, stored_model, fmt):
+    if fmt not in payloads.available_formats():
+        pytest.skip(f"{fmt} is not installed")
+    response = client.get(f"/models/{stored_model}/trees", params={"start": 3, "stop": 6, "format": fmt})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith(payloads.MEDIA_TYPES[fmt])
+    meta, columns = DECODERS[fmt](response.content)
+    assert (meta["model_id"], meta["start"], meta["stop"]) == (stored_model, 3, 6)
+    offsets = columns["tree_offsets"]
+    assert len(offsets) == 4 and offsets[0] == 0 and offsets[-1] == len(columns["feature"])
+    # Each tree of the range matches its /visualize-tree listing
+    for tree, tree_index in enumerate(range(3, 6)):
+        request = {"model_id": stored_model, "algorithm": "xgboost", "tree_index": tree_index, "max_depth": None}
+        nodes = client.post("/visualize-tree", json=request).json()["tree_structure"]["nodes"]
+        assert len(nodes) == offsets[tree + 1] - offsets[tree]
+
+def test_tree_range_endpoint_checks_its_range(client, stored_model):
+    url = f"/models/{stored_model}/trees"
+    assert client.get(url, params={"start": 10, "stop": 13}).status_code == 400
+    assert client.get(url, params={"start": 2, "stop": 2}).status_code == 400
+    assert client.get(url, params={"format": "xml"}).status_code == 406
+    # Without a format, the Accept header or else JSON
+    assert client.get(url).headers["content-type"].startswith("application/json")
+    assert client.get("/models/unknown/trees").status_code == 404
+
+def test_trace_endpoint(client, datasets, stored_model):
+    rows = datasets["wine"].drop(columns="target").head(4).values.tolist()
+    url = f"/models/{stored_model}/trace"
+    native = client.post(url, json={"rows": rows}, params={"format": "json"})
+    assert native.status_code == 200
+    meta, columns = DECODERS["json"](native.content)
+    assert (meta["n_rows"], meta["n_trees"], meta["engine"]) == (4, 12, "native")
+    assert columns["leaves"].shape == columns["path_length"].shape == (4, 12)
+    _, compiled = DECODERS["json"](client.post(url, json={"rows": rows, "engine": "compiled"}).content)
+    for name in ("leaves", "paths", "path_length"):
+        np.testing.assert_array_equal(compiled[name], columns[name])
+    # Paths start at the root and end at the leaf of each tree, padded with -1
+    paths, lengths = columns["paths"], columns["path_length"].astype(int)
+    np.testing.assert_array_equal(paths[..., 0], 0)
+    np.testing.assert_array_equal(np.take_along_axis(paths, (lengths - 1)[..., None], axis=-1)[..., 0], columns["leaves"])
+    assert np.all(paths[np.arange(paths.shape[-1]) >= lengths[..., None]] == -1)
+    # Each step is a child of the previous node, as listed by /visualize-tree
+    request = {"model_id": stored_model, "algorithm": "xgboost", "tree_index": 0, "max_depth": None}
+    nodes = {node["id"]: node for node in client.post("/visualize-tree", json=request).json()["tree_structure"]["nodes"]}
+    path = paths[0, 0, :lengths[0, 0]].astype(int)
+    for parent, child in zip(path[:-1], path[1:]):
+        assert child in (nodes[parent]["left"], nodes[parent]["right"])
+    assert nodes[path[-1]]["leaf"]
+    assert client.post(url, json={"rows": rows, "engine": "gpu"}).status_code == 400
+    assert client.post(url, json={"rows": [[1.0]]}).status_code == 400
+    assert client.post("/models/unknown/trace", json={"rows": rows}).status_code == 404
@@ -0,0 +1,640 @@
+"""Model training routines executed by the training worker pool"""
+import pandas as pd
+import numpy as np
+from sklearn.metrics import mean_squared_error, accuracy_score, roc_auc_score
+import hashlib
+import json
+import logging
+import random
+import time
+
+from splits import get_split
+from history import MetricHistory
+
+# Conditionally import model libraries to avoid errors if not installed
+try:
+    import xgboost as xgb
+    XGBOOST_AVAILABLE = True
+except Exception:
+    XGBOOST_AVAILABLE = False
+
+try:
+    import lightgbm as lgb
+    LIGHTGBM_AVAILABLE = True
+except Exception:
+    LIGHTGBM_AVAILABLE = False
+
+try:
+    import catboost as cb
+    CATBOOST_AVAILABLE = True
+except Exception:
+    CATBOOST_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Default hyperparameters, overridden by the user-provided params
+DEFAULT_PARAMS = {
+    "xgboost": {
+        "n_estimators": 100,
+        "learning_rate": 0.1,
+        "max_depth": 3,
+        "subsample": 0.8,
+        "colsample_bytree": 0.8
+    },
+    "lightgbm": {
+        "n_estimators": 100,
+        "learning_rate": 0.1,
+        "max_depth": 3,
+        "subsample": 0.8,
+        "colsample_bytree": 0.8
+    },
+    "catboost": {
+        "iterations": 100,
+        "learning_rate": 0.1,
+        "depth": 3,
+        "subsample": 0.8,
+        # Keep every requested round so the model can be extended later
+        "use_best_model": False
+    }
+}
+
+# Parameter holding the number of boosting rounds for each algorithm
+ROUNDS_PARAM = {
+    "xgboost": "n_estimators",
+    "lightgbm": "n_estimators",
+    "catboost": "iterations"
+}
+
+# Parameter holding the number of threads for each native training API
+THREAD_PARAM = {
+    "xgboost": "nthread",
+    "lightgbm": "num_threads",
+    "catboost": "thread_count"
+}
+
+# User params that would also set a thread count; replaced by the granted threads
+THREAD_ALIASES = ("n_jobs", "nthread", "nthreads", "num_thread", "num_threads", "thread_count")
+
+# Datasets available to this process (the API process or a pool worker)
+datasets = {}
+dataset_hashes = {}
+
+def register_datasets(dataset_map):
+    """Make datasets available for training; used as the worker pool initializer"""
+    datasets.update(dataset_map)
+    for name, df in dataset_map.items():
+        dataset_hashes[name] = dataset_fingerprint(df)
+
+def dataset_fingerprint(df):
+    """Content hash of a DataFrame, covering column names, dtypes and values"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([[str(col), str(dtype)] for col, dtype in df.dtypes.items()]).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    return digest.hexdigest()
+
+class MockModel:
+    """Stand-in model used when no boosting library is installed"""
+    def __init__(self, algorithm, n_features):
+        self.algorithm = algorithm
+        self.n_features = n_features
+        self.trees = []
+        for i in range(10):
+            self.trees.append({
+                "id": i,
+                "nodes": [
+                    {"id": 0, "feature": "feature1", "threshold": random.random() * 5, "left": 1, "right": 2},
+                    {"id": 1, "leaf": True, "value": random.random()},
+                    {"id": 2, "leaf": True, "value": random.random()}
+                ]
+            })
+
+    def predict(self, X):
+        # Return mock predictions
+        if isinstance(X, pd.DataFrame):
+            return np.random.rand(X.shape[0])
+        return np.random.rand(len(X))
+
+    def feature_importance(self, importance_type='gain'):
+        # Return mock feature importances
+        return np.random.rand(self.n_features)
+
+# Names used for the evaluation sets in progress events
+EVAL_SET_NAMES = ["train", "test"]
+
+class RecordingProgress:
+    """Progress reporter that also keeps the metrics of every round in a MetricHistory"""
+    def __init__(self, progress, history):
+        self.progress = progress
+        self.history = history
+
+    def started(self):
+        self.progress.started()
+
+    def update(self, iteration, total, metrics=None):
+        if metrics:
+            self.history.append(iteration, metrics)
+        self.progress.update(iteration, total, metrics)
+
+    def cancelled(self):
+        return self.progress.cancelled()
+
+class StopCondition:
+    """Decides after each boosting round whether a training has to stop early
+
+    A training stops when its job is cancelled or when it runs past its
+    deadline; reason records which of the two happened.
+    """
+    def __init__(self, progress, deadline=None):
+        self.progress = progress
+        self.deadline = deadline
+        self.reason = None
+
+    def __call__(self):
+        if self.reason is None:
+            if self.progress.cancelled():
+                self.reason = "cancelled"
+            elif self.deadline is not None and time.time() >= self.deadline:
+                self.reason = "time_limit"
+        return self.reason is not None
+
+if XGBOOST_AVAILABLE:
+    class XGBoostProgressCallback(xgb.callback.TrainingCallback):
+        """Report boosting progress and metrics to the job manager after every round"""
+        def __init__(self, progress, total, should_stop=None):
+            super().__init__()
+            self.progress = progress
+            self.total = total
+            self.should_stop = should_stop
+
+        def after_iteration(self, model, epoch, evals_log):
+            # evals_log is keyed validation_0, validation_1, ... in eval_set order
+            metrics = {
+                name: {metric: float(values[-1]) for metric, values in evals_log[key].items()}
+                for name, key in zip(EVAL_SET_NAMES, evals_log)
+            }
+            self.progress.update(epoch + 1, self.total, metrics)
+            # Returning True ends the training
+            return self.should_stop is not None and self.should_stop()
+
+def lightgbm_progress_callback(progress, total, should_stop=None):
+    """Build a LightGBM callback reporting progress and metrics after every round"""
+    def callback(env):
+        metrics = {}
+        for dataset, metric, score, _ in env.evaluation_result_list:
+            metrics.setdefault(dataset, {})[metric] = float(score)
+        # Continued trainings start counting at the base model's rounds
+        progress.update(env.iteration - env.begin_iteration + 1, total, metrics)
+        if should_stop is not None and should_stop():
+            # LightGBM's way of ending a training early; the current round is kept
+            raise lgb.callback.EarlyStopException(env.iteration, env.evaluation_result_list)
+    return callback
+
+class CatBoostProgressCallback:
+    """Report boosting progress and metrics to the job manager after every round"""
+    # CatBoost names its evaluation sets learn and validation
+    DATASET_NAMES = {"learn": "train", "validation": "test"}
+
+    def __init__(self, progress, total, should_stop=None):
+        self.progress = progress
+        self.total = total
+        self.should_stop = should_stop
+
+    def after_iteration(self, info):
+        metrics = {
+            self.DATASET_NAMES.get(dataset, dataset): {metric: float(values[-1]) for metric, values in dataset_metrics.items()}
+            for dataset, dataset_metrics in info.metrics.items()
+        }
+        self.progress.update(info.iteration, self.total, metrics)
+        # Returning False ends the training
+        return self.should_stop is None or not self.should_stop()
+
+def split_dataset(request):
+    """Return the cached PreparedSplit of a request's dataset"""
+    name = request["dataset_name"]
+    return get_split(name, datasets[name], dataset_hashes[name], request["target_column"],
+                     request["categorical_features"], request["test_size"], request["random_state"])
+
+def native_params(algorithm, params, task_type, n_classes, random_state, threads=None):
+    """Translate user params (sklearn-style names allowed) for the native training APIs
+
+    threads, when given, replaces any thread count in params. Returns
+    (params, number of boosting rounds).
+    """
+    params = dict(params)
+    rounds = params.pop(ROUNDS_PARAM[algorithm])
+    if threads is not None:
+        for alias in THREAD_ALIASES:
+            params.pop(alias, None)
+        params[THREAD_PARAM[algorithm]] = threads
+
+    if algorithm == "xgboost":
+        params.setdefault("seed", params.pop("random_state", random_state))
+        if "n_jobs" in params:
+            params["nthread"] = params.pop("n_jobs")
+        # Cached QuantileDMatrix containers are used with the histogram tree method
+        params.setdefault("tree_method", "hist")
+        params.setdefault("verbosity", 0)
+        if task_type == "classification":
+            if "objective" not in params:
+                if n_classes == 2:
+                    params["objective"] = "binary:logistic"
+                else:
+                    params["objective"] = "multi:softprob"
+                    params["num_class"] = n_classes
+        elif "objective" not in params:
+            params["objective"] = "reg:squarederror"
+
+    elif algorithm == "lightgbm":
+        params.setdefault("random_state", random_state)
+        params.setdefault("verbose", -1)
+        if task_type == "classification":
+            if "objective" not in params:
+                if n_classes == 2:
+                    params["objective"] = "binary"
+                else:
+                    params["objective"] = "multiclass"
+                    params["num_class"] = n_classes
+        elif "objective" not in params:
+            params["objective"] = "regression"
+
+    elif algorithm == "catboost":
+        params.setdefault("random_state", random_state)
+        # Don't write catboost_info/ training logs into the working directory
+        params.setdefault("allow_writing_files", False)
+        # Multiclass defaults to Bayesian bootstrap, which rejects subsample
+        if task_type == "classification" and n_classes > 2 and "subsample" in params:
+            params.setdefault("bootstrap_type", "Bernoulli")
+
+    return params, rounds
+
+def warm_start_rounds(request, base_info):
+    """Return (base rounds, added rounds) if request can continue boosting base_info's model
+
+    The base model must have been trained on the same data split with the same
+    params and hold fewer rounds than requested. Returns None otherwise.
+    """
+    algorithm = request["algorithm"]
+    if algorithm not in ROUNDS_PARAM or base_info["algorithm"] != algorithm:
+        return None
+    same_data = (
+        base_info["dataset"] == request["dataset_name"]
+        and base_info["target"] == request["target_column"]
+        and base_info["task_type"] == request["task_type"]
+        and base_info["test_size"] == request["test_size"]
+        and base_info["random_state"] == request["random_state"]
+        and sorted(base_info["categorical_features"] or []) == sorted(request["categorical_features"] or [])
+    )
+    if not same_data:
+        return None
+
+    rounds_param = ROUNDS_PARAM[algorithm]
+    base_params = {**DEFAULT_PARAMS[algorithm], **base_info["params"]}
+    params = {**DEFAULT_PARAMS[algorithm], **request["params"]}
+    base_params.pop(rounds_param)
+    rounds = params.pop(rounds_param)
+    # The stored model may hold fewer rounds than requested, e.g. after CatBoost kept its best iteration
+    base_rounds = boosted_rounds(base_info["model"], algorithm)
+    if base_params != params or base_rounds is None or rounds <= base_rounds:
+        return None
+    return base_rounds, rounds - base_rounds
+
+def boosted_rounds(model, algorithm):
+    """Number of boosting rounds held by a trained model, or None if unknown"""
+    try:
+        if algorithm == "xgboost" and XGBOOST_AVAILABLE:
+            return model.num_boosted_rounds()
+        elif algorithm == "lightgbm" and LIGHTGBM_AVAILABLE:
+            return model.current_iteration()
+        elif algorithm == "catboost" and CATBOOST_AVAILABLE:
+            return model.tree_count_
+    except Exception as e:
+        logger.error(f"Error counting boosting rounds: {str(e)}")
+    return None
+
+def is_available(algorithm):
+    """Whether the library behind an algorithm is installed"""
+    return {
+        "xgboost": XGBOOST_AVAILABLE,
+        "lightgbm": LIGHTGBM_AVAILABLE,
+        "catboost": CATBOOST_AVAILABLE
+    }.get(algorithm, False)
+
+def xgboost_split_matrices(split, task_type, params):
+    """The split's cached XGBoost (train, test) matrices suited to params
+
+    QuantileDMatrix is only accepted by the hist tree methods of tree
+    boosters; exact, approx and gblinear train on a plain DMatrix.
+    """
+    quantile = (params.get("tree_method", "hist") in ("hist", "gpu_hist")
+                and params.get("booster", "gbtree") != "gblinear")
+    return split.xgboost_matrices(task_type, params.get("max_bin", 256), quantile=quantile)
+
+def fit_model(algorithm, split, task_type, params, rounds, progress=None, base_model=None, early_stopping_rounds=None,
+              should_stop=None):
+    """Fit a native model on the split's cached training containers
+
+    params and rounds come from native_params. With a progress reporter the
+    model is also evaluated on the train and test sets after every round and
+    the metrics are reported; without one nothing but the boosting is timed.
+    With early_stopping_rounds boosting stops once the test metric hasn't
+    improved for that many rounds; see truncate_to_best_iteration.
+    should_stop, checked after every reported round, ends the training early
+    and keeps the rounds boosted so far.
+    """
+    if algorithm == "xgboost":
+        dtrain, dtest = xgboost_split_matrices(split, task_type, params)
+        # Early stopping watches the last evaluation set
+        evals = [(dtrain, "train")] if progress else []
+        if progress or early_stopping_rounds:
+            evals.append((dtest, "test"))
+        return xgb.train(
+            params,
+            dtrain,
+            num_boost_round=rounds,
+            evals=evals,
+            early_stopping_rounds=early_stopping_rounds,
+            verbose_eval=False,
+            callbacks=[XGBoostProgressCallback(progress, rounds, should_stop)] if progress else None,
+            xgb_model=base_model
+        )
+
+    elif algorithm == "lightgbm":
+        # Continuing from a model sets init scores on the training data, so it
+        # gets fresh Datasets that still reuse the cached bin boundaries
+        train_data, test_data = split.lightgbm_datasets(task_type, params, fresh=base_model is not None)
+        callbacks = [lightgbm_progress_callback(progress, rounds, should_stop)] if progress else []
+        if early_stopping_rounds:
+            # The training set itself is never used for early stopping
+            callbacks.append(lgb.early_stopping(early_stopping_rounds, verbose=False))
+        if progress:
+            valid_sets, valid_names = [train_data, test_data], EVAL_SET_NAMES
+        elif early_stopping_rounds:
+            valid_sets, valid_names = [test_data], EVAL_SET_NAMES[1:]
+        else:
+            valid_sets, valid_names = None, None
+        return lgb.train(
+            params,
+            train_data,
+            num_boost_round=rounds,
+            valid_sets=valid_sets,
+            valid_names=valid_names,
+            callbacks=callbacks or None,
+            init_model=base_model,
+            # Otherwise the returned model is already cut to the best iteration,
+            # hiding how many rounds were run
+            keep_training_booster=bool(early_stopping_rounds)
+        )
+
+    elif algorithm == "catboost":
+        train_pool, test_pool = split.catboost_pools(params)
+        if early_stopping_rounds:
+            # CatBoost drops the trees after the best iteration itself
+            params = {**params, "use_best_model": True}
+        if task_type == "classification":
+            model = cb.CatBoostClassifier(**params, iterations=rounds)
+        else:
+            model = cb.CatBoostRegressor(**params, iterations=rounds)
+        model.fit(train_pool, eval_set=test_pool if progress or early_stopping_rounds else None, verbose=False,
+                  callbacks=[CatBoostProgressCallback(progress, rounds, should_stop)] if progress else None,
+                  early_stopping_rounds=early_stopping_rounds, init_model=base_model)
+        return model
+
+    raise ValueError(f"Unsupported algorithm: {algorithm}")
+
+def truncate_to_best_iteration(model, algorithm, base_rounds=0):
+    """Drop the trees boosted after the best iteration of an early-stopped model
+
+    base_rounds is the number of rounds the model was warm started from.
+    Returns (model, rounds boosted in total, rounds kept).
+    """
+    if algorithm == "xgboost":
+        trained = model.num_boosted_rounds()
+        best = model.best_iteration + 1 if hasattr(model, "best_iteration") else trained
+        return (model[:best] if best < trained else model), trained, best
+    elif algorithm == "lightgbm":
+        trained = model.current_iteration()
+        # best_iteration may point past the last tree if boosting ran out of splits
+        best = min(model.best_iteration or trained, trained)
+        # Also releases the training Datasets held by the training booster
+        return lgb.Booster(model_str=model.model_to_string(num_iteration=best)), trained, best
+    elif algorithm == "catboost":
+        # Already shrunk by use_best_model; the evaluation history covers every round run
+        history = model.get_evals_result().get("validation", {})
+        trained = base_rounds + max((len(values) for values in history.values()), default=0)
+        best = model.tree_count_
+        return model, max(trained, best), best
+    raise ValueError(f"Unsupported algorithm: {algorithm}")
+
+def predict_test(model, algorithm, split, task_type, params):
+    """Probabilities (classification) or values (regression) for the test set"""
+    if algorithm == "xgboost":
+        return model.predict(xgboost_split_matrices(split, task_type, params)[1])
+    elif algorithm == "lightgbm":
+        return model.predict(split.X_test)
+    elif algorithm == "catboost":
+        test_pool = split.catboost_pools(params)[1]
+        if task_type == "classification":
+            y_proba = model.predict(test_pool, prediction_type="Probability")
+            return y_proba[:, 1] if y_proba.shape[1] == 2 else y_proba
+        return model.predict(test_pool)
+    raise ValueError(f"Unsupported algorithm: {algorithm}")
+
+def train_model(progress, model_id, request, warm_start=None, staged_step=None, threads=None):
+    """Train a gradient boosting model described by a TrainingRequest dict
+
+    warm_start optionally holds a compatible base model ("model", "model_id",
+    "base_rounds", "added_rounds") to continue boosting instead of starting over.
+    With staged_step the payload also carries test metrics every staged_step rounds.
+    With early_stopping_rounds set, the stored model is cut back to its best
+    iteration and the payload reports it with the estimated time saved. A
+    cancelled job or one exceeding max_seconds stops after the current round
+    and returns the partially trained model.
+    threads is the number of threads granted by the job manager's CPU budget.
+    The result also holds the evaluation history of every round as
+    MetricHistory arrays.
+    """
+    split = split_dataset(request)
+    history = MetricHistory()
+    progress = RecordingProgress(progress, history)
+
+    algorithm = request["algorithm"]
+    task_type = request["task_type"]
+    random_state = request["random_state"]
+    n_classes = len(split.classes)
+
+    # Create placeholder for model and training metrics
+    metrics = {}
+    model = None
+    early_stopping_rounds = request.get("early_stopping_rounds")
+    early_stopping = None
+    # Cancellation and the time budget are checked after every boosting round
+    max_seconds = request.get("max_seconds")
+    should_stop = StopCondition(progress, time.time() + max_seconds if max_seconds else None)
+
+    # When warm starting only the missing rounds are trained
+    base_model = warm_start["model"] if warm_start else None
+    rounds_override = {ROUNDS_PARAM[algorithm]: warm_start["added_rounds"]} if warm_start else {}
+
+    # Train model based on algorithm
+    start_time = time.time()
+
+    if algorithm in ROUNDS_PARAM and is_available(algorithm):
+        # Update defaults with user-provided params
+        params, rounds = native_params(algorithm, {**DEFAULT_PARAMS[algorithm], **request["params"], **rounds_override},
+                                       task_type, n_classes, random_state, threads)
+        model = fit_model(algorithm, split, task_type, params, rounds, progress=progress, base_model=base_model,
+                          early_stopping_rounds=early_stopping_rounds, should_stop=should_stop)
+        if early_stopping_rounds:
+            base_rounds = warm_start["base_rounds"] if warm_start else 0
+            model, trained_rounds, best_rounds = truncate_to_best_iteration(model, algorithm, base_rounds)
+            # Assume the skipped rounds would have cost as much as the ones run
+            run = trained_rounds - base_rounds
+            early_stopping = {
+                "early_stopping_rounds": early_stopping_rounds,
+                "best_iteration": best_rounds,
+                "rounds_requested": base_rounds + rounds,
+                "rounds_trained": trained_rounds,
+                "trees_dropped": trained_rounds - best_rounds,
+                "stopped_early": trained_rounds < base_rounds + rounds,
+                "time_saved": (time.time() - start_time) / run * (rounds - run) if run else 0.0
+            }
+        y_proba = predict_test(model, algorithm, split, task_type, params)
+
+    else:
+        # For demonstration, if libraries aren't available, create a "mock" model
+        time.sleep(2)  # Simulate training time
+        model = MockModel(algorithm, len(split.features))
+        y_proba = model.predict(split.X_test)
+
+    train_time = time.time() - start_time
+
+    # Calculate metrics
+    classes = split.classes if task_type == "classification" else None
+    metrics = prediction_metrics(split.y_test, y_proba, task_type, classes)
+
+    features = split.features
+
+    # Model info stored by the API process, including the model object
+    model_info = {
+        "id": model_id,
+        "algorithm": algorithm,
+        "params": request["params"],
+        "dataset": request["dataset_name"],
+        "task_type": task_type,
+        "features": features,
+        "target": request["target_column"],
+        "categorical_features": request["categorical_features"],
+        "test_size": request["test_size"],
+        "random_state": random_state,
+        "early_stopping_rounds": early_stopping_rounds,
+        "classes": classes.tolist() if classes is not None else None,
+        "metrics": metrics,
+        "train_time": train_time,
+        "timestamp": time.time(),
+        "model": model
+    }
+
+    # Response payload (excluding the actual model object)
+    payload = {
+        "model_id": model_id,
+        "algorithm": algorithm,
+        "params": request["params"],
+        "dataset": request["dataset_name"],
+        "task_type": task_type,
+        "metrics": metrics,
+        "train_time": train_time,
+        "feature_importance": get_feature_importance(model, algorithm, features),
+        "warm_start": {
+            "base_model_id": warm_start["model_id"],
+            "base_rounds": warm_start["base_rounds"],
+            "added_rounds": warm_start["added_rounds"]
+        } if warm_start else None,
+        "early_stopping": early_stopping,
+        # "cancelled" or "time_limit" when the model holds only part of the requested rounds
+        "stopped": should_stop.reason,
+        "rounds_trained": boosted_rounds(model, algorithm)
+    }
+
+    if staged_step is not None:
+        # Imported here because staged imports this module
+        from staged import staged_metrics
+        payload["staged_metrics"] = staged_metrics(model, algorithm, task_type, split, staged_step)
+
+    return {"model_info": model_info, "payload": payload, "history": history.arrays()}
+
+def prediction_metrics(y_true, prediction, task_type, classes=None):
+    """Evaluation metrics from probabilities (classification) or predicted values (regression)"""
+    if task_type == "classification":
+        if prediction.ndim == 1:
+            labels = classes[(prediction > 0.5).astype(int)]
+            metrics = {"accuracy": accuracy_score(y_true, labels)}
+            try:
+                metrics["auc"] = roc_auc_score(y_true, prediction)
+            except ValueError:
+                pass
+        else:
+            metrics = {"accuracy": accuracy_score(y_true, classes[np.argmax(prediction, axis=1)])}
+    else:
+        mse = mean_squared_error(y_true, prediction)
+        metrics = {"mse": mse, "rmse": np.sqrt(mse)}
+    return {name: float(value) for name, value in metrics.items()}
+
+def get_feature_importance(model, algorithm, feature_names):
+    """Extract feature importance from the model"""
+    try:
+        # For mock model or unavailable libraries
+        if not any([XGBOOST_AVAILABLE, LIGHTGBM_AVAILABLE, CATBOOST_AVAILABLE]):
+            return mock_feature_importance(feature_names)
+
+        if algorithm == "xgboost" and XGBOOST_AVAILABLE:
+            # Get feature importance
+            try:
+                importance = model.get_score(importance_type='gain')
+                # Convert to array format
+                result = []
+                for feature in feature_names:
+                    if feature in importance:
+                        result.append({"feature": feature, "importance": float(importance[feature])})
+                    else:
+                        result.append({"feature": feature, "importance": 0})
+                return result
+            except Exception:
+                # Fall back to feature_importances_ attribute
+                if hasattr(model, 'feature_importances_'):
+                    return [{"feature": feature, "importance": float(imp)}
+                            for feature, imp in zip(feature_names, model.feature_importances_)]
+
+        elif algorithm == "lightgbm" and LIGHTGBM_AVAILABLE:
+            try:
+                importance = model.feature_importance(importance_type='gain')
+                return [{"feature": feature, "importance": float(imp)} for feature, imp in zip(feature_names, importance)]
+            except Exception:
+                # Fall back to feature_importances_ attribute
+                if hasattr(model, 'feature_importances_'):
+                    return [{"feature": feature, "importance": float(imp)}
+                            for feature, imp in zip(feature_names, model.feature_importances_)]
+
+        elif algorithm == "catboost" and CATBOOST_AVAILABLE:
+            try:
+                importance = model.get_feature_importance()
+                return [{"feature": feature, "importance": float(imp)} for feature, imp in zip(feature_names, importance)]
+            except Exception:
+                # Fall back to feature_importances_ attribute
+                if hasattr(model, 'feature_importances_'):
+                    return [{"feature": feature, "importance": float(imp)}
+                            for feature, imp in zip(feature_names, model.feature_importances_)]
+
+        # If we get here, generate mock importances
+        return mock_feature_importance(feature_names)
+
+    except Exception as e:
+        logger.error(f"Error getting feature importance: {str(e)}")
+        # Return mock data in case of error
+        return mock_feature_importance(feature_names)
+
+def mock_feature_importance(feature_names):
+    """Generate normalized random feature importances"""
+    importances = np.random.rand(len(feature_names))
+    total = sum(importances)
+    importances = [float(imp/total) for imp in importances]
+    return [{"feature": feature, "importance": imp} for feature, imp in zip(feature_names, importances)]
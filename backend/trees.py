@@ -0,0 +1,644 @@
+"""Flat columnar representation of tree ensembles shared by all libraries"""
+import numpy as np
+import json
+import os
+import tempfile
+
+# How a node routes missing values (NaN)
+MISSING_DEFAULT = 0         # NaN follows default_left
+MISSING_AS_ZERO = 1         # NaN is treated as 0.0 (LightGBM missing_type None)
+MISSING_ZERO_DEFAULT = 2    # NaN and 0.0 follow default_left (LightGBM missing_type Zero)
+
+LIGHTGBM_MISSING_TYPES = {"NaN": MISSING_DEFAULT, "None": MISSING_AS_ZERO, "Zero": MISSING_ZERO_DEFAULT}
+
+class TreeArrays:
+    """All nodes of an ensemble in flat arrays, tree after tree
+
+    Node i of the ensemble is a split when feature[i] >= 0 and a leaf when
+    feature[i] == -1. Splits send a row left when x < threshold[i], or for
+    categorical splits when x is one of categories[i]; NaN follows
+    default_left[i] as refined by missing_type[i]. left and right hold
+    ensemble-wide node indices, and the nodes of tree t are
+    tree_offsets[t]:tree_offsets[t + 1], its root first.
+
+    value holds leaf outputs; for splits it is the cover-weighted mean of the
+    leaves below. cover is the hessian sum reaching the node and gain the
+    loss reduction of the split. count is the number of training rows
+    reaching the node where the library records it.
+
+    Oblivious (CatBoost) ensembles also keep levels: per tree and depth level,
+    root first, the split feature and border shared by all nodes of the level.
+    The model output is scale * (sum of leaf values) + bias. Nodes in
+    opaque_nodes split on values derived from categorical features (CatBoost
+    CTRs and one-hot hashes) and cannot be routed from raw feature values.
+    native_id is the library's own id of each node within its tree: the node
+    id for XGBoost, the leaf or split index for LightGBM and the leaf index
+    for CatBoost leaves.
+    """
+    def __init__(self, algorithm, feature_names, feature, threshold, left, right, value, cover, gain,
+                 default_left, missing_type, tree_offsets, categories=None, trees_per_round=1,
+                 levels=None, scale=1.0, bias=None, opaque_nodes=None, count=None, native_id=None):
+        self.algorithm = algorithm
+        self.feature_names = list(feature_names)
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.cover = cover
+        self.gain = gain
+        self.default_left = default_left
+        self.missing_type = missing_type
+        self.tree_offsets = tree_offsets
+        # Node index -> category codes sent left
+        self.categories = categories or {}
+        # Trees added per boosting round, e.g. one per class for multiclass models
+        self.trees_per_round = trees_per_round
+        # {"feature", "threshold": (n_trees, max depth) arrays padded with -1/NaN, "depth": (n_trees,)}
+        self.levels = levels
+        self.scale = scale
+        self.bias = bias
+        # Node index -> description of the split
+        self.opaque_nodes = opaque_nodes or {}
+        # Training rows reaching each node, NaN where the library does not record them
+        self.count = count if count is not None else np.full(len(feature), np.nan)
+        self.native_id = native_id if native_id is not None else np.full(len(feature), -1, dtype=np.int32)
+        # Per node, over the subtree rooted there: leaves, min/max leaf value
+        # and height (0 for leaves); set by summarize_subtrees
+        self.subtree_leaves = None
+        self.subtree_min = None
+        self.subtree_max = None
+        self.subtree_height = None
+        # Parent (-1 for roots) and depth (0 for roots) of every node; set by summarize_subtrees
+        self.parent = None
+        self.depth = None
+        # (n_trees, largest native leaf id + 1) ensemble-wide leaf index by native
+        # leaf id, built on first use by leaf_nodes
+        self.leaf_table = None
+
+    @property
+    def n_trees(self):
+        return len(self.tree_offsets) - 1
+
+    @property
+    def n_nodes(self):
+        return int(self.tree_offsets[-1])
+
+    @property
+    def nbytes(self):
+        arrays = [self.feature, self.threshold, self.left, self.right, self.value, self.cover, self.gain,
+                  self.default_left, self.missing_type, self.tree_offsets, self.count, self.native_id]
+        arrays.extend(array for array in (self.subtree_leaves, self.subtree_min, self.subtree_max,
+                                          self.subtree_height, self.parent, self.depth, self.leaf_table)
+                      if array is not None)
+        if self.levels is not None:
+            arrays.extend(self.levels.values())
+        return sum(array.nbytes for array in arrays) + sum(c.nbytes for c in self.categories.values())
+
+    def tree_range(self, tree_index):
+        """(first, stop) node indices of a tree"""
+        return int(self.tree_offsets[tree_index]), int(self.tree_offsets[tree_index + 1])
+
+    def tree_size(self, tree_index):
+        """Number of nodes of a tree"""
+        start, stop = self.tree_range(tree_index)
+        return stop - start
+
+    def tree_slice(self, start, stop):
+        """(metadata, arrays) of trees start..stop-1, with node indices local to the slice
+
+        Categories are flattened into category_nodes, with the codes of
+        category_nodes[i] at category_values[category_offsets[i]:category_offsets[i + 1]].
+        """
+        first, last = int(self.tree_offsets[start]), int(self.tree_offsets[stop])
+
+        def local(nodes):
+            return np.where(nodes >= 0, nodes - first, -1).astype(np.int32)
+
+        category_nodes = sorted(node for node in self.categories if first <= node < last)
+        category_values = [self.categories[node] for node in category_nodes]
+        arrays = {
+            "tree_offsets": (self.tree_offsets[start:stop + 1] - first).astype(np.int64),
+            "feature": self.feature[first:last],
+            "threshold": self.threshold[first:last],
+            "left": local(self.left[first:last]),
+            "right": local(self.right[first:last]),
+            "value": self.value[first:last],
+            "cover": self.cover[first:last],
+            "gain": self.gain[first:last],
+            "default_left": self.default_left[first:last],
+            "missing_type": self.missing_type[first:last],
+            "count": self.count[first:last],
+            "native_id": self.native_id[first:last],
+            "category_nodes": np.asarray(category_nodes, dtype=np.int32) - first,
+            "category_offsets": np.concatenate([[0], np.cumsum([len(v) for v in category_values])]).astype(np.int32),
+            "category_values": (np.concatenate(category_values) if category_values else np.empty(0)).astype(np.int32)
+        }
+        meta = {
+            "algorithm": self.algorithm,
+            "feature_names": self.feature_names,
+            "start": start,
+            "stop": stop,
+            "n_trees": self.n_trees,
+            "trees_per_round": self.trees_per_round,
+            "scale": float(self.scale),
+            "bias": None if self.bias is None else np.asarray(self.bias, dtype=np.float64).tolist(),
+            "opaque_nodes": {str(node - first): description for node, description in self.opaque_nodes.items()
+                             if first <= node < last}
+        }
+        return meta, arrays
+
+    def leaf_nodes(self, native_leaves):
+        """Ensemble-wide leaf indices from (n_rows, n_trees) leaf ids given by the model's library"""
+        native_leaves = np.asarray(native_leaves, dtype=np.int64)
+        if self.leaf_table is None:
+            leaves = np.flatnonzero(self.feature < 0)
+            trees = np.searchsorted(self.tree_offsets, leaves, side="right") - 1
+            table = np.full((self.n_trees, int(self.native_id[leaves].max()) + 1), -1, dtype=np.int32)
+            table[trees, self.native_id[leaves]] = leaves
+            self.leaf_table = table
+        if native_leaves.shape[1:] != (self.n_trees,):
+            raise ValueError(f"Expected leaf ids for {self.n_trees} trees, got shape {native_leaves.shape}")
+        if native_leaves.size and (native_leaves.min() < 0 or native_leaves.max() >= self.leaf_table.shape[1]):
+            raise ValueError("Leaf ids out of range")
+        nodes = self.leaf_table[np.arange(self.n_trees), native_leaves]
+        if np.any(nodes < 0):
+            raise ValueError("Leaf ids do not match the leaves of the trees")
+        return nodes
+
+    def paths(self, leaves):
+        """Root-to-leaf paths to the ensemble-wide leaf indices in leaves
+
+        Returns (paths, lengths): paths has one more trailing axis than
+        leaves, of length max depth + 1, holding the node ids of each path,
+        local to its tree, padded with -1; lengths is the number of nodes
+        of each path. One vectorized step per level walks all paths up at once.
+        """
+        leaves = np.asarray(leaves, dtype=np.int64)
+        n_levels = int(self.depth.max()) + 1 if self.n_nodes else 1
+        paths = np.full(leaves.shape + (n_levels,), -1, dtype=np.int32)
+        # Tree roots, to make the ids local
+        roots = self.tree_offsets[np.searchsorted(self.tree_offsets, leaves, side="right") - 1]
+        lengths = self.depth[leaves] + 1
+        nodes = leaves
+        levels = lengths - 1
+        for _ in range(n_levels):
+            active = levels >= 0
+            if not active.any():
+                break
+            index = np.nonzero(active)
+            paths[index + (levels[active],)] = nodes[active] - roots[active]
+            nodes = np.where(active, self.parent[nodes], nodes)
+            levels = levels - 1
+        return paths, lengths
+
+    def staged_margins(self, leaves, iterations):
+        """Raw margins after each of the given numbers of boosting rounds
+
+        leaves holds the ensemble-wide leaf each row reaches in each tree,
+        (n_rows, n_trees). Leaf outputs are added round by round to a running
+        margin, so any number of stages costs one cumulative sum. Returns
+        (n_stages, n_rows, trees_per_round).
+        """
+        leaves = np.asarray(leaves)
+        running = np.cumsum(self.value[leaves].reshape(len(leaves), -1, self.trees_per_round), axis=1)
+        margins = running[:, np.asarray(iterations, dtype=np.int64) - 1].transpose(1, 0, 2)
+        bias = np.zeros(self.trees_per_round) if self.bias is None else np.asarray(self.bias, dtype=np.float64)
+        return self.scale * margins + bias
+
+    def node_depths(self, tree_index):
+        """Depth of every node of a tree, root at 0"""
+        start, stop = self.tree_range(tree_index)
+        depths = np.zeros(stop - start, dtype=np.int32)
+        # Children always come after their parent, so one forward pass suffices
+        for local in range(stop - start):
+            node = start + local
+            if self.feature[node] >= 0:
+                depths[self.left[node] - start] = depths[local] + 1
+                depths[self.right[node] - start] = depths[local] + 1
+        return depths
+
+    def tree_structure(self, tree_index, compact=False, max_depth=None, node_id=0):
+        """JSON-ready nodes of one tree, with node ids local to the tree
+
+        With compact, oblivious trees are described by their levels and leaf
+        values only, which is linear in the depth rather than exponential.
+        With max_depth, only the nodes up to max_depth levels below node_id
+        are listed; splits at that level are collapsed into a summary of
+        their subtree and can be expanded by passing their id as node_id.
+        """
+        start = self.tree_range(tree_index)[0]
+        if not 0 <= node_id < self.tree_size(tree_index):
+            raise IndexError(f"Node {node_id} not in tree {tree_index}")
+        if compact and self.levels is not None and node_id == 0:
+            return self.oblivious_structure(tree_index)
+        root = start + node_id
+        nodes = []
+        truncated = False
+        # Pre-order walk, so nodes are listed in id order for the full tree
+        stack = [(root, 0)]
+        while stack:
+            node, level = stack.pop()
+            entry = self.node_entry(node, start)
+            if self.feature[node] >= 0:
+                if max_depth is not None and level >= max_depth:
+                    del entry["left"], entry["right"]
+                    entry["collapsed"] = True
+                    entry["summary"] = self.subtree_summary(node)
+                    truncated = True
+                else:
+                    stack.append((self.right[node], level + 1))
+                    stack.append((self.left[node], level + 1))
+            nodes.append(entry)
+        structure = {
+            "nodes": nodes,
+            "root": node_id,
+            "depth": int(self.subtree_height[root]),
+            "leaf_count": int(self.subtree_leaves[root]),
+            "truncated": truncated
+        }
+        if self.levels is not None:
+            structure["oblivious"] = True
+        return structure
+
+    def node_entry(self, node, start):
+        """JSON-ready description of one node; ids are relative to start"""
+        if self.feature[node] < 0:
+            entry = {
+                "id": int(node - start),
+                "leaf": True,
+                "value": float(self.value[node]),
+                "cover": float(self.cover[node])
+            }
+            if not np.isnan(self.count[node]):
+                entry["samples"] = int(self.count[node])
+            return entry
+        entry = {
+            "id": int(node - start),
+            "feature": self.feature_names[self.feature[node]],
+            "feature_index": int(self.feature[node]),
+            "threshold": float(self.threshold[node]),
+            "left": int(self.left[node] - start),
+            "right": int(self.right[node] - start),
+            "default_left": bool(self.default_left[node]),
+            "gain": float(self.gain[node]),
+            "cover": float(self.cover[node]),
+            "value": float(self.value[node])
+        }
+        if not np.isnan(self.count[node]):
+            entry["samples"] = int(self.count[node])
+        if node in self.categories:
+            entry["threshold"] = None
+            entry["categories"] = self.categories[node].tolist()
+        if node in self.opaque_nodes:
+            entry["threshold"] = None
+            entry["split"] = self.opaque_nodes[node]
+        return entry
+
+    def subtree_summary(self, node):
+        """Size and leaf value range of the subtree below a node"""
+        summary = {
+            "cover": float(self.cover[node]),
+            "leaf_count": int(self.subtree_leaves[node]),
+            "node_count": int(2 * self.subtree_leaves[node] - 1),
+            "depth": int(self.subtree_height[node]),
+            "value_min": float(self.subtree_min[node]),
+            "value_max": float(self.subtree_max[node])
+        }
+        if not np.isnan(self.count[node]):
+            summary["samples"] = int(self.count[node])
+        return summary
+
+    def oblivious_structure(self, tree_index):
+        """Levels (root first) and leaf values of an oblivious tree
+
+        The leaf reached by a row has index sum(2**(depth - 1 - level)) over
+        the levels where the row goes right, i.e. leaves are in left-to-right order.
+        """
+        start, stop = self.tree_range(tree_index)
+        depth = int(self.levels["depth"][tree_index])
+        leaves = np.flatnonzero(self.feature[start:stop] < 0) + start
+        levels = []
+        for level in range(depth):
+            feature = int(self.levels["feature"][tree_index, level])
+            levels.append({
+                "feature": self.feature_names[feature],
+                "feature_index": feature,
+                # Rows with x > border go right
+                "border": float(self.levels["threshold"][tree_index, level])
+            })
+        return {
+            "oblivious": True,
+            "levels": levels,
+            "leaf_values": self.value[leaves].tolist(),
+            "leaf_cover": self.cover[leaves].tolist(),
+            "depth": depth,
+            "leaf_count": len(leaves)
+        }
+
+class TreeArraysBuilder:
+    """Collect nodes tree by tree, then freeze them into a TreeArrays"""
+    def __init__(self):
+        self.columns = {name: [] for name in ("feature", "threshold", "left", "right", "value", "cover", "gain",
+                                              "default_left", "missing_type", "count", "native_id")}
+        self.categories = {}
+        self.tree_offsets = [0]
+
+    def __len__(self):
+        return len(self.columns["feature"])
+
+    def add_node(self, feature=-1, threshold=np.nan, value=np.nan, cover=0.0, gain=0.0, default_left=True,
+                 missing_type=MISSING_DEFAULT, categories=None, count=np.nan, native_id=-1):
+        """Append a node with no children yet and return its ensemble-wide index"""
+        index = len(self)
+        for name, item in (("feature", feature), ("threshold", threshold), ("left", -1), ("right", -1),
+                           ("value", value), ("cover", cover), ("gain", gain), ("default_left", default_left),
+                           ("missing_type", missing_type), ("count", count), ("native_id", native_id)):
+            self.columns[name].append(item)
+        if categories is not None:
+            self.categories[index] = np.asarray(categories, dtype=np.int32)
+        return index
+
+    def link(self, parent, side, child):
+        """Make child the "left" or "right" child of parent"""
+        self.columns[side][parent] = child
+
+    def end_tree(self):
+        self.tree_offsets.append(len(self))
+
+    def build(self, algorithm, feature_names, trees_per_round=1, **extra):
+        c = self.columns
+        arrays = TreeArrays(
+            algorithm, feature_names,
+            feature=np.asarray(c["feature"], dtype=np.int32),
+            threshold=np.asarray(c["threshold"], dtype=np.float64),
+            left=np.asarray(c["left"], dtype=np.int32),
+            right=np.asarray(c["right"], dtype=np.int32),
+            value=np.asarray(c["value"], dtype=np.float64),
+            cover=np.asarray(c["cover"], dtype=np.float64),
+            gain=np.asarray(c["gain"], dtype=np.float64),
+            default_left=np.asarray(c["default_left"], dtype=bool),
+            missing_type=np.asarray(c["missing_type"], dtype=np.int8),
+            count=np.asarray(c["count"], dtype=np.float64),
+            native_id=np.asarray(c["native_id"], dtype=np.int32),
+            tree_offsets=np.asarray(self.tree_offsets, dtype=np.int64),
+            categories=self.categories,
+            trees_per_round=trees_per_round,
+            **extra
+        )
+        fill_split_values(arrays)
+        summarize_subtrees(arrays)
+        return arrays
+
+def fill_split_values(arrays):
+    """Set missing split values to the cover-weighted mean of their children"""
+    # Children come after their parents, so a backward pass sees children first
+    for node in range(arrays.n_nodes - 1, -1, -1):
+        if arrays.feature[node] >= 0 and np.isnan(arrays.value[node]):
+            left, right = arrays.left[node], arrays.right[node]
+            total = arrays.cover[left] + arrays.cover[right]
+            if total > 0:
+                arrays.value[node] = (arrays.value[left] * arrays.cover[left]
+                                      + arrays.value[right] * arrays.cover[right]) / total
+            else:
+                arrays.value[node] = (arrays.value[left] + arrays.value[right]) / 2
+
+def summarize_subtrees(arrays):
+    """Set the per-node subtree summaries, parents and depths, one vectorized pass per depth level"""
+    feature, left, right = arrays.feature, arrays.left, arrays.right
+    levels = []
+    frontier = arrays.tree_offsets[:-1]
+    while frontier.size:
+        levels.append(frontier)
+        splits = frontier[feature[frontier] >= 0]
+        frontier = np.concatenate([left[splits], right[splits]])
+
+    is_leaf = feature < 0
+    leaves = is_leaf.astype(np.int32)
+    low = np.where(is_leaf, arrays.value, np.inf)
+    high = np.where(is_leaf, arrays.value, -np.inf)
+    height = np.zeros(arrays.n_nodes, dtype=np.int32)
+    parent = np.full(arrays.n_nodes, -1, dtype=np.int32)
+    depth = np.zeros(arrays.n_nodes, dtype=np.int32)
+    for level_index, level in enumerate(levels):
+        depth[level] = level_index
+        splits = level[feature[level] >= 0]
+        parent[left[splits]] = splits
+        parent[right[splits]] = splits
+    # Deepest level first, so children are complete before their parents
+    for level in reversed(levels):
+        splits = level[feature[level] >= 0]
+        l, r = left[splits], right[splits]
+        leaves[splits] = leaves[l] + leaves[r]
+        low[splits] = np.minimum(low[l], low[r])
+        high[splits] = np.maximum(high[l], high[r])
+        height[splits] = 1 + np.maximum(height[l], height[r])
+    arrays.subtree_leaves = leaves
+    arrays.subtree_min = low
+    arrays.subtree_max = high
+    arrays.subtree_height = height
+    arrays.parent = parent
+    arrays.depth = depth
+
+def xgboost_tree_arrays(booster, feature_names):
+    """Convert an XGBoost Booster from one JSON dump of its trees"""
+    feature_index = {name: i for i, name in enumerate(booster.feature_names or feature_names)}
+    config = json.loads(booster.save_config())
+    n_classes = int(config["learner"]["learner_model_param"].get("num_class", "0") or 0)
+    bias = xgboost_base_margin(booster, max(n_classes, 1))
+    builder = TreeArraysBuilder()
+    for dump in booster.get_dump(dump_format="json", with_stats=True):
+        root = json.loads(dump)
+        # Pre-order walk; XGBoost node ids are replaced by ensemble-wide indices
+        stack = [(root, None, None)]
+        while stack:
+            node, parent, side = stack.pop()
+            if "leaf" in node:
+                index = builder.add_node(value=node["leaf"], cover=node.get("cover", 0.0), native_id=node["nodeid"])
+            else:
+                condition = node["split_condition"]
+                categorical = isinstance(condition, list)
+                index = builder.add_node(
+                    feature=feature_index[node["split"]],
+                    # XGBoost compares in float32; the dump rounds to decimal
+                    threshold=np.nan if categorical else float(np.float32(condition)),
+                    cover=node.get("cover", 0.0),
+                    gain=node.get("gain", 0.0),
+                    default_left=node["missing"] == node["yes"],
+                    categories=condition if categorical else None,
+                    native_id=node["nodeid"]
+                )
+                children = {child["nodeid"]: child for child in node["children"]}
+                # Push "no" first so the "yes" (left) subtree is numbered first
+                stack.append((children[node["no"]], index, "right"))
+                stack.append((children[node["yes"]], index, "left"))
+            if parent is not None:
+                builder.link(parent, side, index)
+        builder.end_tree()
+    return builder.build("xgboost", feature_names, trees_per_round=max(n_classes, 1), bias=bias)
+
+def xgboost_base_margin(booster, n_outputs):
+    """Margin XGBoost adds to the tree outputs, i.e. base_score mapped through the objective's link"""
+    import xgboost as xgb
+    if booster.num_boosted_rounds() == 0:
+        return np.zeros(n_outputs)
+    matrix_args = {"feature_names": booster.feature_names, "feature_types": booster.feature_types,
+                   "enable_categorical": True}
+    row = np.full((1, booster.num_features()), np.nan, dtype=np.float32)
+    # The first tree's output is the same with and without a zero base margin
+    with_base = booster.predict(xgb.DMatrix(row, **matrix_args), output_margin=True, iteration_range=(0, 1))
+    without = booster.predict(xgb.DMatrix(row, base_margin=np.zeros(n_outputs), **matrix_args),
+                              output_margin=True, iteration_range=(0, 1))
+    return np.atleast_1d((with_base - without).reshape(-1)).astype(np.float64)
+
+def lightgbm_tree_arrays(booster, feature_names):
+    """Convert a LightGBM Booster from one dump_model() of its trees"""
+    dump = booster.dump_model()
+    builder = TreeArraysBuilder()
+    for tree in dump["tree_info"]:
+        stack = [(tree["tree_structure"], None, None)]
+        while stack:
+            node, parent, side = stack.pop()
+            if "split_feature" not in node:
+                # A tree without splits is a single leaf
+                index = builder.add_node(value=node["leaf_value"], cover=node.get("leaf_weight", 0.0),
+                                         count=node.get("leaf_count", np.nan), native_id=node.get("leaf_index", 0))
+            else:
+                categorical = node["decision_type"] == "=="
+                threshold = node["threshold"]
+                if categorical:
+                    categories = [int(c) for c in str(threshold).split("||")]
+                    threshold = np.nan
+                else:
+                    categories = None
+                    # x <= t is exactly x < nextafter(t) in float64
+                    threshold = np.nextafter(float(threshold), np.inf)
+                index = builder.add_node(
+                    feature=node["split_feature"],
+                    threshold=threshold,
+                    value=node.get("internal_value", np.nan),
+                    cover=node.get("internal_weight", 0.0),
+                    gain=node.get("split_gain", 0.0),
+                    default_left=node.get("default_left", True),
+                    missing_type=LIGHTGBM_MISSING_TYPES.get(node.get("missing_type"), MISSING_DEFAULT),
+                    categories=categories,
+                    count=node.get("internal_count", np.nan),
+                    native_id=node.get("split_index", -1)
+                )
+                stack.append((node["right_child"], index, "right"))
+                stack.append((node["left_child"], index, "left"))
+            if parent is not None:
+                builder.link(parent, side, index)
+        builder.end_tree()
+    return builder.build("lightgbm", feature_names, trees_per_round=dump.get("num_tree_per_iteration", 1))
+
+def catboost_tree_arrays(model, feature_names):
+    """Convert a CatBoost model from its JSON export
+
+    Every oblivious tree is expanded into a full binary tree whose root level
+    holds the last split of the export, so leaves come out in CatBoost's leaf
+    index order. Multiclass trees become one tree per class.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "model.json")
+        model.save_model(path, format="json")
+        with open(path) as f:
+            export = json.load(f)
+
+    float_features = {info["feature_index"]: info for info in export["features_info"].get("float_features", [])}
+    cat_features = {info["feature_index"]: info for info in export["features_info"].get("categorical_features", [])}
+    scale, bias = export.get("scale_and_bias", [1.0, [0.0]])
+    bias = np.atleast_1d(np.asarray(bias, dtype=np.float64))
+    dimension = len(bias)
+
+    oblivious_trees = export.get("oblivious_trees", [])
+    max_depth = max((len(tree.get("splits", [])) for tree in oblivious_trees), default=0)
+    n_trees = len(oblivious_trees) * dimension
+    level_features = np.full((n_trees, max_depth), -1, dtype=np.int32)
+    level_borders = np.full((n_trees, max_depth), np.nan, dtype=np.float64)
+    depths = np.zeros(n_trees, dtype=np.int32)
+    opaque_nodes = {}
+
+    builder = TreeArraysBuilder()
+    tree_index = 0
+    for tree in oblivious_trees:
+        # Root level first
+        splits = list(reversed(tree.get("splits", [])))
+        depth = len(splits)
+        leaf_values = np.asarray(tree["leaf_values"], dtype=np.float64).reshape(2 ** depth, dimension)
+        # Sums of training sample weights; counts, since models are trained unweighted
+        has_weights = bool(tree.get("leaf_weights"))
+        leaf_weights = np.asarray(tree.get("leaf_weights") or np.zeros(2 ** depth), dtype=np.float64)
+        # Weight below a node = sum over a contiguous range of leaves
+        cumulative = np.concatenate([[0.0], np.cumsum(leaf_weights)])
+
+        levels = [_catboost_split(split, float_features, cat_features) for split in splits]
+        for output in range(dimension):
+            for level, (feature, border, default_left, description) in enumerate(levels):
+                level_features[tree_index, level] = feature
+                level_borders[tree_index, level] = border
+            depths[tree_index] = depth
+
+            # Pre-order walk over (level, leaf prefix)
+            stack = [(0, 0, None, None)]
+            while stack:
+                level, prefix, parent, side = stack.pop()
+                span = 2 ** (depth - level)
+                cover = cumulative[(prefix + 1) * span] - cumulative[prefix * span]
+                count = cover if has_weights else np.nan
+                if level == depth:
+                    index = builder.add_node(value=leaf_values[prefix, output], cover=cover, count=count,
+                                             native_id=prefix)
+                else:
+                    feature, border, default_left, description = levels[level]
+                    index = builder.add_node(
+                        feature=feature,
+                        # x > border goes right, i.e. x < nextafter(border) goes left
+                        threshold=np.nextafter(border, np.inf) if description is None else np.nan,
+                        cover=cover,
+                        default_left=default_left,
+                        count=count
+                    )
+                    if description is not None:
+                        opaque_nodes[index] = description
+                    stack.append((level + 1, 2 * prefix + 1, index, "right"))
+                    stack.append((level + 1, 2 * prefix, index, "left"))
+                if parent is not None:
+                    builder.link(parent, side, index)
+            builder.end_tree()
+            tree_index += 1
+
+    levels = {"feature": level_features, "threshold": level_borders, "depth": depths}
+    return builder.build("catboost", feature_names, trees_per_round=dimension, levels=levels,
+                         scale=float(scale), bias=bias, opaque_nodes=opaque_nodes)
+
+def _catboost_split(split, float_features, cat_features):
+    """(feature index, border, default_left, description) of a split in a CatBoost JSON export
+
+    description is None for plain float splits and names the split type otherwise.
+    """
+    if split.get("split_type") == "FloatFeature":
+        info = float_features[split["float_feature_index"]]
+        # NaNs compare as false unless the feature treats them as true
+        return (info["flat_feature_index"], float(split["border"]),
+                info.get("nan_value_treatment") != "AsTrue", None)
+    # One-hot and CTR splits work on hashed categorical values
+    cat_index = split.get("cat_feature_index")
+    feature = cat_features[cat_index]["flat_feature_index"] if cat_index in cat_features else 0
+    return feature, float(split.get("border", np.nan)), True, split.get("split_type", "unknown")
+
+# Converters by algorithm; each takes (model, feature_names)
+CONVERTERS = {
+    "xgboost": xgboost_tree_arrays,
+    "lightgbm": lightgbm_tree_arrays,
+    "catboost": catboost_tree_arrays
+}
+
+def supports(algorithm):
+    return algorithm in CONVERTERS
+
+def extract_tree_arrays(model, algorithm, feature_names):
+    """Convert a trained model into TreeArrays"""
+    if algorithm not in CONVERTERS:
+        raise ValueError(f"Tree extraction is not supported for {algorithm}")
+    return CONVERTERS[algorithm](model, feature_names)
@@ -431,7 +431,8 @@ const Documentation = () => {
               POST /train
             </Typography>
             <Typography variant="body1" paragraph>
-              Trains a gradient boosting model with the specified parameters.
+              Queues training of a gradient boosting model with the specified parameters and returns a job ID immediately.
+              Poll GET /jobs/{'{job_id}'} for status, progress and the final result.
             </Typography>
             <Typography variant="subtitle2" gutterBottom>
               Request Body:
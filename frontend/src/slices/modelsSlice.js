@@ -14,9 +14,28 @@ export const fetchModelInfo = createAsyncThunk('models/fetchModelInfo', async (m
   return response.data;
 });
 
+const JOB_POLL_INTERVAL_MS = 250;
+
 export const trainModel = createAsyncThunk('models/trainModel', async (trainingConfig) => {
-  const response = await axios.post(`${API_URL}/train`, trainingConfig);
-  return response.data;
+  // Training runs as a background job; poll until it finishes
+  const { data: queued } = await axios.post(`${API_URL}/train`, trainingConfig);
+  for (;;) {
+    const { data: job } = await axios.get(`${API_URL}/jobs/${queued.job_id}`);
+    if (job.status === 'completed') {
+      return job.result;
+    }
+    if (job.status === 'failed') {
+      throw new Error(job.error);
+    }
+    if (job.status === 'cancelled') {
+      // A cancelled job may keep the model trained so far
+      if (job.result) {
+        return job.result;
+      }
+      throw new Error('Training was cancelled');
+    }
+    await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+  }
 });
 
 export const visualizeTree = createAsyncThunk('models/visualizeTree', async ({ modelId, algorithm, treeIndex }) => {